@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+监控账号分片：多个监控进程共用同一个数据目录，分担 TARGET_ACCOUNTS
+
+- 账号租约保存在数据目录下的 SQLite 数据库 .leases.db：同一账号同一时间只属于一个进程，
+  进程在后台定期续约，超过 lease_seconds 未续约的进程视为失效，其账号由其他进程接手
+- 每个进程最多持有 ceil(账号数 / 存活进程数) 个账号；新进程加入后，持有过多的进程在下次续约时释放多余账号
+- 各账号的抓取进度同样保存在数据库中，接手的进程从上一个进程的进度继续抓取，不会重新回溯
+- 每个进程使用独立的预写日志（.journal-<进程ID>.wal），写入日期文件时在跨进程锁内按推文ID去重；
+  抓取和保存时同样跳过其他进程日志中尚未合并的推文，接手账号后不会重复调用大模型、重复计入统计；
+  失效进程遗留的日志由发现它失效的进程重放
+- 配置文件中的账号列表和检查间隔在每次续约时重新读取，修改后无需重启
+
+用法：
+    python account_shards.py --worker-id w1
+    python account_shards.py --worker-id w2
+    python account_shards.py --status
+"""
+
+import argparse
+import math
+import os
+import re
+import signal
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+import json_codec
+from tweet_storage import JOURNAL_PREFIX, JOURNAL_SUFFIX, TweetJournal
+
+# 租约数据库文件名（以.开头，不会被当作日期文件）
+LEASES_FILENAME = ".leases.db"
+# 租约有效期（秒），续约间隔为其三分之一
+DEFAULT_LEASE_SECONDS = 60
+# 抓取进度的存储格式（UTC）
+PROGRESS_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS workers (worker_id TEXT PRIMARY KEY, expires REAL NOT NULL);
+CREATE TABLE IF NOT EXISTS leases (account TEXT PRIMARY KEY, owner TEXT NOT NULL, expires REAL NOT NULL);
+CREATE TABLE IF NOT EXISTS progress (account TEXT PRIMARY KEY, checked_until TEXT NOT NULL);
+"""
+
+
+def worker_journal_filename(worker_id: str) -> str:
+    """
+    获取监控进程独立的预写日志文件名
+
+    :param worker_id: 进程ID
+    :return: 日志文件名
+    """
+    return f"{JOURNAL_PREFIX}-{worker_id}{JOURNAL_SUFFIX}"
+
+
+class AccountLeaseStore:
+    """基于 SQLite 的账号租约和抓取进度存储"""
+
+    def __init__(self, db_path: str, worker_id: str, lease_seconds: float = DEFAULT_LEASE_SECONDS):
+        """
+        :param db_path: 数据库文件路径
+        :param worker_id: 当前进程ID（只能包含字母、数字、_ . -）
+        :param lease_seconds: 租约有效期（秒）
+        """
+        if not re.fullmatch(r'[A-Za-z0-9_.-]+', worker_id or ''):
+            raise ValueError(f"无效的进程ID: {worker_id!r}")
+        self.db_path = db_path
+        self.worker_id = worker_id
+        self.lease_seconds = lease_seconds
+
+    @contextmanager
+    def _transaction(self):
+        """写事务：BEGIN IMMEDIATE 保证多个进程的领取操作串行执行"""
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        try:
+            conn.executescript(SCHEMA)
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+    def claim(self, accounts: list) -> dict:
+        """
+        续约并按公平份额领取或释放账号
+
+        :param accounts: 全部要监控的账号
+        :return: {"owned": 当前持有的账号, "acquired": 新领取的账号, "released": 释放的账号,
+                  "dead_workers": 本次发现的失效进程, "workers": 存活进程数}
+        """
+        wanted = {account.lower(): account for account in accounts}
+        now = time.time()
+        expires = now + self.lease_seconds
+        with self._transaction() as conn:
+            conn.execute("INSERT OR REPLACE INTO workers (worker_id, expires) VALUES (?, ?)", (self.worker_id, expires))
+            dead_workers = [row[0] for row in conn.execute("SELECT worker_id FROM workers WHERE expires < ?", (now,))]
+            conn.execute("DELETE FROM workers WHERE expires < ?", (now,))
+            conn.execute("DELETE FROM leases WHERE expires < ?", (now,))
+            # 已从配置中移除的账号不再保留租约
+            for (account,) in conn.execute("SELECT account FROM leases").fetchall():
+                if account not in wanted:
+                    conn.execute("DELETE FROM leases WHERE account = ?", (account,))
+
+            workers = conn.execute("SELECT COUNT(*) FROM workers").fetchone()[0]
+            quota = math.ceil(len(wanted) / workers)
+
+            owned = sorted(row[0] for row in conn.execute("SELECT account FROM leases WHERE owner = ?", (self.worker_id,)))
+            released = owned[quota:]
+            owned = owned[:quota]
+            conn.executemany("DELETE FROM leases WHERE account = ?", [(account,) for account in released])
+
+            taken = {row[0] for row in conn.execute("SELECT account FROM leases")}
+            acquired = [account for account in sorted(wanted) if account not in taken][:quota - len(owned)]
+            conn.executemany("INSERT INTO leases (account, owner, expires) VALUES (?, ?, ?)",
+                             [(account, self.worker_id, expires) for account in acquired])
+            conn.execute("UPDATE leases SET expires = ? WHERE owner = ?", (expires, self.worker_id))
+
+        return {
+            'owned': [wanted[account] for account in sorted(owned + acquired)],
+            'acquired': [wanted[account] for account in acquired],
+            'released': released,
+            'dead_workers': dead_workers,
+            'workers': workers,
+        }
+
+    def save_progress(self, progress: dict):
+        """
+        保存账号抓取进度（只会向后推进）
+
+        :param progress: 账号小写 -> 上次抓取截止时间（UTC）
+        """
+        if not progress:
+            return
+        rows = [(account, checked.strftime(PROGRESS_FORMAT)) for account, checked in progress.items()]
+        with self._transaction() as conn:
+            conn.executemany(
+                "INSERT INTO progress (account, checked_until) VALUES (?, ?) "
+                "ON CONFLICT(account) DO UPDATE SET checked_until = MAX(checked_until, excluded.checked_until)",
+                rows
+            )
+
+    def load_progress(self, accounts: list) -> dict:
+        """
+        读取账号抓取进度
+
+        :param accounts: 账号列表
+        :return: 账号小写 -> 上次抓取截止时间（UTC），没有记录的账号不包含在内
+        """
+        keys = [account.lower() for account in accounts]
+        if not keys:
+            return {}
+        with self._transaction() as conn:
+            rows = conn.execute(
+                f"SELECT account, checked_until FROM progress WHERE account IN ({','.join('?' * len(keys))})", keys
+            ).fetchall()
+        return {account: datetime.strptime(checked, PROGRESS_FORMAT) for account, checked in rows}
+
+    def release(self):
+        """释放当前进程的全部租约（正常退出时调用，其他进程无需等待租约过期）"""
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM leases WHERE owner = ?", (self.worker_id,))
+            conn.execute("DELETE FROM workers WHERE worker_id = ?", (self.worker_id,))
+
+    def status(self) -> dict:
+        """
+        当前的进程和租约分配
+
+        :return: {"workers": {进程ID: 持有的账号列表}, "progress_records": 已保存抓取进度的账号数}
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            workers = {row[0]: [] for row in conn.execute("SELECT worker_id FROM workers WHERE expires >= ? ORDER BY worker_id", (now,))}
+            for account, owner in conn.execute("SELECT account, owner FROM leases WHERE expires >= ? ORDER BY account", (now,)):
+                workers.setdefault(owner, []).append(account)
+            progress = conn.execute("SELECT COUNT(*) FROM progress").fetchone()[0]
+        return {'workers': workers, 'progress_records': progress}
+
+
+class ShardCoordinator:
+    """在后台线程中续约，并把持有的账号同步给监控器"""
+
+    def __init__(self, monitor, store: AccountLeaseStore, load_config, renew_interval: float = None):
+        """
+        :param monitor: TwitterAIMonitor
+        :param store: AccountLeaseStore
+        :param load_config: 返回最新配置字典的函数（读取 TARGET_ACCOUNTS、CHECK_INTERVAL、INITIAL_HOURS）
+        :param renew_interval: 续约间隔（秒），默认为租约有效期的三分之一
+        """
+        self.monitor = monitor
+        self.store = store
+        self.load_config = load_config
+        self.renew_interval = renew_interval or store.lease_seconds / 3
+        self.thread = None
+
+    def sync(self) -> dict:
+        """
+        保存抓取进度、续约领取账号，并更新监控器的账号列表
+
+        :return: claim 的结果
+        """
+        config = self.load_config()
+        # 先保存进度：释放的账号由其他进程从这里继续
+        progress = self.monitor.account_progress()
+        self.store.save_progress(progress)
+
+        result = self.store.claim(config.get("TARGET_ACCOUNTS", []))
+        for worker_id in result['dead_workers']:
+            self.recover_journal(worker_id)
+
+        checked_since = self.store.load_progress(result['acquired'])
+        self.monitor.update_settings(result['owned'], config.get("CHECK_INTERVAL"), config.get("INITIAL_HOURS"), checked_since)
+        if result['acquired'] or result['released']:
+            print(f"🔀 [{self.store.worker_id}] 领取 {', '.join('@' + a for a in result['acquired']) or '无'}，"
+                  f"释放 {', '.join('@' + a for a in result['released']) or '无'}；"
+                  f"当前持有 {len(result['owned'])} 个账号（{result['workers']} 个进程）")
+        if result['acquired']:
+            # 接手的账号立即抓取
+            self.monitor.scan_now()
+        return result
+
+    def recover_journal(self, worker_id: str):
+        """
+        重放失效进程遗留的预写日志
+
+        :param worker_id: 失效进程ID
+        """
+        filename = worker_journal_filename(worker_id)
+        journal = TweetJournal(self.monitor.data_dir, filename=filename)
+        if os.path.exists(journal.journal_path()):
+            print(f"♻️ [{self.store.worker_id}] 进程 {worker_id} 已失效，重放其预写日志")
+            journal.replay()
+            os.remove(journal.journal_path())
+
+    def start(self):
+        """启动续约线程，监控器停止时线程随之退出"""
+        def run():
+            while not self.monitor.stop_event.wait(self.renew_interval):
+                try:
+                    self.sync()
+                except Exception as e:
+                    print(f"❌ [{self.store.worker_id}] 账号租约续约失败: {e}")
+
+        self.thread = threading.Thread(target=run, daemon=True, name="shard-coordinator")
+        self.thread.start()
+
+    def stop(self):
+        """停止续约，保存进度并释放租约"""
+        self.monitor.stop()
+        if self.thread:
+            self.thread.join(timeout=5)
+        self.store.save_progress(self.monitor.account_progress())
+        self.store.release()
+
+
+def run_worker(monitor, store: AccountLeaseStore, load_config):
+    """
+    以分片模式运行监控：领取账号后开始监控，退出时释放租约
+
+    :param monitor: TwitterAIMonitor（使用 worker_journal_filename 作为日志文件名）
+    :param store: AccountLeaseStore
+    :param load_config: 返回最新配置字典的函数
+    """
+    coordinator = ShardCoordinator(monitor, store, load_config)
+    # 上次以同一进程ID运行时遗留的日志在首次写入前自动重放
+    result = coordinator.sync()
+    coordinator.start()
+    config = load_config()
+    print(f"🧩 [{store.worker_id}] 分片监控启动，持有账号: {', '.join(result['owned']) or '无'}")
+    try:
+        monitor.monitor_and_process(result['owned'], config.get("CHECK_INTERVAL", 300), config.get("INITIAL_HOURS", 2),
+                                    config.get("EXCLUDE_REPLIES", False), config.get("COMBINE_QUERIES", False))
+    finally:
+        coordinator.stop()
+        print(f"🧩 [{store.worker_id}] 已释放账号租约")
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="分片模式运行监控（多个进程分担监控账号）")
+    parser.add_argument('--worker-id', default="", help="进程ID，默认为 主机名-进程号；使用固定ID重启可重放自己遗留的日志")
+    parser.add_argument('--data-dir', default="data", help="数据目录（所有进程共用）")
+    parser.add_argument('--config', default="config.json", help="配置文件路径")
+    parser.add_argument('--lease-seconds', type=float, default=DEFAULT_LEASE_SECONDS, help="租约有效期（秒）")
+    parser.add_argument('--status', action='store_true', help="只输出当前的进程和账号分配")
+    args = parser.parse_args()
+
+    worker_id = args.worker_id or re.sub(r'[^A-Za-z0-9_.-]', '_', f"{socket.gethostname()}-{os.getpid()}")
+    store = AccountLeaseStore(os.path.join(args.data_dir, LEASES_FILENAME), worker_id, args.lease_seconds)
+    if args.status:
+        print(json_codec.dumps(store.status(), pretty=True))
+        return
+
+    def load_config() -> dict:
+        return json_codec.load_file(args.config)
+
+    config = load_config()
+    # 抓取和AI处理模块较重，仅在运行监控时导入
+    from twitter_ai_monitor import TwitterAIMonitor
+
+    monitor = TwitterAIMonitor.from_config(config, data_dir=args.data_dir,
+                                           journal_filename=worker_journal_filename(worker_id))
+    # 收到 SIGTERM 时正常退出并释放租约
+    signal.signal(signal.SIGTERM, lambda *_: monitor.stop())
+    run_worker(monitor, store, load_config)
+
+
+if __name__ == "__main__":
+    main()
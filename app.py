@@ -1,26 +1,44 @@
-from flask import Flask, render_template, request, jsonify, redirect, url_for
-import json
+from flask import Flask, render_template, request, jsonify, redirect, url_for, Response, stream_with_context
+from flask.json.provider import JSONProvider
 import os
 from datetime import datetime, timedelta
 import threading
 import time
-from twitter_ai_monitor import TwitterAIMonitor
+import json_codec
+from tweet_repository import TweetRepository
+from tweet_feeds import DEFAULT_FEED_SIZE, MAX_FEED_SIZE, FeedCache, iter_ndjson, render_atom, render_rss
+from tweet_stats import TweetStats
+from tweet_storage import write_json_atomic
+from token_budget import TokenBudget
+from tweet_trace import read_traces
+from monitor_service import INITIAL_STATUS, MONITOR_MODE_ENV, read_status, send_command
+
+
+class CodecJSONProvider(JSONProvider):
+    """让 jsonify 使用统一的JSON编解码层"""
+    
+    def dumps(self, obj, **kwargs):
+        return json_codec.dumps(obj)
+    
+    def loads(self, s, **kwargs):
+        return json_codec.loads(s)
+
 
 app = Flask(__name__)
+app.json = CodecJSONProvider(app)
 app.secret_key = 'your-secret-key'
 
 # 全局变量
 monitor_instance = None
 monitor_thread = None
-monitoring_status = {
-    "running": False, 
-    "last_update": None,
-    "current_status": "待机中",
-    "processed_tweets": 0,
-    "current_account": "",
-    "next_check_time": None,
-    "last_result": "暂无结果"
-}
+# 保护启动/停止操作，保证同一时间只有一个监控线程
+monitor_lock = threading.Lock()
+# 停止监控时等待线程退出的时间（秒）；正在进行的抓取或大模型请求完成后线程才会退出
+MONITOR_STOP_TIMEOUT = 3
+monitoring_status = dict(INITIAL_STATUS)
+# 监控运行方式：embedded 在本进程的线程中运行（python app.py）；
+# external 由独立的 monitor_service.py 进程运行，通过数据目录中的状态/命令文件通信（serve.py 部署时使用）
+EXTERNAL_MONITOR = os.environ.get(MONITOR_MODE_ENV, "embedded") == "external"
 
 # 时间转换函数：UTC转北京时间
 def utc_to_beijing(utc_time_str):
@@ -42,6 +60,17 @@ def utc_to_beijing(utc_time_str):
         print(f"时间转换错误: {str(e)}")
         return utc_time_str
 
+def with_beijing_time(tweets):
+    """
+    为推文添加北京时间字段（复制记录，避免修改仓库缓存中的数据）
+    :param tweets: 推文列表
+    :return: 新的推文列表
+    """
+    return [
+        dict(tweet, beijing_time=utc_to_beijing(tweet['timestamp'])) if 'timestamp' in tweet else tweet
+        for tweet in tweets
+    ]
+
 # 配置文件路径
 CONFIG_FILE = "config.json"
 
@@ -58,25 +87,50 @@ def load_config():
     
     if os.path.exists(CONFIG_FILE):
         try:
-            with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
-                config = json.load(f)
-                # 合并默认配置以确保所有键都存在
-                for key, value in default_config.items():
-                    if key not in config:
-                        config[key] = value
-                return config
-        except json.JSONDecodeError:
+            config = json_codec.load_file(CONFIG_FILE)
+            # 合并默认配置以确保所有键都存在
+            for key, value in default_config.items():
+                if key not in config:
+                    config[key] = value
+            return config
+        except json_codec.DecodeError:
             return default_config
     return default_config
 
+# 页面只读访问推文数据，不依赖监控实例和大模型客户端
+tweet_repository = TweetRepository("data", load_workers=load_config().get("LOAD_WORKERS", 1))
+# 统计汇总由监控增量维护，接口直接读取汇总文件
+tweet_stats = TweetStats("data")
+# RSS/Atom 订阅源缓存，日期文件变化（保存新推文）时失效
+feed_cache = FeedCache()
+
 def save_config(config):
     """保存配置文件"""
-    with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
-        json.dump(config, f, ensure_ascii=False, indent=2)
+    # 配置文件需要手工编辑，保留缩进格式；原子替换避免写入中断导致配置丢失
+    write_json_atomic(CONFIG_FILE, config, pretty=True)
+
+def get_monitoring_status():
+    """当前监控状态：独立进程运行时读取其状态文件"""
+    if EXTERNAL_MONITOR:
+        return read_status("data")
+    return monitoring_status
 
 def start_monitoring():
     """启动监控"""
-    global monitor_instance, monitoring_status
+    if EXTERNAL_MONITOR:
+        return send_command("data", "start")
+    with monitor_lock:
+        return _start_monitoring()
+
+def _start_monitoring():
+    """启动监控（调用方需持有 monitor_lock）"""
+    global monitor_instance, monitor_thread, monitoring_status
+    
+    # 上一个监控线程仍在运行（包括停止后尚未退出的线程）时不再启动新线程
+    if monitor_thread and monitor_thread.is_alive():
+        if monitoring_status.get("running"):
+            return False, "监控已在运行中"
+        return False, "上一个监控线程正在退出（等待当前请求完成），请稍后再试"
     
     config = load_config()
     
@@ -84,61 +138,103 @@ def start_monitoring():
         return False, "请先配置API密钥"
     
     try:
-        monitor_instance = TwitterAIMonitor(
-            config["TWITTER_API_KEY"],
-            config["LLM_URL"],
-            config["LLM_API_KEY"]
-        )
+        # 抓取和AI处理模块较重，仅在启动监控时导入
+        from twitter_ai_monitor import TwitterAIMonitor
+        
+        monitor = TwitterAIMonitor.from_config(config)
         
         # 在新线程中启动监控
         def monitor_worker():
             # 获取是否排除回复的配置，默认为False
             exclude_replies = config.get("EXCLUDE_REPLIES", False)
+            # 是否将多个账号合并为 OR 查询，默认为False
+            combine_queries = config.get("COMBINE_QUERIES", False)
             
-            monitor_instance.monitor_and_process_with_status(
+            monitor.monitor_and_process_with_status(
                 config["TARGET_ACCOUNTS"],
                 config["CHECK_INTERVAL"],
                 config["INITIAL_HOURS"],
                 monitoring_status,
-                exclude_replies
+                exclude_replies,
+                combine_queries
             )
         
-        global monitor_thread
-        monitor_thread = threading.Thread(target=monitor_worker, daemon=True)
-        monitor_thread.start()
-        
+        # 先设置运行状态再启动线程，避免线程启动时读到未运行状态直接退出
         monitoring_status["running"] = True
         monitoring_status["last_update"] = datetime.now().isoformat()
         monitoring_status["current_status"] = "正在初始化..."
         monitoring_status["processed_tweets"] = 0
         
+        monitor_instance = monitor
+        monitor_thread = threading.Thread(target=monitor_worker, daemon=True)
+        monitor_thread.start()
+        
         return True, "🚀 Neural Network Activated"
         
     except Exception as e:
+        monitoring_status["running"] = False
         return False, f"❌ Neural Network Error: {str(e)}"
 
 def stop_monitoring():
     """停止监控"""
     global monitoring_status, monitor_instance, monitor_thread
     
-    # 设置状态为停止
-    monitoring_status["running"] = False
-    monitoring_status["current_status"] = "Neural Network Offline"
-    monitoring_status["current_account"] = ""
-    monitoring_status["next_check_time"] = None
-    
-    # 等待线程结束（最多等待3秒）
-    if monitor_thread and monitor_thread.is_alive():
-        try:
-            monitor_thread.join(timeout=3)
-        except Exception as e:
-            print(f"停止监控线程时出错: {str(e)}")
-    
-    # 重置监控实例
-    monitor_instance = None
-    monitor_thread = None
+    if EXTERNAL_MONITOR:
+        return send_command("data", "stop")
+    with monitor_lock:
+        # 设置状态为停止，并唤醒监控线程中所有等待
+        monitoring_status["running"] = False
+        monitoring_status["current_status"] = "Neural Network Offline"
+        monitoring_status["current_account"] = ""
+        monitoring_status["next_check_time"] = None
+        if monitor_instance:
+            monitor_instance.stop()
+        
+        if monitor_thread and monitor_thread.is_alive():
+            try:
+                monitor_thread.join(timeout=MONITOR_STOP_TIMEOUT)
+            except Exception as e:
+                print(f"停止监控线程时出错: {str(e)}")
+        
+        if monitor_thread and monitor_thread.is_alive():
+            # 线程仍在等待网络请求返回，保留引用，退出前不允许启动新线程
+            return True, "🛑 Neural Network Deactivating（当前请求完成后退出）"
+        
+        # 重置监控实例
+        monitor_instance = None
+        monitor_thread = None
+        
+        return True, "🛑 Neural Network Deactivated"
+
+def scan_now():
+    """跳过倒计时，立即开始下一轮扫描"""
+    if EXTERNAL_MONITOR:
+        return send_command("data", "scan_now")
+    with monitor_lock:
+        if not (monitoring_status.get("running") and monitor_thread and monitor_thread.is_alive()):
+            return False, "监控未运行"
+        monitor_instance.scan_now()
+        return True, "⚡ 已触发立即扫描"
+
+def apply_monitor_settings(config):
+    """
+    将账号列表、检查间隔和追踪开关应用到运行中的监控，无需重启
     
-    return True, "🛑 Neural Network Deactivated"
+    :return: 监控是否在运行（设置是否已应用）
+    """
+    if EXTERNAL_MONITOR:
+        # 监控进程检测到配置文件修改后自行应用
+        return read_status("data").get("running", False)
+    with monitor_lock:
+        if not (monitoring_status.get("running") and monitor_instance):
+            return False
+        monitor_instance.update_settings(
+            config.get("TARGET_ACCOUNTS"),
+            config.get("CHECK_INTERVAL"),
+            config.get("INITIAL_HOURS"),
+            trace_enabled=config.get("TRACE_ENABLED")
+        )
+        return True
 
 @app.route('/')
 def index():
@@ -148,12 +244,7 @@ def index():
     date_filter = request.args.get('date', '')
     
     # 获取所有推文数据
-    if monitor_instance:
-        all_tweets = monitor_instance.get_all_tweets()
-    else:
-        # 如果没有监控实例，创建临时实例来读取数据
-        temp_monitor = TwitterAIMonitor("", "", "")
-        all_tweets = temp_monitor.get_all_tweets()
+    all_tweets = tweet_repository.get_all_tweets()
     
     # 应用筛选
     filtered_tweets = all_tweets
@@ -165,14 +256,13 @@ def index():
         filtered_tweets = [t for t in filtered_tweets if t.get('processed_date', '').startswith(date_filter)]
     
     # 转换时间为北京时间
-    for tweet in filtered_tweets:
-        if 'timestamp' in tweet:
-            tweet['beijing_time'] = utc_to_beijing(tweet['timestamp'])
+    filtered_tweets = with_beijing_time(filtered_tweets)
     
     # 获取所有作者列表用于筛选
-    authors = list(set([t.get('author', '') for t in all_tweets if t.get('author')]))
+    authors = tweet_repository.get_authors()
     
     # 更新监控状态中的时间为北京时间
+    monitoring_status = get_monitoring_status()
     if monitoring_status.get('last_update'):
         monitoring_status['beijing_last_update'] = utc_to_beijing(monitoring_status['last_update'])
     
@@ -186,33 +276,44 @@ def index():
                          current_date=date_filter,
                          monitoring_status=monitoring_status)
 
+# 增量更新时单次最多返回的新推文数，超过时页面整页刷新
+FRAGMENT_MAX_TWEETS = 100
+
+@app.route('/fragments/tweets')
+def tweet_fragments():
+    """返回比 since 更新的推文卡片HTML，首页据此增量插入新推文"""
+    since = request.args.get('since', '')
+    author = request.args.get('author', '')
+    date = request.args.get('date', '')
+    
+    if since:
+        tweets = tweet_repository.get_newer_than(since, author, date, FRAGMENT_MAX_TWEETS)
+    else:
+        # 页面上还没有推文：有数据时整页刷新
+        tweets = [] if tweet_repository.count() == 0 else None
+    
+    if tweets is None:
+        return jsonify({"reset": True, "count": 0, "html": ""})
+    
+    html = render_template('tweet_cards.html', tweets=with_beijing_time(tweets)) if tweets else ""
+    return jsonify({"reset": False, "count": len(tweets), "html": html})
+
 @app.route('/tweet/<tweet_id>')
 def tweet_detail(tweet_id):
     """推文详情页"""
-    # 获取所有推文数据
-    if monitor_instance:
-        all_tweets = monitor_instance.get_all_tweets()
-    else:
-        temp_monitor = TwitterAIMonitor("", "", "")
-        all_tweets = temp_monitor.get_all_tweets()
-    
     # 查找指定ID的推文
-    tweet = None
-    for t in all_tweets:
-        if t.get('id') == tweet_id:
-            tweet = t
-            break
+    tweet = tweet_repository.get_tweet(tweet_id)
     
     if not tweet:
         return "推文未找到", 404
     
-    return render_template('tweet_detail.html', tweet=tweet, monitoring_status=monitoring_status)
+    return render_template('tweet_detail.html', tweet=tweet, monitoring_status=get_monitoring_status())
 
 @app.route('/settings')
 def settings():
     """个人中心/设置页面"""
     config = load_config()
-    return render_template('settings.html', config=config, monitoring_status=monitoring_status)
+    return render_template('settings.html', config=config, monitoring_status=get_monitoring_status())
 
 @app.route('/api/save_config', methods=['POST'])
 def save_config_api():
@@ -243,7 +344,15 @@ def save_config_api():
         if 'INITIAL_HOURS' in config:
             config['INITIAL_HOURS'] = int(config['INITIAL_HOURS']) if config['INITIAL_HOURS'] else 2
         
-        save_config(config)
+        # 保留设置页面未提供的配置项（如 EXCLUDE_REPLIES、COMBINE_QUERIES）
+        merged_config = load_config()
+        merged_config.update(config)
+        
+        save_config(merged_config)
+        
+        # 运行中的监控直接应用账号和检查间隔，新增账号回溯 INITIAL_HOURS，已有账号保留抓取进度
+        if apply_monitor_settings(merged_config):
+            return jsonify({"success": True, "message": "🧠 Neural configuration updated and applied to the running monitor"})
         return jsonify({"success": True, "message": "🧠 Neural configuration updated successfully"})
         
     except Exception as e:
@@ -261,10 +370,55 @@ def stop_monitoring_api():
     success, message = stop_monitoring()
     return jsonify({"success": success, "message": message})
 
+@app.route('/api/scan_now', methods=['POST'])
+def scan_now_api():
+    """立即扫描API"""
+    success, message = scan_now()
+    return jsonify({"success": success, "message": message})
+
+@app.route('/api/diagnostics', methods=['POST'])
+def diagnostics_api():
+    """
+    性能诊断API：{"trace": true/false} 开关推文处理追踪（保存到配置），
+    {"profile_cycles": N} 对接下来 N 轮扫描进行性能分析
+    """
+    payload = request.get_json(silent=True) or {}
+    messages = []
+    if 'trace' in payload:
+        config = load_config()
+        config['TRACE_ENABLED'] = bool(payload['trace'])
+        save_config(config)
+        apply_monitor_settings(config)
+        messages.append(f"推文处理追踪已{'开启' if config['TRACE_ENABLED'] else '关闭'}")
+    if 'profile_cycles' in payload:
+        try:
+            cycles = max(0, int(payload['profile_cycles']))
+        except (TypeError, ValueError):
+            return jsonify({"success": False, "message": "profile_cycles 必须是整数"})
+        if EXTERNAL_MONITOR:
+            success, message = send_command("data", "profile", cycles=cycles)
+            if not success:
+                return jsonify({"success": False, "message": message})
+        else:
+            with monitor_lock:
+                if not (monitoring_status.get("running") and monitor_instance):
+                    return jsonify({"success": False, "message": "监控未运行"})
+                monitor_instance.profile_next_cycles(cycles)
+        messages.append(f"📊 接下来 {cycles} 轮扫描将进行性能分析，结果写入 data/profiles/")
+    if not messages:
+        return jsonify({"success": False, "message": "未指定诊断操作"})
+    return jsonify({"success": True, "message": "；".join(messages)})
+
+@app.route('/api/traces')
+def traces_api():
+    """获取最近的推文处理追踪记录API（limit 指定条数，默认200）"""
+    limit = request.args.get('limit', 200, type=int)
+    return jsonify(read_traces("data", max(1, min(limit, 5000))))
+
 @app.route('/api/monitoring_status')
 def monitoring_status_api():
     """获取监控状态API"""
-    return jsonify(monitoring_status)
+    return jsonify(get_monitoring_status())
 
 @app.route('/api/tweets')
 def tweets_api():
@@ -272,11 +426,7 @@ def tweets_api():
     author = request.args.get('author', '')
     date = request.args.get('date', '')
     
-    if monitor_instance:
-        all_tweets = monitor_instance.get_all_tweets()
-    else:
-        temp_monitor = TwitterAIMonitor("", "", "")
-        all_tweets = temp_monitor.get_all_tweets()
+    all_tweets = tweet_repository.get_all_tweets()
     
     # 应用筛选
     filtered_tweets = all_tweets
@@ -289,6 +439,61 @@ def tweets_api():
     
     return jsonify(filtered_tweets)
 
+@app.route('/api/stats')
+def stats_api():
+    """获取统计数据API（每日/每个作者的推文数、处理延迟、失败率）"""
+    author = request.args.get('author', '')
+    date = request.args.get('date', '')
+    return jsonify(tweet_stats.summary(author, date))
+
+@app.route('/api/token_usage')
+def token_usage_api():
+    """获取大模型 token 用量（按日期/账号/提示词类型）和当前预算模式API"""
+    monitor = monitor_instance
+    if monitor is None:
+        # 监控未运行时直接读取用量文件
+        config = load_config()
+        budget = TokenBudget("data", config.get("DAILY_TOKEN_BUDGET", 0), config.get("HOURLY_TOKEN_BUDGET", 0))
+    else:
+        budget = monitor.budget
+    return jsonify(budget.summary())
+
+@app.route('/api/export.ndjson')
+def export_ndjson_api():
+    """流式导出推文（NDJSON，每行一条），支持 author、date 筛选"""
+    author = request.args.get('author', '')
+    date = request.args.get('date', '')
+    tweets = tweet_repository.iter_tweets(author, date)
+    return Response(stream_with_context(iter_ndjson(tweets)), mimetype='application/x-ndjson')
+
+@app.route('/feeds/<feed_format>.xml')
+def feed(feed_format):
+    """最新推文的 RSS/Atom 订阅源，可用 author 参数订阅单个作者"""
+    if feed_format not in ('rss', 'atom'):
+        return "订阅格式不支持", 404
+    
+    author = request.args.get('author', '')
+    try:
+        limit = min(max(int(request.args.get('limit', DEFAULT_FEED_SIZE)), 1), MAX_FEED_SIZE)
+    except ValueError:
+        limit = DEFAULT_FEED_SIZE
+    
+    def build():
+        tweets = tweet_repository.get_latest(author, limit)
+        title = f"AI新闻24小时 - {author}" if author else "AI新闻24小时"
+        site_url = url_for('index', _external=True)
+        link_for = lambda tweet_id: url_for('tweet_detail', tweet_id=tweet_id, _external=True)
+        if feed_format == 'rss':
+            return render_rss(tweets, title, site_url, link_for)
+        return render_atom(tweets, title, site_url, request.url, link_for)
+    
+    body, etag = feed_cache.get((feed_format, author.lower(), limit, request.host_url), tweet_repository.version(), build)
+    if etag in request.if_none_match:
+        return Response(status=304, headers={'ETag': f'"{etag}"'})
+    
+    mimetype = 'application/rss+xml' if feed_format == 'rss' else 'application/atom+xml'
+    return Response(body, mimetype=mimetype, headers={'ETag': f'"{etag}"', 'Cache-Control': 'no-cache'})
+
 if __name__ == '__main__':
     # 确保必要的目录存在
     os.makedirs('data', exist_ok=True)
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量AI处理基准测试
+
+使用本地模拟的大模型客户端，对比逐条处理与批量处理的请求次数、提示词token数，
+并按服务商RPM（每分钟请求数）限制折算每分钟可处理的推文数。
+"""
+
+import contextlib
+import io
+import json
+import random
+from types import SimpleNamespace
+
+from twitter_ai_monitor import TwitterAIMonitor, estimate_tokens
+
+# 模拟服务商的每分钟请求数限制
+PROVIDER_RPM = 60
+# 模拟批量响应中丢失某条结果的概率，用于验证逐条重试
+DROP_RATE = 0.05
+
+
+class FakeCompletions:
+    """模拟 chat.completions 接口，记录请求次数和提示词token数"""
+
+    def __init__(self):
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.rng = random.Random(42)
+
+    def create(self, model, messages):
+        self.requests += 1
+        self.prompt_tokens += sum(estimate_tokens(m["content"]) for m in messages)
+        prompt = messages[-1]["content"]
+
+        if "推文列表：" in prompt:
+            payload = prompt.split("推文列表：", 1)[1].split("\n\n请只返回", 1)[0]
+            entries = [
+                {"id": item["id"], "title": "标题", "translation": "翻译", "analysis": "解读"}
+                for item in json.loads(payload)
+                if self.rng.random() >= DROP_RATE
+            ]
+            content = json.dumps(entries, ensure_ascii=False)
+        else:
+            content = "模拟结果"
+
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def run(batch_size, tweets):
+    """处理一批推文，返回 (请求次数, 提示词token数)"""
+    monitor = TwitterAIMonitor("bench", "http://localhost", "bench", options={"AI_BATCH_SIZE": batch_size})
+    completions = FakeCompletions()
+    monitor.get_llm_router().endpoints[0].client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        for batch in monitor.plan_ai_batches(tweets):
+            if len(batch) > 1:
+                results = monitor.process_tweets_batch_with_ai(batch)
+                # 与监控循环相同：批量结果中缺失的推文逐条处理一次
+                for tweet in batch:
+                    if tweet["id"] not in results:
+                        monitor.process_tweet_within_budget(tweet)
+            else:
+                monitor.process_tweet_with_ai(batch[0]["text"])
+
+    return completions.requests, completions.prompt_tokens
+
+
+def main():
+    rng = random.Random(0)
+    words = "model launch agents reasoning open weights benchmark API release today".split()
+    tweets = [
+        {"id": str(1900000000000000000 + i), "text": " ".join(rng.choice(words) for _ in range(rng.randint(8, 40)))}
+        for i in range(200)
+    ]
+
+    print(f"模拟 {len(tweets)} 条短推文，服务商限制 {PROVIDER_RPM} RPM\n")
+    print(f"{'批量大小':>8} {'请求次数':>8} {'提示词tokens':>12} {'推文/分钟':>10}")
+    for batch_size in (1, 5, 10, 20):
+        requests_made, prompt_tokens = run(batch_size, tweets)
+        tweets_per_minute = len(tweets) * PROVIDER_RPM / requests_made
+        print(f"{batch_size:>8} {requests_made:>8} {prompt_tokens:>12} {tweets_per_minute:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
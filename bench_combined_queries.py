@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+合并账号查询基准测试
+
+模拟一轮没有新推文的扫描，对比逐账号查询与 (from:A OR from:B ...) 合并查询的请求次数。
+"""
+
+from datetime import datetime, timedelta
+
+import twitter_ai_monitor
+from twitter_ai_monitor import TwitterAIMonitor
+
+
+class FakeResponse:
+    """模拟 advanced_search 的空结果响应"""
+    status_code = 200
+    text = ""
+
+    def json(self):
+        return {"tweets": [], "has_next_page": False, "next_cursor": ""}
+
+
+class RequestCounter:
+    """替换 requests.get，统计请求次数"""
+
+    def __init__(self):
+        self.count = 0
+
+    def get(self, url, headers=None, params=None, timeout=None):
+        self.count += 1
+        return FakeResponse()
+
+
+def run_cycle(monitor, accounts, combine_queries):
+    """执行一轮抓取，返回请求次数"""
+    counter = RequestCounter()
+    original_get = twitter_ai_monitor.requests.get
+    twitter_ai_monitor.requests.get = counter.get
+    try:
+        until_time = datetime.utcnow()
+        since_time = until_time - timedelta(minutes=5)
+        if combine_queries:
+            monitor.get_tweets_from_accounts(accounts, since_time, until_time)
+        else:
+            for account in accounts:
+                monitor.get_tweets_from_account(account, since_time, until_time)
+    finally:
+        twitter_ai_monitor.requests.get = original_get
+    return counter.count
+
+
+def main():
+    monitor = TwitterAIMonitor("bench", "http://localhost", "bench")
+
+    print(f"{'账号数':>8} {'逐账号请求':>10} {'合并请求':>8} {'减少比例':>8} {'节省等待(秒)':>12}")
+    for size in (5, 20, 50, 100, 200):
+        accounts = [f"account_{i:03d}" for i in range(size)]
+
+        separate = run_cycle(monitor, accounts, combine_queries=False)
+        combined = run_cycle(monitor, accounts, combine_queries=True)
+
+        reduction = 1 - combined / separate
+        # 每两次请求之间固定等待5秒
+        saved_wait = (separate - combined) * 5
+        print(f"{size:>8} {separate:>10} {combined:>8} {reduction:>8.0%} {saved_wait:>12}")
+
+    print(f"\n单条查询长度上限: {twitter_ai_monitor.MAX_QUERY_LENGTH} 字符")
+
+
+if __name__ == "__main__":
+    main()
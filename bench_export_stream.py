@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流式导出与订阅源缓存基准测试
+
+生成合成推文归档，通过 Flask 测试客户端比较：
+- /api/tweets（整体构建列表再序列化）与 /api/export.ndjson（逐条流式输出）的耗时和内存峰值
+- 订阅源首次生成、缓存命中、ETag 条件请求（304）的耗时
+"""
+
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+from bench_snapshot import generate_archive
+from tweet_repository import TweetRepository
+
+DAYS = 60
+TWEETS_PER_DAY = 300
+FEED_REQUESTS = 200
+
+
+def measure(func) -> tuple:
+    """返回 (耗时ms, 内存峰值MB, 结果)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    elapsed = (time.perf_counter() - start) * 1000
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 1024 / 1024, result
+
+
+def main():
+    """主函数"""
+    import app
+
+    work_dir = tempfile.mkdtemp(prefix="bench_export_")
+    try:
+        data_dir = os.path.join(work_dir, "data")
+        generate_archive(data_dir, DAYS, TWEETS_PER_DAY)
+        client = app.app.test_client()
+        print(f"归档: {DAYS} 个日期文件 x {TWEETS_PER_DAY} 条 = {DAYS * TWEETS_PER_DAY} 条推文\n")
+
+        # 每次使用新的仓库，排除正文缓存的影响
+        app.tweet_repository = TweetRepository(data_dir, use_snapshot=False)
+        app.tweet_repository.count()
+        elapsed, peak, size = measure(lambda: len(client.get('/api/tweets').data))
+        print(f"/api/tweets         {elapsed:8.1f} ms  内存峰值 {peak:7.1f} MB  响应 {size / 1024 / 1024:.1f} MB")
+
+        app.tweet_repository = TweetRepository(data_dir, use_snapshot=False)
+        app.tweet_repository.count()
+
+        def stream():
+            response = client.get('/api/export.ndjson', buffered=False)
+            size = sum(len(chunk) for chunk in response.response)
+            response.close()
+            return size
+
+        elapsed, peak, size = measure(stream)
+        print(f"/api/export.ndjson  {elapsed:8.1f} ms  内存峰值 {peak:7.1f} MB  响应 {size / 1024 / 1024:.1f} MB")
+
+        print()
+        start = time.perf_counter()
+        first = client.get('/feeds/rss.xml?author=OpenAI')
+        print(f"订阅源首次生成: {(time.perf_counter() - start) * 1000:.2f} ms")
+
+        start = time.perf_counter()
+        for _ in range(FEED_REQUESTS):
+            client.get('/feeds/rss.xml?author=OpenAI')
+        print(f"缓存命中: {(time.perf_counter() - start) * 1000 / FEED_REQUESTS:.2f} ms/次")
+
+        etag = first.headers['ETag']
+        start = time.perf_counter()
+        for _ in range(FEED_REQUESTS):
+            assert client.get('/feeds/rss.xml?author=OpenAI', headers={'If-None-Match': etag}).status_code == 304
+        print(f"条件请求(304): {(time.perf_counter() - start) * 1000 / FEED_REQUESTS:.2f} ms/次")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+预写日志崩溃恢复基准测试
+
+在已有归档的基础上，只向 data/.journal.wal 追加记录而不合并到日期文件，
+并在日志末尾写入一行被截断的记录，模拟进程在保存过程中被强制结束。
+随后新建日志对象执行重放，测量恢复耗时并校验：
+- 所有已确认写入日志的推文都出现在日期文件中
+- 截断的记录被丢弃，日期文件仍是合法JSON，推文没有重复
+- 同时比较每条推文保存的耗时：预写日志（默认按批合并 / 每条立即合并）vs 直接覆盖写入
+"""
+
+import os
+import shutil
+import tempfile
+import time
+
+import json_codec
+from bench_snapshot import generate_archive
+from tweet_storage import DEFAULT_CHECKPOINT_EVERY, TweetJournal
+
+DAYS = 30
+TWEETS_PER_DAY = 200
+JOURNAL_RECORDS = 500
+
+
+def make_record(n: int) -> dict:
+    """生成一条待保存的推文"""
+    return {
+        'id': str(2000000000000000000 + n),
+        'author': "OpenAI",
+        'original_text': f"Crash test tweet {n}",
+        'ai_title': "崩溃测试",
+        'ai_translation': f"崩溃测试推文 {n}",
+        'ai_analysis': "用于验证预写日志恢复。",
+        'timestamp': "2025-01-30T12:00:00",
+        'processed_date': "2025-01-30"
+    }
+
+
+def simulate_crash(data_dir: str, filename: str, count: int):
+    """写入日志但不合并，末尾附加一行截断的记录"""
+    journal = TweetJournal(data_dir, checkpoint_every=count + 1)
+    for n in range(count):
+        journal.append(filename, make_record(n))
+    line = json_codec.dumps_bytes({'file': filename, 'record': make_record(count)})
+    with open(journal.journal_path(), 'ab') as f:
+        f.write(line[:len(line) // 2])
+
+
+def bench_save(data_dir: str, filename: str, count: int) -> tuple:
+    """比较逐条保存的耗时：预写日志（默认按批合并、每条立即合并）vs 直接覆盖写入"""
+    file_path = os.path.join(data_dir, filename)
+
+    timings = []
+    for offset, checkpoint_every in ((10 ** 6, DEFAULT_CHECKPOINT_EVERY), (3 * 10 ** 6, 1)):
+        journal = TweetJournal(data_dir, checkpoint_every=checkpoint_every)
+        start = time.perf_counter()
+        for n in range(count):
+            journal.append(filename, make_record(offset + n))
+        journal.checkpoint()
+        timings.append((time.perf_counter() - start) * 1000 / count)
+
+    start = time.perf_counter()
+    for n in range(count):
+        data = json_codec.load_file(file_path)
+        data.append(make_record(2 * 10 ** 6 + n))
+        json_codec.dump_file(file_path, data)
+    direct_ms = (time.perf_counter() - start) * 1000 / count
+    return timings[0], timings[1], direct_ms
+
+
+def main():
+    """主函数"""
+    work_dir = tempfile.mkdtemp(prefix="bench_journal_")
+    try:
+        data_dir = os.path.join(work_dir, "data")
+        generate_archive(data_dir, DAYS, TWEETS_PER_DAY)
+        filename = "tweets_2025-01-30.json"
+        file_path = os.path.join(data_dir, filename)
+        before = len(json_codec.load_file(file_path))
+
+        simulate_crash(data_dir, filename, JOURNAL_RECORDS)
+        journal_size = os.path.getsize(os.path.join(data_dir, ".journal.wal"))
+
+        start = time.perf_counter()
+        recovered = TweetJournal(data_dir).replay()
+        replay_ms = (time.perf_counter() - start) * 1000
+
+        data = json_codec.load_file(file_path)
+        ids = [item['id'] for item in data]
+        expected = {make_record(n)['id'] for n in range(JOURNAL_RECORDS)}
+        assert recovered == JOURNAL_RECORDS, recovered
+        assert expected <= set(ids), "日志中的推文未全部恢复"
+        assert make_record(JOURNAL_RECORDS)['id'] not in ids, "截断的记录不应被恢复"
+        assert len(ids) == len(set(ids)) == before + JOURNAL_RECORDS, "恢复后出现重复推文"
+        assert os.path.getsize(os.path.join(data_dir, ".journal.wal")) == 0
+
+        # 再次重放不应产生任何变化
+        assert TweetJournal(data_dir).replay() == 0
+
+        print(f"归档: {DAYS} 个日期文件 x {TWEETS_PER_DAY} 条")
+        print(f"崩溃前未合并日志: {JOURNAL_RECORDS} 条 + 1 条截断记录 ({journal_size / 1024:.1f} KB)")
+        print(f"重放耗时: {replay_ms:.1f} ms，恢复 {recovered} 条，校验通过")
+
+        batched_ms, every_ms, direct_ms = bench_save(data_dir, filename, 100)
+        print(f"逐条保存耗时: 预写日志（每 {DEFAULT_CHECKPOINT_EVERY} 条合并）{batched_ms:.2f} ms/条，"
+              f"预写日志（每条合并）{every_ms:.2f} ms/条，直接覆盖写入 {direct_ms:.2f} ms/条")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
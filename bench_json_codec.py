@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+JSON编解码基准测试
+
+使用 data/ 中真实的推文记录（复制到约1万条），对比标准库 json 与 orjson（如已安装）
+的编码/解码吞吐量，以及带缩进与紧凑格式的文件大小。
+"""
+
+import glob
+import json
+import time
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+TARGET_RECORDS = 10000
+ROUNDS = 5
+
+
+def load_records() -> list:
+    """读取真实推文记录并复制到目标数量"""
+    records = []
+    for file_path in sorted(glob.glob("data/tweets_*.json")):
+        with open(file_path, 'rb') as f:
+            records.extend(json.loads(f.read()))
+    if not records:
+        raise SystemExit("data/ 中没有推文数据")
+    return (records * (TARGET_RECORDS // len(records) + 1))[:TARGET_RECORDS]
+
+
+def best_of(func) -> float:
+    """多次运行取最短耗时（秒）"""
+    timings = []
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    records = load_records()
+    codecs = {
+        "json (indent=2)": (
+            lambda: json.dumps(records, ensure_ascii=False, indent=2).encode('utf-8'),
+            json.loads,
+        ),
+        "json (紧凑)": (
+            lambda: json.dumps(records, ensure_ascii=False, separators=(',', ':')).encode('utf-8'),
+            json.loads,
+        ),
+    }
+    if orjson is not None:
+        codecs["orjson (紧凑)"] = (lambda: orjson.dumps(records), orjson.loads)
+    else:
+        print("未安装 orjson，仅测试标准库\n")
+
+    print(f"记录数: {len(records)}")
+    print(f"{'编解码器':<16} {'大小(KB)':>10} {'编码(MB/s)':>12} {'解码(MB/s)':>12} {'编码(条/ms)':>12} {'解码(条/ms)':>12}")
+    for name, (encode, decode) in codecs.items():
+        payload = encode()
+        size_mb = len(payload) / 1024 / 1024
+        encode_s = best_of(encode)
+        decode_s = best_of(lambda: decode(payload))
+        print(f"{name:<16} {len(payload) / 1024:>10.0f} {size_mb / encode_s:>12.1f} {size_mb / decode_s:>12.1f} "
+              f"{len(records) / encode_s / 1000:>12.1f} {len(records) / decode_s / 1000:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多端点路由与对冲请求基准测试
+
+在本机启动几个 OpenAI 兼容的模拟服务（/v1/chat/completions），分别模拟：
+- tail：大多数请求很快，但 4% 的请求非常慢（长尾，p95 以内正常、p99 落在长尾上）
+- flaky：速度一般，30% 的请求返回 500
+- steady：速度稳定
+然后通过真实的 openai 客户端 + LLMRouter 发送请求，对比：
+- 只使用 tail 端点
+- 三个端点路由（失败切换，不对冲）
+- 三个端点路由 + 对冲请求
+- 两个都有长尾的端点：不对冲 vs 对冲
+输出每种方式的 p50/p95/p99 延迟和失败次数；最后模拟一个端点完全宕机，验证熔断。
+"""
+
+import contextlib
+import io
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from llm_router import LLMEndpoint, LLMRouter, LLMUnavailableError
+from tweet_priority import percentile
+
+REQUESTS = 300
+
+
+class FakeEndpoint:
+    """本地模拟的 OpenAI 兼容服务"""
+
+    def __init__(self, name: str, base_latency: float, tail_rate: float = 0.0,
+                 tail_latency: float = 0.0, error_rate: float = 0.0, seed: int = 0):
+        self.name = name
+        self.base_latency = base_latency
+        self.tail_rate = tail_rate
+        self.tail_latency = tail_latency
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.down = False
+        self.hits = 0
+        endpoint = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                with endpoint.lock:
+                    endpoint.hits += 1
+                    roll = endpoint.rng.random()
+                    slow = endpoint.rng.random() < endpoint.tail_rate
+                failed = endpoint.down or roll < endpoint.error_rate
+                time.sleep(endpoint.tail_latency if slow else endpoint.base_latency)
+                if failed:
+                    self.send_response(500)
+                    self.send_header('Content-Type', 'application/json')
+                    self.end_headers()
+                    self.wfile.write(b'{"error": {"message": "internal error"}}')
+                    return
+                payload = json.dumps({
+                    'id': 'chatcmpl-bench', 'object': 'chat.completion', 'created': int(time.time()),
+                    'model': body.get('model'),
+                    'choices': [{'index': 0, 'finish_reason': 'stop',
+                                 'message': {'role': 'assistant', 'content': f"来自 {endpoint.name} 的结果"}}],
+                    'usage': {'prompt_tokens': 10, 'completion_tokens': 5, 'total_tokens': 15},
+                }).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}/v1"
+
+    def endpoint(self) -> LLMEndpoint:
+        return LLMEndpoint(self.name, self.url, "bench", timeout=10)
+
+
+def run(router: LLMRouter, label: str):
+    """顺序发送请求，输出延迟分位数"""
+    latencies = []
+    failures = 0
+    with contextlib.redirect_stdout(io.StringIO()):
+        for n in range(REQUESTS):
+            start = time.perf_counter()
+            try:
+                router.complete(f"请求 {n}")
+            except LLMUnavailableError:
+                failures += 1
+            latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    print(f"{label:<22} p50 {percentile(latencies, 50) * 1000:7.0f} ms  "
+          f"p95 {percentile(latencies, 95) * 1000:7.0f} ms  p99 {percentile(latencies, 99) * 1000:7.0f} ms  "
+          f"失败 {failures:3d}  对冲 {router.hedged_requests}")
+
+
+def main():
+    tail = FakeEndpoint("tail", 0.03, tail_rate=0.04, tail_latency=1.0, seed=1)
+    flaky = FakeEndpoint("flaky", 0.06, error_rate=0.3, seed=2)
+    steady = FakeEndpoint("steady", 0.08, seed=3)
+    fakes = (tail, flaky, steady)
+
+    print(f"每种方式顺序发送 {REQUESTS} 次请求\n")
+    run(LLMRouter([tail.endpoint()], hedge=False), "单端点 tail")
+    run(LLMRouter([fake.endpoint() for fake in fakes], hedge=False), "路由（不对冲）")
+    run(LLMRouter([fake.endpoint() for fake in fakes], hedge=True, hedge_min_delay=0.15), "路由 + 对冲")
+
+    # 所有端点都有长尾时，只靠路由无法避开慢请求，对冲请求可以截断长尾
+    tail2 = FakeEndpoint("tail2", 0.03, tail_rate=0.04, tail_latency=1.0, seed=4)
+    print()
+    run(LLMRouter([tail.endpoint(), tail2.endpoint()], hedge=False), "两个长尾端点")
+    run(LLMRouter([tail.endpoint(), tail2.endpoint()], hedge=True, hedge_min_delay=0.15), "两个长尾端点 + 对冲")
+
+    # 端点宕机：熔断后请求不再发往该端点
+    steady.down = True
+    router = LLMRouter([steady.endpoint(), tail.endpoint()], hedge=False, failure_threshold=3, cooldown=60)
+    hits_before = steady.hits
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = [router.complete("宕机测试") for _ in range(30)]
+    assert all(result.startswith("来自 tail") for result in results)
+    print(f"\n端点宕机: 30 次请求全部由备用端点完成，宕机端点只收到 {steady.hits - hits_before} 次请求后被熔断")
+    for health in router.health():
+        print(f"  {health}")
+
+
+if __name__ == "__main__":
+    main()
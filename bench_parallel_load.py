@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+并行冷加载基准测试
+
+在不使用快照的情况下，对比不同进程数下 TweetRepository 首次 get_all_tweets 的耗时，
+并校验 k 路归并的结果与全量排序一致。
+"""
+
+import os
+import shutil
+import tempfile
+import time
+
+from bench_snapshot import generate_archive
+from tweet_repository import TweetRepository
+
+
+def cold_load(data_dir: str, workers: int) -> tuple:
+    """返回 (耗时毫秒, 推文列表)"""
+    start = time.perf_counter()
+    tweets = TweetRepository(data_dir, use_snapshot=False, load_workers=workers).get_all_tweets()
+    return (time.perf_counter() - start) * 1000, tweets
+
+
+def main():
+    cpu_count = os.cpu_count() or 1
+    worker_options = sorted({1, 2, 4, cpu_count})
+    print(f"CPU核数: {cpu_count}\n")
+    print(f"{'日期文件':>8} {'推文数':>8} " + " ".join(f"{f'{w}进程(ms)':>10}" for w in worker_options) + f" {'加速比':>6}")
+
+    for days, per_day in ((30, 100), (120, 150), (365, 275)):
+        data_dir = tempfile.mkdtemp(prefix="tweets_bench_")
+        try:
+            generate_archive(data_dir, days, per_day)
+            timings = []
+            baseline = None
+            for workers in worker_options:
+                elapsed, tweets = cold_load(data_dir, workers)
+                timings.append(elapsed)
+                if baseline is None:
+                    baseline = sorted(tweets, key=lambda x: x.get('timestamp', ''), reverse=True)
+                    assert [t['id'] for t in tweets] == [t['id'] for t in baseline]
+                else:
+                    assert [t['id'] for t in tweets] == [t['id'] for t in baseline]
+            speedup = timings[0] / min(timings)
+            print(f"{days:>8} {len(baseline):>8} " + " ".join(f"{t:>10.1f}" for t in timings) + f" {speedup:>6.2f}")
+        finally:
+            shutil.rmtree(data_dir)
+
+
+if __name__ == "__main__":
+    main()
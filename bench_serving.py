@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Web服务压测
+
+在临时目录生成合成的推文归档（默认 100k 条推文、365 个日期文件），以子进程启动Web服务，
+用多个并发客户端分别压测 /、/tweet/<id>、/api/tweets 和 /api/monitoring_status，
+输出每个路由的吞吐量（req/s）和延迟分位数。
+
+    python bench_serving.py                      # serve.py（生产模式）
+    python bench_serving.py --server dev         # Flask 开发服务器（python app.py 的调试模式，不含自动重载）
+    python bench_serving.py --tweets 20000 --days 90 --concurrency 16 --duration 10
+"""
+
+import argparse
+import http.client
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+from tweet_priority import percentile
+from tweet_storage import write_json_atomic
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+AUTHORS = ["OpenAI", "AnthropicAI", "GoogleAI", "MetaAI", "MistralAI", "xAI", "nvidia", "huggingface",
+           "DeepMind", "StabilityAI"]
+
+DEV_SERVER = r'''
+import sys
+from app import app
+app.run(debug=True, use_reloader=False, host="127.0.0.1", port=int(sys.argv[1]))
+'''
+
+
+def generate_archive(data_dir: str, tweets: int, days: int) -> list:
+    """
+    生成合成归档：推文平均分布到每天的日期文件
+
+    :return: 全部推文ID
+    """
+    rng = random.Random(42)
+    start = datetime(2025, 1, 1)
+    ids = []
+    per_day = tweets // days
+    for day in range(days):
+        date = start + timedelta(days=day)
+        count = per_day + (1 if day < tweets % days else 0)
+        records = []
+        for n in range(count):
+            created = date + timedelta(seconds=rng.randrange(86400))
+            tweet_id = str(1600000000000000000 + day * 100000 + n)
+            author = rng.choice(AUTHORS)
+            ids.append(tweet_id)
+            records.append({
+                'id': tweet_id,
+                'author': author,
+                'created_at': created.strftime("%a %b %d %H:%M:%S +0000 %Y"),
+                'original_text': f"{author} announces model update #{n} " + "lorem ipsum " * rng.randrange(5, 25),
+                'tweet_url': f"https://twitter.com/{author}/status/{tweet_id}",
+                'ai_title': f"{author} 发布更新 {n}",
+                'ai_translation': "合成的翻译内容。" * rng.randrange(3, 12),
+                'ai_analysis': "合成的解读内容。" * rng.randrange(3, 12),
+                'timestamp': created.isoformat(),
+                'processed_date': date.strftime("%Y-%m-%d"),
+            })
+        records.sort(key=lambda record: record['timestamp'])
+        write_json_atomic(os.path.join(data_dir, f"tweets_{date:%Y-%m-%d}.json"), records)
+    return ids
+
+
+def request(port: int, path: str, timeout: float = 120) -> int:
+    """发送一次GET请求并读完响应，返回状态码"""
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=timeout)
+    try:
+        conn.request("GET", path)
+        response = conn.getresponse()
+        response.read()
+        return response.status
+    finally:
+        conn.close()
+
+
+def wait_ready(port: int, process: subprocess.Popen, timeout: float = 60):
+    """等待服务可以响应请求"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("Web服务启动失败")
+        try:
+            request(port, "/api/monitoring_status", timeout=5)
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("等待Web服务启动超时")
+
+
+def load_test(port: int, paths, concurrency: int, duration: float) -> dict:
+    """
+    并发客户端在 duration 秒内持续请求
+
+    :param paths: 返回下一个请求路径的函数
+    :return: {'requests', 'errors', 'rps', 'p50', 'p95', 'p99'}（延迟单位毫秒）
+    """
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def client():
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                ok = request(port, paths()) == 200
+            except OSError:
+                ok = False
+            elapsed = time.perf_counter() - start
+            with lock:
+                if ok:
+                    latencies.append(elapsed)
+                else:
+                    errors[0] += 1
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': errors[0],
+        'rps': len(latencies) / wall,
+        'p50': percentile(latencies, 50) * 1000 if latencies else 0,
+        'p95': percentile(latencies, 95) * 1000 if latencies else 0,
+        'p99': percentile(latencies, 99) * 1000 if latencies else 0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Web服务压测")
+    parser.add_argument('--server', choices=('serve', 'dev'), default='serve', help="serve.py 或 Flask 开发服务器")
+    parser.add_argument('--tweets', type=int, default=100000, help="合成推文数")
+    parser.add_argument('--days', type=int, default=365, help="日期文件数")
+    parser.add_argument('--concurrency', type=int, default=8, help="并发客户端数")
+    parser.add_argument('--duration', type=float, default=10, help="每个路由的压测时长（秒）")
+    parser.add_argument('--port', type=int, default=5057, help="端口")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="bench_serving_")
+    data_dir = os.path.join(work_dir, "data")
+    os.makedirs(data_dir)
+    process = None
+    try:
+        started = time.perf_counter()
+        ids = generate_archive(data_dir, args.tweets, args.days)
+        print(f"生成归档: {len(ids)} 条推文，{args.days} 个日期文件，耗时 {time.perf_counter() - started:.1f}s")
+
+        env = dict(os.environ, PYTHONPATH=REPO_DIR + os.pathsep + os.environ.get('PYTHONPATH', ''))
+        if args.server == 'serve':
+            command = [sys.executable, os.path.join(REPO_DIR, "serve.py"), "--host", "127.0.0.1", "--port", str(args.port)]
+        else:
+            command = [sys.executable, "-c", DEV_SERVER, str(args.port)]
+        # 工作目录为临时目录：服务读取其中的 data/ 和（不存在的）config.json
+        log = open(os.path.join(work_dir, "server.log"), 'w')
+        process = subprocess.Popen(command, cwd=work_dir, env=env, stdout=log, stderr=subprocess.STDOUT)
+        wait_ready(args.port, process)
+
+        # 首次请求加载索引（冷启动），不计入压测
+        started = time.perf_counter()
+        request(args.port, "/api/tweets")
+        print(f"服务: {args.server}，首次加载归档 {time.perf_counter() - started:.1f}s，"
+              f"并发 {args.concurrency}，每个路由压测 {args.duration:g}s\n")
+
+        rng = random.Random(7)
+        routes = [
+            ("/", lambda: "/"),
+            ("/tweet/<id>", lambda: f"/tweet/{rng.choice(ids)}"),
+            ("/api/tweets", lambda: "/api/tweets"),
+            ("/api/monitoring_status", lambda: "/api/monitoring_status"),
+        ]
+        print(f"{'路由':<24}{'请求数':>8}{'错误':>6}{'req/s':>10}{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}")
+        for name, paths in routes:
+            result = load_test(args.port, paths, args.concurrency, args.duration)
+            print(f"{name:<24}{result['requests']:>8}{result['errors']:>6}{result['rps']:>10.1f}"
+                  f"{result['p50']:>10.1f}{result['p95']:>10.1f}{result['p99']:>10.1f}")
+    finally:
+        if process:
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+账号分片演示
+
+在临时数据目录中启动多个分片监控进程（模拟的推文接口和大模型客户端），过程中：
+- 强制杀死一个进程（kill -9），由其他进程在租约过期后接手其账号并重放其预写日志
+- 新加入一个进程，持有过多账号的进程释放多余账号
+- 最后向所有进程发送 SIGTERM 正常退出
+账号分配变化时输出，结束后校验日期文件：推文ID无重复、每个账号的推文在时间上连续（接手时没有遗漏）。
+模拟接口每个账号每2秒发布一条推文，推文ID由账号和发布时间决定，重复抓取会得到相同的ID。
+"""
+
+import contextlib
+import multiprocessing
+import os
+import re
+import shutil
+import signal
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from account_shards import LEASES_FILENAME, AccountLeaseStore, run_worker, worker_journal_filename
+from tweet_repository import TweetRepository
+from tweet_storage import load_day_records
+
+ACCOUNTS = ["OpenAI", "AnthropicAI", "GoogleAI", "MetaAI", "MistralAI", "xAI", "nvidia", "huggingface"]
+LEASE_SECONDS = 3
+PHASE_SECONDS = 8
+QUERY_TIME = re.compile(r"since:(\S+)Z until:(\S+)Z")
+
+
+def fake_search(query: str, accounts: list, high_water: dict = None, max_pages: int = 0, max_tweets: int = 0) -> tuple:
+    """模拟搜索接口：时间窗口 (since, until] 内每个账号每个偶数秒一条推文，一次返回全部结果"""
+    since, until = (datetime.strptime(value, "%Y-%m-%dT%H:%M:%S").replace(tzinfo=timezone.utc).timestamp()
+                    for value in QUERY_TIME.search(query).groups())
+    tweets = []
+    for account in accounts:
+        for second in range(int(since) + 1, int(until) + 1):
+            if second % 2 == 0:
+                created = datetime.fromtimestamp(second, timezone.utc)
+                tweets.append({
+                    'id': f"{account.lower()}-{second}", 'author': account, 'text': f"{account} update at {second}",
+                    'createdAt': created.strftime("%a %b %d %H:%M:%S %z %Y"),
+                })
+    return tweets, False
+
+
+def fake_completion(model, messages):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="模拟结果"))],
+                           usage=SimpleNamespace(prompt_tokens=20, completion_tokens=5))
+
+
+def worker(data_dir: str, worker_id: str):
+    """分片监控进程（输出写入临时目录下的 <进程ID>.log）"""
+    from twitter_ai_monitor import TwitterAIMonitor
+
+    log = open(os.path.join(os.path.dirname(data_dir), f"{worker_id}.log"), 'w', buffering=1)
+    with contextlib.redirect_stdout(log):
+        monitor = TwitterAIMonitor("bench", "http://127.0.0.1:9/v1", "bench", data_dir=data_dir,
+                                   options={"NEAR_DUPLICATE_THRESHOLD": 0}, journal_filename=worker_journal_filename(worker_id))
+        monitor._search_pages = fake_search
+        # 限流等待缩短到 50ms
+        monitor._pause = lambda seconds: monitor.stop_event.wait(0.05)
+        monitor.get_llm_router().endpoints[0].client = SimpleNamespace(
+            chat=SimpleNamespace(completions=SimpleNamespace(create=fake_completion)))
+        signal.signal(signal.SIGTERM, lambda *_: monitor.stop())
+        config = {"TARGET_ACCOUNTS": ACCOUNTS, "CHECK_INTERVAL": 1, "INITIAL_HOURS": 0.002}
+        run_worker(monitor, AccountLeaseStore(os.path.join(data_dir, LEASES_FILENAME), worker_id, LEASE_SECONDS),
+                   lambda: config)
+
+
+def watch(store: AccountLeaseStore, started: float, seconds: float, label: str):
+    """每0.5秒检查一次账号分配，变化时输出"""
+    print(f"--- {label}")
+    last = None
+    deadline = time.time() + seconds
+    while time.time() < deadline:
+        workers = store.status()['workers']
+        layout = "  ".join(f"{worker_id}: {len(accounts)}" for worker_id, accounts in sorted(workers.items()))
+        if layout != last:
+            print(f"  t+{time.time() - started:5.1f}s  {layout}")
+            last = layout
+        time.sleep(0.5)
+
+
+def start(data_dir: str, worker_id: str):
+    process = multiprocessing.Process(target=worker, args=(data_dir, worker_id), daemon=True)
+    process.start()
+    return process
+
+
+def main():
+    work_dir = tempfile.mkdtemp(prefix="bench_shards_")
+    data_dir = os.path.join(work_dir, "data")
+    os.makedirs(data_dir)
+    store = AccountLeaseStore(os.path.join(data_dir, LEASES_FILENAME), "observer", LEASE_SECONDS)
+    started = time.time()
+    ok = False
+    try:
+        print(f"{len(ACCOUNTS)} 个账号，租约 {LEASE_SECONDS}s，检查间隔 1s")
+        processes = {worker_id: start(data_dir, worker_id) for worker_id in ("w1", "w2", "w3")}
+        watch(store, started, PHASE_SECONDS, "启动 w1 w2 w3")
+
+        os.kill(processes["w2"].pid, signal.SIGKILL)
+        watch(store, started, PHASE_SECONDS, "kill -9 w2")
+
+        processes["w4"] = start(data_dir, "w4")
+        watch(store, started, PHASE_SECONDS, "加入 w4")
+
+        stop_time = time.time()
+        for worker_id, process in processes.items():
+            if process.is_alive():
+                process.terminate()
+        for process in processes.values():
+            process.join(timeout=30)
+        print(f"--- SIGTERM 全部进程，退出后剩余租约: {store.status()['workers'] or '无'}")
+
+        ids = []
+        for filename in TweetRepository(data_dir, use_snapshot=False).list_day_files():
+            ids.extend(record['id'] for record in load_day_records(os.path.join(data_dir, filename)))
+        duplicates = [tweet_id for tweet_id, count in Counter(ids).items() if count > 1]
+
+        seconds_by_account = defaultdict(list)
+        for tweet_id in ids:
+            account, second = tweet_id.rsplit('-', 1)
+            seconds_by_account[account].append(int(second))
+        gaps = {}
+        for account, seconds in seconds_by_account.items():
+            seconds.sort()
+            widest = max((b - a for a, b in zip(seconds, seconds[1:])), default=0)
+            if widest > 2:
+                gaps[account] = widest
+        late = [account for account in ACCOUNTS if max(seconds_by_account[account.lower()], default=0) < stop_time - 4]
+
+        print(f"\n保存推文 {len(ids)} 条，覆盖 {len(seconds_by_account)}/{len(ACCOUNTS)} 个账号")
+        print(f"重复ID: {len(duplicates)}")
+        print(f"时间线缺口: {gaps or '无'}")
+        print(f"结束前停止更新的账号: {late or '无'}")
+        ok = not duplicates and not gaps and not late and len(seconds_by_account) == len(ACCOUNTS)
+        print("✅ 校验通过" if ok else f"❌ 校验失败，进程日志见 {work_dir}")
+    finally:
+        # 校验失败时保留临时目录，便于查看各进程日志
+        if ok:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+索引快照基准测试
+
+生成合成推文归档，新建仓库后分别测量：
+- 首屏索引：作者列表 + 按ID查找一条推文（详情页所需）
+- 全量读取：get_all_tweets（首页所需）
+
+对比三种情况：没有快照的冷启动、快照与所有文件一致的热启动、只有当天文件变化。
+"""
+
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from tweet_repository import TweetRepository
+
+AUTHORS = ["OpenAI", "Google", "AnthropicAI", "MetaAI", "nvidia", "MistralAI", "xai", "huggingface"]
+
+
+def generate_archive(data_dir: str, days: int, tweets_per_day: int, seed: int = 0):
+    """
+    生成合成推文归档（与监控写入的格式一致）
+
+    :param data_dir: 目标目录
+    :param days: 日期文件数量
+    :param tweets_per_day: 每个文件的推文数
+    :param seed: 随机种子
+    """
+    rng = random.Random(seed)
+    os.makedirs(data_dir, exist_ok=True)
+    start = datetime(2025, 1, 1)
+    tweet_id = 1900000000000000000
+    for day in range(days):
+        date = start + timedelta(days=day)
+        records = []
+        for n in range(tweets_per_day):
+            tweet_id += rng.randint(1, 1000)
+            author = rng.choice(AUTHORS)
+            timestamp = date + timedelta(seconds=n * 86400 // tweets_per_day)
+            records.append({
+                'id': str(tweet_id),
+                'author': author,
+                'created_at': timestamp.strftime("%a %b %d %H:%M:%S +0000 %Y"),
+                'original_text': "New release: " + " ".join(rng.choice(["model", "agents", "open", "weights", "benchmark", "API"]) for _ in range(30)),
+                'tweet_url': f"https://twitter.com/{author}/status/{tweet_id}",
+                'ai_title': "新模型发布：" + "智能体" * 5,
+                'ai_translation': "新版本发布：" + "模型 智能体 开放 权重 " * 10,
+                'ai_analysis': "该推文宣布了新模型的发布。" * 12,
+                'timestamp': timestamp.isoformat(),
+                'processed_date': date.strftime("%Y-%m-%d")
+            })
+        with open(os.path.join(data_dir, f"tweets_{date.strftime('%Y-%m-%d')}.json"), 'w', encoding='utf-8') as f:
+            json.dump(records, f, ensure_ascii=False, indent=2)
+
+
+def timed_load(data_dir: str, tweet_id: str) -> tuple:
+    """新建仓库，返回 (首屏索引耗时毫秒, 全量读取耗时毫秒, 推文数)"""
+    start = time.perf_counter()
+    repository = TweetRepository(data_dir)
+    repository.get_authors()
+    assert repository.get_tweet(tweet_id) is not None
+    index_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    count = len(repository.get_all_tweets())
+    full_ms = (time.perf_counter() - start) * 1000
+    return index_ms, full_ms, count
+
+
+def main():
+    print(f"{'日期文件':>8} {'推文数':>8} {'场景':<8} {'首屏索引(ms)':>12} {'全量读取(ms)':>12}")
+    for days, per_day in ((30, 100), (120, 150), (365, 275)):
+        data_dir = tempfile.mkdtemp(prefix="tweets_bench_")
+        try:
+            generate_archive(data_dir, days, per_day)
+            with open(os.path.join(data_dir, sorted(os.listdir(data_dir))[days // 2]), 'r', encoding='utf-8') as f:
+                tweet_id = json.load(f)[0]['id']
+
+            results = [("冷启动",) + timed_load(data_dir, tweet_id), ("热启动",) + timed_load(data_dir, tweet_id)]
+
+            # 修改最后一天的文件，模拟监控写入新推文
+            last_file = sorted(f for f in os.listdir(data_dir) if f.startswith("tweets_"))[-1]
+            last_path = os.path.join(data_dir, last_file)
+            with open(last_path, 'r', encoding='utf-8') as f:
+                records = json.load(f)
+            records.append(dict(records[-1], id="1"))
+            with open(last_path, 'w', encoding='utf-8') as f:
+                json.dump(records, f, ensure_ascii=False, indent=2)
+            results.append(("当天变化",) + timed_load(data_dir, tweet_id))
+
+            for name, index_ms, full_ms, count in results:
+                print(f"{days:>8} {count:>8} {name:<8} {index_ms:>12.1f} {full_ms:>12.1f}")
+        finally:
+            shutil.rmtree(data_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Web冷启动基准测试
+
+在独立子进程中测量：
+- 导入 app.py 的耗时，以及是否加载了 openai
+- 首次和再次请求 /、/tweet/<id>、/api/tweets 的延迟
+"""
+
+import json
+import subprocess
+import sys
+
+RUNS = 5
+
+CHILD_SCRIPT = r'''
+import json, sys, time
+start = time.perf_counter()
+import app
+import_ms = (time.perf_counter() - start) * 1000
+
+client = app.app.test_client()
+tweets = app.tweet_repository.get_all_tweets()
+tweet_id = tweets[0]['id'] if tweets else 'missing'
+
+timings = {}
+for name, path in (('/', '/'), ('/tweet/<id>', f'/tweet/{tweet_id}'), ('/api/tweets', '/api/tweets')):
+    first = time.perf_counter()
+    client.get(path)
+    first_ms = (time.perf_counter() - first) * 1000
+    second = time.perf_counter()
+    client.get(path)
+    second_ms = (time.perf_counter() - second) * 1000
+    timings[name] = (first_ms, second_ms)
+
+print(json.dumps({
+    'import_ms': import_ms,
+    'openai_loaded': 'openai' in sys.modules,
+    'tweets': len(tweets),
+    'timings': timings,
+}))
+'''
+
+
+def main():
+    results = []
+    for _ in range(RUNS):
+        output = subprocess.run([sys.executable, '-c', CHILD_SCRIPT], capture_output=True, text=True, check=True).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+
+    def median(values):
+        values = sorted(values)
+        return values[len(values) // 2]
+
+    print(f"运行 {RUNS} 次取中位数，推文数: {results[0]['tweets']}")
+    print(f"导入 app.py: {median([r['import_ms'] for r in results]):.1f} ms "
+          f"(openai 已加载: {results[0]['openai_loaded']})")
+    print(f"{'路由':<14} {'首次请求(ms)':>12} {'再次请求(ms)':>12}")
+    for name in results[0]['timings']:
+        first = median([r['timings'][name][0] for r in results])
+        second = median([r['timings'][name][1] for r in results])
+        print(f"{name:<14} {first:>12.2f} {second:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,8 +4,11 @@
 清理重复推文数据脚本
 """
 
-import json
 import os
+
+import json_codec
+from tweet_stats import TweetStats
+from tweet_storage import data_dir_lock, write_json_atomic
 from datetime import datetime
 
 def clean_duplicate_tweets(file_path):
@@ -19,60 +22,59 @@ def clean_duplicate_tweets(file_path):
         print(f"文件不存在: {file_path}")
         return 0
     
-    # 读取现有数据
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-    except Exception as e:
-        print(f"读取文件失败: {e}")
-        return 0
-    
-    if not isinstance(data, list):
-        print("数据格式错误，应该是列表")
-        return 0
-    
-    print(f"原始数据条数: {len(data)}")
-    
-    # 按ID去重，保留第一次出现的
-    seen_ids = set()
-    unique_data = []
-    duplicate_count = 0
-    
-    for item in data:
-        tweet_id = item.get('id')
-        if tweet_id:
-            if tweet_id not in seen_ids:
-                seen_ids.add(tweet_id)
-                unique_data.append(item)
+    # 在数据目录写锁内读取和写回，避免覆盖监控进程同时合并写入的新推文
+    with data_dir_lock(os.path.dirname(file_path)):
+        # 读取现有数据
+        try:
+            data = json_codec.load_file(file_path)
+        except Exception as e:
+            print(f"读取文件失败: {e}")
+            return 0
+        
+        if not isinstance(data, list):
+            print("数据格式错误，应该是列表")
+            return 0
+        
+        print(f"原始数据条数: {len(data)}")
+        
+        # 按ID去重，保留第一次出现的
+        seen_ids = set()
+        unique_data = []
+        duplicate_count = 0
+        
+        for item in data:
+            tweet_id = item.get('id')
+            if tweet_id:
+                if tweet_id not in seen_ids:
+                    seen_ids.add(tweet_id)
+                    unique_data.append(item)
+                else:
+                    duplicate_count += 1
+                    print(f"移除重复推文: {tweet_id} - {item.get('author', 'Unknown')}")
             else:
-                duplicate_count += 1
-                print(f"移除重复推文: {tweet_id} - {item.get('author', 'Unknown')}")
-        else:
-            # 没有ID的数据也保留
-            unique_data.append(item)
-    
-    print(f"清理后数据条数: {len(unique_data)}")
-    print(f"移除重复数据: {duplicate_count} 条")
-    
-    # 备份原文件
-    backup_path = file_path + '.backup'
-    try:
-        with open(backup_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-        print(f"原文件已备份到: {backup_path}")
-    except Exception as e:
-        print(f"备份失败: {e}")
-    
-    # 写入清理后的数据
-    try:
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(unique_data, f, ensure_ascii=False, indent=2)
-        print(f"清理完成，数据已保存到: {file_path}")
-    except Exception as e:
-        print(f"保存失败: {e}")
-        return 0
-    
-    return duplicate_count
+                # 没有ID的数据也保留
+                unique_data.append(item)
+        
+        print(f"清理后数据条数: {len(unique_data)}")
+        print(f"移除重复数据: {duplicate_count} 条")
+        
+        # 备份原文件
+        backup_path = file_path + '.backup'
+        try:
+            write_json_atomic(backup_path, data)
+            print(f"原文件已备份到: {backup_path}")
+        except Exception as e:
+            print(f"备份失败: {e}")
+        
+        # 写入清理后的数据
+        try:
+            write_json_atomic(file_path, unique_data)
+            print(f"清理完成，数据已保存到: {file_path}")
+        except Exception as e:
+            print(f"保存失败: {e}")
+            return 0
+        
+        return duplicate_count
 
 def main():
     """主函数"""
@@ -101,6 +103,10 @@ def main():
         total_cleaned += cleaned
     
     print(f"\n总计清理重复数据: {total_cleaned} 条")
+    
+    # 移除了数据时重建统计汇总，保持计数一致
+    if total_cleaned:
+        TweetStats(data_dir).rebuild()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+JSON编解码层
+
+所有推文数据文件、配置文件和API响应的读写都经过这里。
+安装了 orjson 时使用 orjson，否则回退到标准库 json；
+可通过环境变量 AI_NEWS_JSON_CODEC=json 强制使用标准库。
+
+数据文件默认写成紧凑格式，配置文件等需要手工编辑的文件可使用 pretty=True。
+"""
+
+import json
+import os
+
+# 解码失败时抛出的异常（orjson.JSONDecodeError 是 json.JSONDecodeError 的子类）
+DecodeError = json.JSONDecodeError
+
+try:
+    if os.environ.get("AI_NEWS_JSON_CODEC", "").lower() in ("json", "stdlib"):
+        raise ImportError
+    import orjson
+    BACKEND = "orjson"
+except ImportError:
+    orjson = None
+    BACKEND = "json"
+
+
+def loads(data):
+    """
+    解析JSON
+
+    :param data: JSON字符串或UTF-8字节串
+    :return: 解析结果
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps_bytes(obj, pretty: bool = False) -> bytes:
+    """
+    序列化为UTF-8编码的JSON字节串（中文不转义）
+
+    :param obj: 要序列化的对象
+    :param pretty: 是否使用两个空格缩进
+    :return: JSON字节串
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if pretty else 0)
+    if pretty:
+        return json.dumps(obj, ensure_ascii=False, indent=2).encode('utf-8')
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def dumps(obj, pretty: bool = False) -> str:
+    """
+    序列化为JSON字符串（中文不转义）
+
+    :param obj: 要序列化的对象
+    :param pretty: 是否使用两个空格缩进
+    :return: JSON字符串
+    """
+    return dumps_bytes(obj, pretty).decode('utf-8')
+
+
+def load_file(file_path: str):
+    """
+    读取JSON文件
+
+    :param file_path: 文件路径
+    :return: 解析结果
+    """
+    with open(file_path, 'rb') as f:
+        return loads(f.read())
+
+
+def dump_file(file_path: str, obj, pretty: bool = False):
+    """
+    写入JSON文件
+
+    :param file_path: 文件路径
+    :param obj: 要写入的对象
+    :param pretty: 是否使用两个空格缩进
+    """
+    with open(file_path, 'wb') as f:
+        f.write(dumps_bytes(obj, pretty))
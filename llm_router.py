@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多大模型端点路由
+
+配置多个 OpenAI 兼容的端点（URL + API Key + 模型），每次请求：
+- 按健康度排序选择端点：延迟的指数加权移动平均（EWMA）× 错误率惩罚，没有样本的端点优先试探
+- 连续失败达到阈值的端点熔断一段时间，冷却后放行请求试探（半开），成功即恢复
+- 请求失败时立即切换到下一个端点；只有一个可用端点时，限流、服务端错误和超时等临时错误退避后重试该端点（有次数上限）
+- 开启对冲时，若请求超过该端点的 p95 延迟仍未返回，同时向下一个端点发出相同请求，采用先返回的结果；
+  端点的延迟样本不足以估计 p95 时不对冲
+- 所有端点都失败时抛出 LLMUnavailableError，由调用方决定稍后重试，不会把失败占位文本当作结果
+- 每次成功请求（包括被对冲超越、结果未被采用的请求）的 token 用量通过 usage_listener 回调上报
+- 对冲请求会额外消耗 token，发出前先询问 hedge_guard 回调（如 token 预算检查），不放行时只等待原请求
+
+配置示例（config.json）：
+    "LLM_ENDPOINTS": [
+        {"name": "qwen", "url": "https://dashscope.aliyuncs.com/compatible-mode/v1", "api_key": "sk-...", "model": "qwen-plus"},
+        {"name": "backup", "url": "http://127.0.0.1:8000/v1", "api_key": "sk-...", "model": "qwen-plus", "timeout": 30}
+    ]
+未配置 LLM_ENDPOINTS 时使用 LLM_URL / LLM_API_KEY 作为唯一端点。
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from tweet_priority import percentile
+
+# 默认模型
+DEFAULT_MODEL = "qwen-plus"
+# 单次请求超时（秒）
+DEFAULT_TIMEOUT = 60.0
+# EWMA 平滑系数，越大越偏重最近的请求
+EWMA_ALPHA = 0.3
+# 错误率对排序分数的惩罚倍数：错误率为1时分数放大到 1 + ERROR_PENALTY 倍
+ERROR_PENALTY = 4.0
+# 计算 p95 所需的最少延迟样本数，不足时不对冲
+MIN_LATENCY_SAMPLES = 20
+# 只有一个可用端点时，临时错误的最多重试次数
+SINGLE_ENDPOINT_RETRIES = 2
+# 重试前的退避时间（秒），每次重试翻倍
+RETRY_BACKOFF = 1.0
+# 视为临时错误、可以重试的 HTTP 状态码（5xx 同样重试）
+RETRYABLE_STATUS_CODES = (408, 409, 429)
+
+
+class LLMUnavailableError(Exception):
+    """所有大模型端点均不可用或请求失败"""
+
+
+def is_transient_error(error: Exception) -> bool:
+    """
+    判断请求错误是否为临时错误：限流、服务端错误，或没有状态码的连接错误和超时
+
+    :param error: 请求抛出的异常
+    :return: 是否值得重试
+    """
+    status = getattr(error, 'status_code', None)
+    return status is None or status in RETRYABLE_STATUS_CODES or status >= 500
+
+
+class LLMEndpoint:
+    """单个 OpenAI 兼容端点及其健康状态"""
+
+    def __init__(self, name: str, url: str, api_key: str, model: str = DEFAULT_MODEL,
+                 timeout: float = DEFAULT_TIMEOUT, latency_samples: int = 100):
+        """
+        :param name: 端点名称（用于日志和状态展示）
+        :param url: 接口 base_url
+        :param api_key: API Key
+        :param model: 模型名称
+        :param timeout: 单次请求超时（秒）
+        :param latency_samples: 保留最近多少次成功请求的延迟用于计算 p95
+        """
+        self.name = name
+        self.url = url
+        self.api_key = api_key
+        self.model = model
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.client = None
+        self.ewma_latency = None
+        self.ewma_error = 0.0
+        self.latencies = deque(maxlen=latency_samples)
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.requests = 0
+        self.failures = 0
+
+    def get_client(self):
+        """获取客户端，首次调用时创建；失败切换和重试由路由器负责，客户端不再自动重试"""
+        if self.client is None:
+            from openai import OpenAI
+            self.client = OpenAI(api_key=self.api_key, base_url=self.url, timeout=self.timeout, max_retries=0)
+        return self.client
+
+    def complete(self, prompt: str) -> tuple:
+        """
+        发送请求
+
+        :param prompt: 输入提示词
+        :return: (模型回复, token用量)；服务未返回用量时用量为None
+        """
+        completion = self.get_client().chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": "You are a helpful assistant."},
+                {"role": "user", "content": prompt},
+            ]
+        )
+        content = completion.choices[0].message.content
+        if not content:
+            raise ValueError("模型返回空内容")
+        usage = getattr(completion, 'usage', None)
+        if usage is not None:
+            usage = {
+                'prompt_tokens': getattr(usage, 'prompt_tokens', 0) or 0,
+                'completion_tokens': getattr(usage, 'completion_tokens', 0) or 0,
+            }
+        return content, usage
+
+    def record(self, latency: float, success: bool, failure_threshold: int, cooldown: float):
+        """
+        记录一次请求结果，更新 EWMA 和熔断状态
+
+        :param latency: 请求耗时（秒）
+        :param success: 是否成功
+        :param failure_threshold: 连续失败多少次后熔断
+        :param cooldown: 熔断时长（秒）
+        """
+        with self.lock:
+            self.requests += 1
+            self.ewma_error = EWMA_ALPHA * (0.0 if success else 1.0) + (1 - EWMA_ALPHA) * self.ewma_error
+            if success:
+                self.latencies.append(latency)
+                self.ewma_latency = latency if self.ewma_latency is None else \
+                    EWMA_ALPHA * latency + (1 - EWMA_ALPHA) * self.ewma_latency
+                self.consecutive_failures = 0
+                self.open_until = 0.0
+            else:
+                self.failures += 1
+                self.consecutive_failures += 1
+                if self.consecutive_failures >= failure_threshold:
+                    if not self.open_until:
+                        print(f"⚡ 大模型端点 {self.name} 连续失败 {self.consecutive_failures} 次，熔断 {cooldown:.0f} 秒")
+                    self.open_until = time.monotonic() + cooldown
+
+    def available(self, now: float) -> bool:
+        """未熔断或已过冷却期（半开）时可用"""
+        return now >= self.open_until
+
+    def score(self) -> float:
+        """排序分数，越小越优先；没有延迟样本的端点为0，优先试探"""
+        return (self.ewma_latency or 0.0) * (1 + ERROR_PENALTY * self.ewma_error)
+
+    def p95(self) -> float:
+        """最近成功请求的 p95 延迟，样本不足时返回None"""
+        with self.lock:
+            if len(self.latencies) < MIN_LATENCY_SAMPLES:
+                return None
+            samples = sorted(self.latencies)
+        return percentile(samples, 95)
+
+    def health(self) -> dict:
+        """
+        端点健康状态
+
+        :return: 状态字典
+        """
+        p95 = self.p95()
+        return {
+            'name': self.name,
+            'model': self.model,
+            'ewma_latency': round(self.ewma_latency, 3) if self.ewma_latency is not None else None,
+            'error_rate': round(self.ewma_error, 3),
+            'p95_latency': round(p95, 3) if p95 is not None else None,
+            'requests': self.requests,
+            'failures': self.failures,
+            'circuit_open': time.monotonic() < self.open_until,
+        }
+
+
+class LLMRouter:
+    """按健康度路由、失败切换并可对冲请求的大模型客户端"""
+
+    def __init__(self, endpoints: list, hedge: bool = True, hedge_min_delay: float = 2.0,
+                 failure_threshold: int = 3, cooldown: float = 30.0, single_endpoint_retries: int = SINGLE_ENDPOINT_RETRIES):
+        """
+        :param endpoints: LLMEndpoint 列表
+        :param hedge: 是否在超过 p95 延迟后向下一个端点发出对冲请求
+        :param hedge_min_delay: 对冲前的最短等待（秒）；延迟样本不足 MIN_LATENCY_SAMPLES 时不对冲
+        :param failure_threshold: 连续失败多少次后熔断
+        :param cooldown: 熔断时长（秒）
+        :param single_endpoint_retries: 只有一个可用端点时，临时错误的最多重试次数
+        """
+        if not endpoints:
+            raise ValueError("至少需要配置一个大模型端点")
+        self.endpoints = endpoints
+        self.hedge = hedge
+        self.hedge_min_delay = hedge_min_delay
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.single_endpoint_retries = single_endpoint_retries
+        self.hedged_requests = 0
+        self.retried_requests = 0
+        # token用量回调：usage_listener(端点, 提示词, 回复, 用量或None, 调用上下文)
+        self.usage_listener = None
+        # 对冲前的检查回调：hedge_guard(提示词, 调用上下文) -> 是否允许发出对冲请求
+        self.hedge_guard = None
+        # 被对冲超越的请求不会被取消，在后台完成后仍计入端点统计
+        self.executor = ThreadPoolExecutor(max_workers=max(4, 4 * len(endpoints)), thread_name_prefix="llm")
+
+    @classmethod
+    def from_config(cls, llm_url: str, llm_api_key: str, llm_endpoints: list = None, **kwargs):
+        """
+        根据配置创建路由器
+
+        :param llm_url: 默认端点URL（未配置 llm_endpoints 时使用）
+        :param llm_api_key: 默认端点API Key
+        :param llm_endpoints: 端点配置列表，每项包含 url、api_key，可选 name、model、timeout
+        :return: LLMRouter
+        """
+        configs = llm_endpoints or [{'name': 'default', 'url': llm_url, 'api_key': llm_api_key}]
+        endpoints = [
+            LLMEndpoint(
+                config.get('name') or f"endpoint-{index + 1}",
+                config['url'],
+                config.get('api_key', ''),
+                config.get('model') or DEFAULT_MODEL,
+                float(config.get('timeout') or DEFAULT_TIMEOUT),
+            )
+            for index, config in enumerate(configs)
+        ]
+        return cls(endpoints, **kwargs)
+
+    def ranked_endpoints(self) -> list:
+        """
+        可用端点按健康度排序；全部熔断时返回空列表
+
+        :return: LLMEndpoint 列表
+        """
+        now = time.monotonic()
+        return sorted((ep for ep in self.endpoints if ep.available(now)), key=lambda ep: ep.score())
+
+    def _call(self, endpoint: LLMEndpoint, prompt: str, context) -> str:
+        """在线程池中调用端点，记录健康状态并上报token用量"""
+        start = time.monotonic()
+        try:
+            content, usage = endpoint.complete(prompt)
+        except Exception:
+            endpoint.record(time.monotonic() - start, False, self.failure_threshold, self.cooldown)
+            raise
+        endpoint.record(time.monotonic() - start, True, self.failure_threshold, self.cooldown)
+        if self.usage_listener:
+            try:
+                self.usage_listener(endpoint, prompt, content, usage, context)
+            except Exception as e:
+                print(f"记录token用量失败: {e}")
+        return content
+
+    def _hedge_delay(self, endpoint: LLMEndpoint):
+        """端点的对冲等待时间：p95 延迟，至少 hedge_min_delay；样本不足、无法估计 p95 时返回None（不对冲）"""
+        p95 = endpoint.p95()
+        return max(self.hedge_min_delay, p95) if p95 is not None else None
+
+    def _hedge_allowed(self, prompt: str, context) -> bool:
+        """询问 hedge_guard 是否允许对冲，回调出错时不对冲"""
+        try:
+            return bool(self.hedge_guard(prompt, context))
+        except Exception as e:
+            print(f"对冲检查失败，不发出对冲请求: {e}")
+            return False
+
+    def complete(self, prompt: str, context=None) -> str:
+        """
+        发送请求，失败时切换端点，慢请求按需对冲
+
+        :param prompt: 输入提示词
+        :param context: 调用上下文，原样传给 usage_listener（如账号、提示词类型）
+        :return: 模型回复
+        :raises LLMUnavailableError: 所有端点都熔断或请求失败
+        """
+        candidates = self.ranked_endpoints()
+        if not candidates:
+            raise LLMUnavailableError("所有大模型端点均处于熔断状态")
+
+        pending = {}
+        errors = []
+        next_index = 0
+
+        def launch():
+            nonlocal next_index
+            endpoint = candidates[next_index]
+            next_index += 1
+            pending[self.executor.submit(self._call, endpoint, prompt, context)] = endpoint
+            return endpoint
+
+        last_launched = launch()
+        hedge_blocked = False
+        retries = 0
+        last_error = None
+        while pending:
+            can_hedge = self.hedge and not hedge_blocked and next_index < len(candidates)
+            done, _ = wait(pending, timeout=self._hedge_delay(last_launched) if can_hedge else None,
+                           return_when=FIRST_COMPLETED)
+            if not done:
+                if self.hedge_guard and not self._hedge_allowed(prompt, context):
+                    # 不允许对冲（如预算不足）：本次请求继续等待已发出的请求
+                    hedge_blocked = True
+                    continue
+                # 超过 p95 延迟仍未返回：同时请求下一个端点
+                self.hedged_requests += 1
+                last_launched = launch()
+                continue
+
+            for future in done:
+                endpoint = pending.pop(future)
+                try:
+                    return future.result()
+                except Exception as e:
+                    errors.append(f"{endpoint.name}: {e}")
+                    last_error = e
+
+            # 请求失败且没有仍在进行的请求时，立即切换到下一个端点
+            if not pending and next_index < len(candidates):
+                last_launched = launch()
+            elif (not pending and len(candidates) == 1 and retries < self.single_endpoint_retries
+                  and is_transient_error(last_error) and candidates[0].available(time.monotonic())):
+                # 只有一个可用端点：临时错误退避后重试，避免一次限流就让推文延后一整轮
+                time.sleep(RETRY_BACKOFF * 2 ** retries)
+                retries += 1
+                self.retried_requests += 1
+                next_index = 0
+                last_launched = launch()
+
+        raise LLMUnavailableError("所有大模型端点请求失败: " + "; ".join(errors))
+
+    def health(self) -> list:
+        """
+        各端点健康状态
+
+        :return: 状态字典列表
+        """
+        return [endpoint.health() for endpoint in self.endpoints]
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+独立进程运行监控，与Web进程解耦
+
+生产部署时（serve.py）Web进程只负责页面和接口，可以多线程或多进程运行；监控在本进程中运行，
+两者只通过数据目录中的两个文件通信：
+- .monitor_status.json：本进程每 STATUS_INTERVAL 秒写入一次监控状态（与设置页展示的字段相同）和心跳时间，
+  Web进程读取它展示状态，超过 STATUS_STALE_SECONDS 未更新视为监控进程未运行
+- .monitor_command.json：设置页的「启动 / 停止 / 立即扫描 / 性能分析」写入命令（带递增序号），本进程轮询执行
+config.json 修改后（如在设置页保存），运行中的监控自动应用新的账号列表、检查间隔和追踪开关。
+
+用法：
+    python monitor_service.py            # 等待设置页启动监控
+    python monitor_service.py --start    # 立即开始监控
+"""
+
+import argparse
+import os
+import signal
+import threading
+import time
+from datetime import datetime
+
+import json_codec
+from tweet_storage import write_json_atomic
+
+# 监控状态文件名和命令文件名（以.开头，不会被当作日期文件）
+STATUS_FILENAME = ".monitor_status.json"
+COMMAND_FILENAME = ".monitor_command.json"
+# Web进程据此环境变量判断监控运行方式：embedded（Web进程内的线程，默认）或 external（本进程）
+MONITOR_MODE_ENV = "AI_NEWS_MONITOR_MODE"
+# 状态文件写入间隔和命令轮询间隔（秒）
+STATUS_INTERVAL = 1.0
+# 状态文件超过该时长未更新时，视为监控进程未运行
+STATUS_STALE_SECONDS = 10
+# 停止监控时等待线程退出的时间（秒）
+STOP_TIMEOUT = 3
+
+# 监控状态的初始值（Web进程内运行时同样使用）
+INITIAL_STATUS = {
+    "running": False,
+    "last_update": None,
+    "current_status": "待机中",
+    "processed_tweets": 0,
+    "current_account": "",
+    "next_check_time": None,
+    "last_result": "暂无结果"
+}
+
+
+def read_status(data_dir: str = "data") -> dict:
+    """
+    读取监控进程写入的状态
+
+    :param data_dir: 数据目录
+    :return: 状态字典；监控进程未运行时 service_alive 为 False、running 为 False
+    """
+    status = None
+    try:
+        status = json_codec.load_file(os.path.join(data_dir, STATUS_FILENAME))
+    except (OSError, json_codec.DecodeError):
+        pass
+    if not isinstance(status, dict):
+        status = dict(INITIAL_STATUS)
+    alive = time.time() - status.get('heartbeat', 0) < STATUS_STALE_SECONDS
+    status['service_alive'] = alive
+    if not alive:
+        status['running'] = False
+        status['current_status'] = "监控进程未运行"
+    return status
+
+
+def send_command(data_dir: str, command: str, **payload) -> tuple:
+    """
+    向监控进程发送命令
+
+    :param data_dir: 数据目录
+    :param command: start / stop / scan_now / profile
+    :param payload: 命令参数（profile 的 cycles）
+    :return: (是否成功, 提示信息)
+    """
+    status = read_status(data_dir)
+    if not status['service_alive']:
+        return False, "监控进程未运行，请先运行 python monitor_service.py"
+    if command == 'start' and status.get('running'):
+        return False, "监控已在运行中"
+    if command in ('scan_now', 'profile') and not status.get('running'):
+        return False, "监控未运行"
+    write_json_atomic(os.path.join(data_dir, COMMAND_FILENAME),
+                      dict(payload, seq=time.time_ns(), command=command))
+    messages = {
+        'start': "🚀 已通知监控进程启动监控",
+        'stop': "🛑 已通知监控进程停止监控",
+        'scan_now': "⚡ 已触发立即扫描",
+        'profile': f"📊 接下来 {payload.get('cycles', 0)} 轮扫描将进行性能分析",
+    }
+    return True, messages[command]
+
+
+class MonitorService:
+    """在独立进程中运行监控，执行Web进程发来的命令并发布状态"""
+
+    def __init__(self, data_dir: str = "data", config_path: str = "config.json"):
+        """
+        :param data_dir: 数据目录（与Web进程共用）
+        :param config_path: 配置文件路径
+        """
+        self.data_dir = data_dir
+        self.config_path = config_path
+        self.status = dict(INITIAL_STATUS)
+        self.monitor = None
+        self.thread = None
+        self.stop_event = threading.Event()
+        self.last_seq = None
+        self.config_mtime = None
+
+    def load_config(self) -> dict:
+        """读取配置文件，不存在或无法解析时返回空配置"""
+        try:
+            return json_codec.load_file(self.config_path)
+        except (OSError, json_codec.DecodeError):
+            return {}
+
+    def start_monitor(self):
+        """启动监控线程；上一个监控线程尚未退出时不启动"""
+        if self.thread and self.thread.is_alive():
+            self.status['last_result'] = "监控已在运行中" if self.status['running'] else "上一个监控线程正在退出，请稍后再试"
+            return
+
+        config = self.load_config()
+        if not (config.get("TWITTER_API_KEY") and config.get("LLM_API_KEY")):
+            self.status['last_result'] = "请先配置API密钥"
+            return
+
+        from twitter_ai_monitor import TwitterAIMonitor
+
+        try:
+            monitor = TwitterAIMonitor.from_config(config, data_dir=self.data_dir)
+        except Exception as e:
+            self.status['last_result'] = f"❌ 启动监控失败: {e}"
+            return
+
+        self.status.update({
+            "running": True,
+            "last_update": datetime.now().isoformat(),
+            "current_status": "正在初始化...",
+            "processed_tweets": 0,
+        })
+        self.monitor = monitor
+        self.config_mtime = self._config_mtime()
+        self.thread = threading.Thread(
+            target=monitor.monitor_and_process_with_status,
+            args=(config.get("TARGET_ACCOUNTS", []), config.get("CHECK_INTERVAL", 300), config.get("INITIAL_HOURS", 2),
+                  self.status, config.get("EXCLUDE_REPLIES", False), config.get("COMBINE_QUERIES", False)),
+            daemon=True, name="monitor"
+        )
+        self.thread.start()
+        print(f"🚀 监控已启动: {', '.join(config.get('TARGET_ACCOUNTS', []))}")
+
+    def stop_monitor(self):
+        """停止监控，正在进行的网络请求完成后线程退出"""
+        self.status.update({
+            "running": False,
+            "current_status": "Neural Network Offline",
+            "current_account": "",
+            "next_check_time": None,
+        })
+        if self.monitor:
+            self.monitor.stop()
+        if self.thread:
+            self.thread.join(timeout=STOP_TIMEOUT)
+        print("🛑 监控已停止")
+
+    def _config_mtime(self):
+        try:
+            return os.stat(self.config_path).st_mtime_ns
+        except OSError:
+            return None
+
+    def read_command(self) -> dict:
+        """读取命令文件，不存在或无法解析时返回空字典"""
+        try:
+            command = json_codec.load_file(os.path.join(self.data_dir, COMMAND_FILENAME))
+        except (OSError, json_codec.DecodeError):
+            return {}
+        return command if isinstance(command, dict) else {}
+
+    def poll_command(self):
+        """执行命令文件中尚未执行的命令"""
+        command = self.read_command()
+        if command.get('seq') == self.last_seq:
+            return
+        self.last_seq = command.get('seq')
+        print(f"📨 收到命令: {command.get('command')}")
+        if command.get('command') == 'start':
+            self.start_monitor()
+        elif command.get('command') == 'stop':
+            self.stop_monitor()
+        elif command.get('command') == 'scan_now' and self.monitor and self.status['running']:
+            self.monitor.scan_now()
+        elif command.get('command') == 'profile' and self.monitor and self.status['running']:
+            self.monitor.profile_next_cycles(command.get('cycles', 1))
+
+    def poll_config(self):
+        """配置文件修改后，将账号列表、检查间隔和追踪开关应用到运行中的监控"""
+        mtime = self._config_mtime()
+        if mtime == self.config_mtime:
+            return
+        self.config_mtime = mtime
+        if self.monitor and self.status['running']:
+            config = self.load_config()
+            self.monitor.update_settings(config.get("TARGET_ACCOUNTS"), config.get("CHECK_INTERVAL"),
+                                         config.get("INITIAL_HOURS"), trace_enabled=config.get("TRACE_ENABLED"))
+
+    def publish_status(self):
+        """写入状态文件（带心跳时间）"""
+        status = dict(self.status)
+        status['heartbeat'] = time.time()
+        status['pid'] = os.getpid()
+        try:
+            write_json_atomic(os.path.join(self.data_dir, STATUS_FILENAME), status)
+        except OSError as e:
+            print(f"写入监控状态失败: {e}")
+
+    def run(self, start: bool = False):
+        """
+        运行服务直到收到停止信号
+
+        :param start: 是否立即开始监控
+        """
+        os.makedirs(self.data_dir, exist_ok=True)
+        # 启动前遗留的命令不执行
+        self.last_seq = self.read_command().get('seq')
+        if start:
+            self.start_monitor()
+        print(f"🛰️ 监控进程已就绪（PID {os.getpid()}），可在设置页启动/停止监控")
+        try:
+            while not self.stop_event.is_set():
+                self.poll_command()
+                self.poll_config()
+                self.publish_status()
+                self.stop_event.wait(STATUS_INTERVAL)
+        finally:
+            if self.status['running']:
+                self.stop_monitor()
+            # 删除状态文件，Web页面立即显示监控进程未运行
+            try:
+                os.remove(os.path.join(self.data_dir, STATUS_FILENAME))
+            except OSError:
+                pass
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="在独立进程中运行监控（配合 serve.py 使用）")
+    parser.add_argument('--data-dir', default="data", help="数据目录（与Web进程共用）")
+    parser.add_argument('--config', default="config.json", help="配置文件路径")
+    parser.add_argument('--start', action='store_true', help="启动后立即开始监控")
+    args = parser.parse_args()
+
+    service = MonitorService(args.data_dir, args.config)
+    signal.signal(signal.SIGTERM, lambda *_: service.stop_event.set())
+    try:
+        service.run(args.start)
+    except KeyboardInterrupt:
+        pass
+    print("监控进程已退出")
+
+
+if __name__ == "__main__":
+    main()
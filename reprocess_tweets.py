@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量重新处理已存储推文的AI字段
+
+更换提示词或模型后，对 data/tweets_*.json 中的历史推文重新生成标题、翻译或解读：
+- 逐个日期文件流式读取，多线程并发调用大模型，并按 RPM 限速
+- 进度写入检查点文件，中断后再次运行会从上次位置继续
+- 结果通过临时文件 + 原子替换写回，不会留下写了一半的数据文件
+- 运行过程中定期输出吞吐量和预计剩余时间
+
+用法示例：
+    python reprocess_tweets.py --fields title,analysis --workers 4 --rpm 60
+"""
+
+import argparse
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import json_codec
+from tweet_stats import TweetStats
+from tweet_storage import data_dir_lock, write_json_atomic
+from twitter_ai_monitor import AI_STAGES, TwitterAIMonitor
+
+# 命令行字段名到推文数据字段的映射
+FIELD_KEYS = {'title': 'ai_title', 'translation': 'ai_translation', 'analysis': 'ai_analysis'}
+
+
+class RateLimiter:
+    """按每分钟请求数限速，多个线程共享"""
+
+    def __init__(self, rpm: int):
+        self.interval = 60.0 / rpm if rpm > 0 else 0.0
+        self.lock = threading.Lock()
+        self.next_time = time.monotonic()
+
+    def acquire(self):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            wait = self.next_time - now
+            self.next_time = max(now, self.next_time) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
+
+class ReprocessingMonitor(TwitterAIMonitor):
+    """每次大模型请求前经过限速器的监控器"""
+
+    def __init__(self, *args, rate_limiter: RateLimiter = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.rate_limiter = rate_limiter
+
+    def get_ai_response(self, prompt: str, prompt_type: str = "other") -> str:
+        if self.rate_limiter:
+            self.rate_limiter.acquire()
+        return super().get_ai_response(prompt, prompt_type)
+
+
+def load_config(config_file: str) -> dict:
+    """读取配置文件"""
+    return json_codec.load_file(config_file)
+
+
+def load_checkpoint(checkpoint_path: str, fields: list) -> dict:
+    """
+    读取检查点；字段列表不一致时视为新任务
+
+    :param checkpoint_path: 检查点文件路径
+    :param fields: 本次要重新处理的字段
+    :return: 检查点数据 {"fields": [...], "completed": {文件名: [推文ID, ...]}}
+    """
+    if os.path.exists(checkpoint_path):
+        try:
+            checkpoint = json_codec.load_file(checkpoint_path)
+            if checkpoint.get('fields') == fields:
+                return checkpoint
+            print("检查点的字段与本次任务不同，重新开始")
+        except json_codec.DecodeError:
+            print("检查点文件损坏，重新开始")
+    return {'fields': fields, 'completed': {}}
+
+
+def list_day_files(data_dir: str, dates: list = None) -> list:
+    """按日期顺序列出推文数据文件"""
+    filenames = sorted(
+        name for name in os.listdir(data_dir)
+        if name.startswith('tweets_') and name.endswith('.json')
+    )
+    if dates:
+        filenames = [name for name in filenames if name[len('tweets_'):-len('.json')] in dates]
+    return filenames
+
+
+def load_day_file(file_path: str) -> list:
+    """读取单个日期文件，解析失败时返回空列表"""
+    try:
+        return json_codec.load_file(file_path)
+    except json_codec.DecodeError:
+        print(f"⚠️ 文件解析失败，跳过: {file_path}")
+        return []
+
+
+def flush_results(file_path: str, updates: dict):
+    """
+    将重新处理的字段合并写回日期文件
+
+    在数据目录写锁内重新读取并写回，避免覆盖监控进程在此期间合并写入的新推文
+
+    :param file_path: 日期文件路径
+    :param updates: 推文ID到新字段值的映射
+    """
+    with data_dir_lock(os.path.dirname(file_path)):
+        data = load_day_file(file_path)
+        for item in data:
+            new_fields = updates.get(item.get('id'))
+            if new_fields:
+                item.update(new_fields)
+        write_json_atomic(file_path, data)
+
+
+class ProgressReporter:
+    """统计吞吐量并估算剩余时间"""
+
+    def __init__(self, total: int, interval: float = 10.0):
+        self.total = total
+        self.interval = interval
+        self.done = 0
+        self.failed = 0
+        self.start_time = time.monotonic()
+        self.last_report = 0.0
+
+    def update(self, success: bool):
+        if success:
+            self.done += 1
+        else:
+            self.failed += 1
+        now = time.monotonic()
+        if now - self.last_report >= self.interval:
+            self.last_report = now
+            self.report()
+
+    def report(self):
+        elapsed = time.monotonic() - self.start_time
+        finished = self.done + self.failed
+        rate = finished / elapsed * 60 if elapsed > 0 else 0.0
+        remaining = self.total - finished
+        eta = remaining / (rate / 60) if rate > 0 else 0.0
+        print(f"📊 进度 {finished}/{self.total} (失败 {self.failed}) | "
+              f"{rate:.1f} 条/分钟 | 预计剩余 {int(eta // 60)}分{int(eta % 60)}秒")
+
+
+def reprocess_tweet(monitor: TwitterAIMonitor, tweet: dict, fields: list) -> dict:
+    """
+    重新处理单条推文的指定字段
+
+    :return: 新字段值
+    :raises LLMUnavailableError: 所有大模型端点均失败或 token 预算不足（该推文计为失败，再次运行时重试）
+    """
+    monitor.usage_context.accounts = [tweet.get('author', '')]
+    result = monitor.process_tweet_with_ai(tweet.get('original_text', ''), tuple(fields))
+    return {FIELD_KEYS[field]: value for field, value in result.items()}
+
+
+def run(data_dir: str, fields: list, workers: int, rpm: int, checkpoint_path: str,
+        dates: list = None, flush_every: int = 20, config_file: str = "config.json"):
+    """
+    执行批量重新处理任务
+
+    :param data_dir: 数据目录
+    :param fields: 要重新处理的字段（title / translation / analysis）
+    :param workers: 并发线程数
+    :param rpm: 每分钟大模型请求数上限，0表示不限速
+    :param checkpoint_path: 检查点文件路径
+    :param dates: 只处理指定日期（YYYY-MM-DD），默认全部
+    :param flush_every: 每完成多少条推文写回一次数据文件和检查点
+    :param config_file: 配置文件路径
+    """
+    config = load_config(config_file)
+    # 重新处理时需要新的结果，关闭近似重复复用
+    monitor = ReprocessingMonitor.from_config(dict(config, NEAR_DUPLICATE_THRESHOLD=0), data_dir=data_dir,
+                                              rate_limiter=RateLimiter(rpm))
+
+    checkpoint = load_checkpoint(checkpoint_path, fields)
+    filenames = list_day_files(data_dir, dates)
+
+    # 预先统计待处理数量，用于估算剩余时间
+    total = 0
+    for filename in filenames:
+        completed = set(checkpoint['completed'].get(filename, []))
+        total += sum(1 for t in load_day_file(os.path.join(data_dir, filename)) if t.get('id') not in completed)
+    print(f"共 {len(filenames)} 个文件，待处理 {total} 条推文，字段: {', '.join(fields)}")
+
+    progress = ProgressReporter(total)
+    # 是否写回过结果；写回后AI字段（如失败记录被修复）变化，需要重建统计汇总
+    flushed = False
+
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        for filename in filenames:
+            file_path = os.path.join(data_dir, filename)
+            completed = checkpoint['completed'].setdefault(filename, [])
+            completed_ids = set(completed)
+            pending = [t for t in load_day_file(file_path) if t.get('id') and t.get('id') not in completed_ids]
+            if not pending:
+                continue
+
+            print(f"\n处理文件: {filename} ({len(pending)} 条)")
+            updates = {}
+            futures = {executor.submit(reprocess_tweet, monitor, tweet, fields): tweet for tweet in pending}
+
+            try:
+                for future in as_completed(futures):
+                    tweet = futures[future]
+                    try:
+                        new_fields = future.result()
+                    except Exception as e:
+                        print(f"❌ 推文 {tweet.get('id')} 处理失败: {str(e)}")
+                        new_fields = None
+
+                    if new_fields:
+                        updates[tweet['id']] = new_fields
+                    progress.update(bool(new_fields))
+
+                    # 定期写回结果，再记录检查点；中途中断最多重复处理 flush_every 条
+                    if len(updates) >= flush_every:
+                        flush_results(file_path, updates)
+                        flushed = True
+                        completed.extend(updates)
+                        write_json_atomic(checkpoint_path, checkpoint)
+                        updates = {}
+            finally:
+                # 中断时也写回已完成的结果
+                if updates:
+                    flush_results(file_path, updates)
+                    flushed = True
+                    completed.extend(updates)
+                    write_json_atomic(checkpoint_path, checkpoint)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+        monitor.budget.flush()
+        # 重新处理可能修复了失败记录，重建统计汇总保持失败数一致
+        if flushed:
+            TweetStats(data_dir).rebuild()
+
+    progress.report()
+    if progress.failed:
+        print(f"⚠️ {progress.failed} 条推文处理失败，再次运行将继续重试")
+    else:
+        print("✅ 全部处理完成")
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="批量重新处理已存储推文的AI字段")
+    parser.add_argument('--fields', default=','.join(AI_STAGES),
+                        help="要重新处理的字段，逗号分隔：title,translation,analysis")
+    parser.add_argument('--workers', type=int, default=4, help="并发线程数")
+    parser.add_argument('--rpm', type=int, default=60, help="每分钟大模型请求数上限，0表示不限速")
+    parser.add_argument('--data-dir', default="data", help="数据目录")
+    parser.add_argument('--dates', default="", help="只处理指定日期，逗号分隔（YYYY-MM-DD）")
+    parser.add_argument('--checkpoint', default="", help="检查点文件路径，默认为数据目录下的 .reprocess_checkpoint.json")
+    parser.add_argument('--flush-every', type=int, default=20, help="每完成多少条推文写回一次")
+    parser.add_argument('--restart', action='store_true', help="忽略已有检查点，从头开始")
+    parser.add_argument('--config', default="config.json", help="配置文件路径")
+    args = parser.parse_args()
+
+    fields = [field.strip() for field in args.fields.split(',') if field.strip()]
+    invalid = [field for field in fields if field not in FIELD_KEYS]
+    if not fields or invalid:
+        parser.error(f"无效的字段: {', '.join(invalid) or '(空)'}")
+
+    checkpoint_path = args.checkpoint or os.path.join(args.data_dir, ".reprocess_checkpoint.json")
+    if args.restart and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+
+    dates = [d.strip() for d in args.dates.split(',') if d.strip()] or None
+
+    try:
+        run(args.data_dir, fields, args.workers, args.rpm, checkpoint_path,
+            dates, args.flush_every, args.config)
+    except KeyboardInterrupt:
+        print("\n已中断，进度已保存到检查点，再次运行即可继续")
+
+
+if __name__ == "__main__":
+    main()
@@ -23,6 +23,6 @@ echo 启动应用...
 echo 访问地址: http://localhost:5000
 echo 按 Ctrl+C 停止服务
 echo.
-python app.py
+python serve.py --with-monitor
 
 pause 
\ No newline at end of file
@@ -21,4 +21,4 @@ echo "启动应用..."
 echo "访问地址: http://localhost:5000"
 echo "按 Ctrl+C 停止服务"
 echo
-python3 app.py 
\ No newline at end of file
+python3 serve.py --with-monitor 
\ No newline at end of file
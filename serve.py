@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+生产环境启动入口
+
+python app.py / start.py --dev 使用的是 Flask 开发服务器（调试模式 + 自动重载），只适合本地开发。
+本入口：
+- 使用多线程 WSGI 服务器：安装 waitress 后自动使用它，否则使用 Werkzeug 的多线程服务器（关闭调试和自动重载）
+- 监控与Web进程解耦，运行在独立的 monitor_service.py 进程中（--with-monitor 时由本脚本启动并随之退出），
+  页面的启动/停止/立即扫描通过数据目录中的命令文件通知监控进程
+- 多进程部署（Linux）可直接使用 gunicorn：gunicorn -w 4 -b 0.0.0.0:5000 serve:app，监控进程另行启动
+
+用法：
+    python serve.py --with-monitor
+    python serve.py --port 8000 --threads 16
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+from monitor_service import MONITOR_MODE_ENV
+
+# 导入 app 之前设置：Web进程不在自身线程中运行监控
+os.environ[MONITOR_MODE_ENV] = "external"
+
+from app import app  # noqa: E402
+
+# 默认的请求处理线程数
+DEFAULT_THREADS = 8
+# 停止时等待监控进程退出的时间（秒），超时后强制结束
+MONITOR_STOP_TIMEOUT = 10
+
+
+def run_server(host: str, port: int, threads: int):
+    """
+    启动多线程 WSGI 服务器（阻塞）
+
+    :param host: 监听地址
+    :param port: 端口
+    :param threads: 请求处理线程数（仅 waitress 使用；Werkzeug 每个请求一个线程）
+    """
+    try:
+        from waitress import serve
+    except ImportError:
+        serve = None
+
+    if serve is not None:
+        print(f"使用 waitress 服务器，{threads} 个工作线程")
+        serve(app, host=host, port=port, threads=threads)
+        return
+
+    from werkzeug.serving import make_server
+    print("未安装 waitress，使用 Werkzeug 多线程服务器（pip install waitress 可获得更好的性能）")
+    server = make_server(host, port, app, threaded=True)
+    server.serve_forever()
+
+
+def main(argv: list = None):
+    """主函数"""
+    parser = argparse.ArgumentParser(description="生产环境启动Web服务")
+    parser.add_argument('--host', default="0.0.0.0", help="监听地址")
+    parser.add_argument('--port', type=int, default=5000, help="端口")
+    parser.add_argument('--threads', type=int, default=DEFAULT_THREADS, help="请求处理线程数")
+    parser.add_argument('--with-monitor', action='store_true', help="同时启动独立的监控进程")
+    args = parser.parse_args(argv)
+
+    os.makedirs('data', exist_ok=True)
+    monitor_process = None
+    if args.with_monitor:
+        monitor_process = subprocess.Popen(
+            [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "monitor_service.py")]
+        )
+
+    print(f"访问地址: http://localhost:{args.port}")
+    try:
+        run_server(args.host, args.port, args.threads)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if monitor_process:
+            monitor_process.terminate()
+            try:
+                monitor_process.wait(timeout=MONITOR_STOP_TIMEOUT)
+            except subprocess.TimeoutExpired:
+                # 监控进程未能及时退出（如卡在网络请求中），强制结束，避免留下孤儿进程
+                print("监控进程未能及时退出，强制结束")
+                monitor_process.kill()
+                monitor_process.wait()
+        print("服务已停止")
+
+
+if __name__ == "__main__":
+    main()
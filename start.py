@@ -2,6 +2,8 @@
 # -*- coding: utf-8 -*-
 """
 Twitter AI 监控系统启动脚本
+
+默认使用 serve.py 的生产模式（多线程服务器 + 独立的监控进程），--dev 使用 Flask 开发服务器
 """
 
 import os
@@ -47,9 +49,14 @@ def main():
     print("按 Ctrl+C 停止服务\n")
     
     try:
-        # 导入并运行Flask应用
-        from app import app
-        app.run(debug=True, host='0.0.0.0', port=5000)
+        if "--dev" in sys.argv:
+            # 开发模式：调试 + 自动重载，监控在Web进程内运行
+            from app import app
+            app.run(debug=True, host='0.0.0.0', port=5000)
+        else:
+            # 多线程服务器 + 独立的监控进程
+            import serve
+            serve.main(["--with-monitor"])
     except KeyboardInterrupt:
         print("\n\n服务已停止")
     except Exception as e:
@@ -322,6 +322,12 @@ class API {
         });
     }
     
+    static async scanNow() {
+        return this.request('/api/scan_now', {
+            method: 'POST'
+        });
+    }
+    
     static async getMonitoringStatus() {
         return this.request('/api/monitoring_status');
     }
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+统计汇总测试：从早期版本格式的日期文件重建汇总时，AI处理失败的记录应计入失败数
+
+    python test_tweet_stats.py
+    python -m pytest test_tweet_stats.py
+"""
+
+import os
+import shutil
+import tempfile
+
+from tweet_stats import TweetStats, is_failed
+from tweet_storage import write_json_atomic
+
+
+def make_record(tweet_id: str, title: str, translation: str, analysis: str) -> dict:
+    """构造一条日期文件中的推文记录"""
+    return {
+        'id': tweet_id,
+        'author': 'OpenAI',
+        'created_at': "Tue Aug 12 10:00:00 +0000 2025",
+        'original_text': "New model release",
+        'ai_title': title,
+        'ai_translation': translation,
+        'ai_analysis': analysis,
+        'timestamp': "2025-08-12T10:05:00",
+        'processed_date': "2025-08-12",
+    }
+
+
+def test_is_failed_matches_baseline_failure_records():
+    # 早期版本处理异常时保存的格式
+    assert is_failed(make_record('1', "处理失败: Connection error.", "New model release", "AI处理失败: Connection error."))
+    # 早期版本大模型返回空结果时保存的占位文本
+    assert is_failed(make_record('2', "AI处理失败", "AI处理失败", "AI处理失败"))
+    assert not is_failed(make_record('3', "发布新模型", "发布新模型", "解读"))
+
+
+def test_rebuild_counts_baseline_failure_records():
+    data_dir = tempfile.mkdtemp()
+    try:
+        write_json_atomic(os.path.join(data_dir, "tweets_2025-08-12.json"), [
+            make_record('1', "发布新模型", "发布新模型", "解读"),
+            make_record('2', "处理失败: Connection error.", "New model release", "AI处理失败: Connection error."),
+            make_record('3', "AI处理失败", "AI处理失败", "AI处理失败"),
+        ])
+        summary = TweetStats(data_dir).summary()
+        assert summary['total'] == 3
+        assert summary['failed'] == 2
+        assert summary['authors']['OpenAI']['failed'] == 2
+        assert TweetStats(data_dir).summary(date="2025-08")['failed'] == 2
+    finally:
+        shutil.rmtree(data_dir)
+
+
+if __name__ == "__main__":
+    test_is_failed_matches_baseline_failure_records()
+    test_rebuild_counts_baseline_failure_records()
+    print("✅ 测试通过")
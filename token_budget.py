@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+大模型 token 用量统计与预算控制
+
+每次大模型请求的 token 用量（优先使用接口返回的 usage，缺失时按文本长度估算）
+按日期汇总到 data/.token_usage.json：总量、各账号、各提示词类型（translation / analysis /
+title / batch）、各端点，并按配置的单价折算费用；同时保留最近48小时的逐小时用量。
+
+配置了每日或每小时 token 预算时，按两者中较高的使用比例逐级降级：
+- normal：正常处理
+- title_only（≥ title_only_at）：只生成标题，翻译使用原文，不生成解读
+- priority_only（≥ priority_only_at）：只处理权重大于1的账号（仅标题），其余账号延后
+- paused（≥ 100%）：暂停所有大模型请求，推文延后到预算窗口重置后处理
+每次请求前都会检查预算，预计超出时抛出 BudgetExceededError，不会在不知情的情况下超支。
+
+监控、分片监控进程和 reprocess_tweets.py 共用同一个用量文件：写入时先重新读取文件，再累加本进程尚未写入的用量；
+检查预算前发现文件被其他进程更新（修改时间或大小变化）时重新读取，预算按所有进程的合计用量计算。
+"""
+
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+import json_codec
+from llm_router import LLMUnavailableError
+from tweet_storage import data_dir_lock, write_json_atomic
+
+# 用量文件名（以.开头，不会被当作日期文件）
+USAGE_FILENAME = ".token_usage.json"
+USAGE_VERSION = 1
+# 逐小时用量保留的小时数
+HOURS_TO_KEEP = 48
+# 仅生成标题时写入解读字段的说明
+TITLE_ONLY_ANALYSIS = "Token预算接近上限，本条推文仅生成了标题，可稍后通过 reprocess_tweets.py 补充翻译和解读。"
+
+
+class BudgetExceededError(LLMUnavailableError):
+    """token预算已用尽或本次请求会超出预算"""
+
+
+def _empty_usage() -> dict:
+    return {'calls': 0, 'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0, 'cost': 0.0}
+
+
+def _add_usage(target: dict, prompt_tokens: int, completion_tokens: int, cost: float):
+    target['calls'] += 1
+    target['prompt_tokens'] += prompt_tokens
+    target['completion_tokens'] += completion_tokens
+    target['total_tokens'] += prompt_tokens + completion_tokens
+    target['cost'] = round(target['cost'] + cost, 6)
+
+
+def _apply_entry(usage: dict, entry: tuple):
+    """
+    将一次请求的用量累加到用量字典
+
+    :param usage: 用量字典
+    :param entry: (日期, 小时, 输入token, 输出token, 费用, 账号列表, 提示词类型, 端点)
+    """
+    day_key, hour_key, prompt_tokens, completion_tokens, cost, accounts, prompt_type, endpoint = entry
+    day = usage['days'].setdefault(day_key, {
+        'total': _empty_usage(), 'by_account': {}, 'by_prompt': {}, 'by_endpoint': {}
+    })
+    _add_usage(day['total'], prompt_tokens, completion_tokens, cost)
+    _add_usage(day['by_prompt'].setdefault(prompt_type, _empty_usage()), prompt_tokens, completion_tokens, cost)
+    if endpoint:
+        _add_usage(day['by_endpoint'].setdefault(endpoint, _empty_usage()), prompt_tokens, completion_tokens, cost)
+    for index, account in enumerate(accounts):
+        # 余数计入第一个账号，分摊后总数不变
+        share_prompt = prompt_tokens // len(accounts) + (prompt_tokens % len(accounts) if index == 0 else 0)
+        share_completion = completion_tokens // len(accounts) + (completion_tokens % len(accounts) if index == 0 else 0)
+        _add_usage(day['by_account'].setdefault(account, _empty_usage()),
+                   share_prompt, share_completion, cost / len(accounts))
+
+    hours = usage['hours']
+    hours[hour_key] = hours.get(hour_key, 0) + prompt_tokens + completion_tokens
+    if len(hours) > HOURS_TO_KEEP:
+        for key in sorted(hours)[:-HOURS_TO_KEEP]:
+            del hours[key]
+
+
+class TokenBudget:
+    """token 用量账本和预算控制"""
+
+    def __init__(self, data_dir: str = "data", daily_budget: int = 0, hourly_budget: int = 0,
+                 price_per_1k: dict = None, title_only_at: float = 0.8, priority_only_at: float = 0.9,
+                 flush_interval: float = 10.0):
+        """
+        初始化账本（不会读写文件）
+
+        :param data_dir: 数据存储目录
+        :param daily_budget: 每日 token 预算，0表示不限制
+        :param hourly_budget: 每小时 token 预算，0表示不限制
+        :param price_per_1k: 每千 token 单价 {"prompt": ..., "completion": ...}，用于折算费用
+        :param title_only_at: 预算使用比例达到该值时只生成标题
+        :param priority_only_at: 预算使用比例达到该值时只处理高权重账号
+        :param flush_interval: 两次写入用量文件的最小间隔（秒）
+        """
+        self.data_dir = data_dir
+        self.daily_budget = int(daily_budget or 0)
+        self.hourly_budget = int(hourly_budget or 0)
+        self.price_per_1k = price_per_1k or {}
+        self.title_only_at = title_only_at
+        self.priority_only_at = priority_only_at
+        self.flush_interval = flush_interval
+        self.lock = threading.RLock()
+        self._usage = None
+        # 上次读取或写入后用量文件的 (修改时间, 大小)，变化说明其他进程写入了用量
+        self._file_key = None
+        # 本进程尚未写入文件的用量记录
+        self._pending = []
+        self._flushed_at = 0.0
+        self._mode = 'normal'
+
+    def usage_path(self) -> str:
+        """
+        获取用量文件路径
+
+        :return: 用量文件路径
+        """
+        return os.path.join(self.data_dir, USAGE_FILENAME)
+
+    def _read_file(self) -> dict:
+        """读取用量文件，不存在或版本不符时返回空用量"""
+        usage = None
+        if os.path.exists(self.usage_path()):
+            try:
+                usage = json_codec.load_file(self.usage_path())
+            except json_codec.DecodeError:
+                usage = None
+        if not isinstance(usage, dict) or usage.get('version') != USAGE_VERSION:
+            usage = {'version': USAGE_VERSION, 'days': {}, 'hours': {}}
+        return usage
+
+    def _stat_file(self):
+        """用量文件的 (修改时间, 大小)，不存在时为None"""
+        try:
+            st = os.stat(self.usage_path())
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _refresh(self):
+        """首次使用或用量文件被其他进程更新时，在数据目录写锁内重新读取，并叠加本进程尚未写入的用量"""
+        if self._usage is not None and self._stat_file() == self._file_key:
+            return
+        with data_dir_lock(self.data_dir), self.lock:
+            file_key = self._stat_file()
+            if self._usage is not None and file_key == self._file_key:
+                return
+            usage = self._read_file()
+            for entry in self._pending:
+                _apply_entry(usage, entry)
+            self._usage = usage
+            self._file_key = file_key
+
+    def _load(self) -> dict:
+        """获取内存中的用量（调用方需先调用 _refresh，并持有 self.lock）"""
+        return self._usage
+
+    @staticmethod
+    def _keys(now: datetime = None) -> tuple:
+        now = now or datetime.now()
+        return now.strftime("%Y-%m-%d"), now.strftime("%Y-%m-%dT%H")
+
+    def record(self, prompt_tokens: int, completion_tokens: int, accounts: list = None,
+               prompt_type: str = "other", endpoint: str = ""):
+        """
+        记录一次请求的用量；多个账号共用一次请求时平均分摊
+
+        :param prompt_tokens: 输入 token 数
+        :param completion_tokens: 输出 token 数
+        :param accounts: 本次请求涉及的账号
+        :param prompt_type: 提示词类型
+        :param endpoint: 端点名称
+        """
+        cost = (prompt_tokens * self.price_per_1k.get('prompt', 0)
+                + completion_tokens * self.price_per_1k.get('completion', 0)) / 1000
+        entry = (*self._keys(), prompt_tokens, completion_tokens, cost, accounts or ['unknown'], prompt_type, endpoint)
+
+        self._refresh()
+        with self.lock:
+            _apply_entry(self._load(), entry)
+            self._pending.append(entry)
+            due = time.monotonic() - self._flushed_at >= self.flush_interval
+        if due:
+            self.flush()
+        self._update_mode()
+
+    def flush(self):
+        """重新读取用量文件（包含其他进程写入的用量），累加本进程的新用量后写回"""
+        with data_dir_lock(self.data_dir), self.lock:
+            if not self._pending:
+                return
+            usage = self._read_file()
+            for entry in self._pending:
+                _apply_entry(usage, entry)
+            os.makedirs(self.data_dir, exist_ok=True)
+            write_json_atomic(self.usage_path(), usage)
+            self._usage = usage
+            self._file_key = self._stat_file()
+            self._pending = []
+            self._flushed_at = time.monotonic()
+
+    def used(self) -> tuple:
+        """
+        当天和当前小时已使用的 token 数
+
+        :return: (当天用量, 当前小时用量)
+        """
+        day_key, hour_key = self._keys()
+        self._refresh()
+        with self.lock:
+            usage = self._load()
+            day = usage['days'].get(day_key)
+            return (day['total']['total_tokens'] if day else 0), usage['hours'].get(hour_key, 0)
+
+    def usage_ratio(self, extra_tokens: int = 0) -> float:
+        """
+        预算使用比例（每日和每小时中较高者），未配置预算时为0
+
+        :param extra_tokens: 额外计入的 token 数（如本次请求的预估用量）
+        :return: 使用比例
+        """
+        day_used, hour_used = self.used()
+        ratios = [0.0]
+        if self.daily_budget:
+            ratios.append((day_used + extra_tokens) / self.daily_budget)
+        if self.hourly_budget:
+            ratios.append((hour_used + extra_tokens) / self.hourly_budget)
+        return max(ratios)
+
+    def mode(self) -> str:
+        """
+        当前预算模式
+
+        :return: normal / title_only / priority_only / paused
+        """
+        return self._update_mode()
+
+    def _update_mode(self) -> str:
+        """根据使用比例计算预算模式，模式变化时输出提示"""
+        ratio = self.usage_ratio()
+        if ratio >= 1:
+            mode = 'paused'
+        elif ratio >= self.priority_only_at:
+            mode = 'priority_only'
+        elif ratio >= self.title_only_at:
+            mode = 'title_only'
+        else:
+            mode = 'normal'
+        with self.lock:
+            if mode != self._mode:
+                messages = {
+                    'normal': "✅ Token预算恢复，恢复正常处理",
+                    'title_only': "⚠️ Token预算已使用 {:.0%}，切换为仅生成标题",
+                    'priority_only': "⚠️ Token预算已使用 {:.0%}，仅处理高优先级账号",
+                    'paused': "🛑 Token预算已用尽（{:.0%}），暂停大模型请求",
+                }
+                print(messages[mode].format(ratio))
+                self._mode = mode
+        return mode
+
+    def check(self, estimated_tokens: int = 0):
+        """
+        请求前检查预算
+
+        :param estimated_tokens: 本次请求的预估 token 数
+        :raises BudgetExceededError: 预算已用尽或本次请求会超出预算
+        """
+        if not (self.daily_budget or self.hourly_budget):
+            return
+        ratio = self.usage_ratio(estimated_tokens)
+        if ratio > 1:
+            day_used, hour_used = self.used()
+            raise BudgetExceededError(
+                f"Token预算不足：今日已用 {day_used}/{self.daily_budget or '∞'}，"
+                f"本小时已用 {hour_used}/{self.hourly_budget or '∞'}，本次预计 {estimated_tokens}"
+            )
+
+    def summary(self, days: int = 7) -> dict:
+        """
+        最近几天的用量汇总和当前预算状态
+
+        :param days: 返回最近多少天的明细
+        :return: 汇总字典
+        """
+        day_used, hour_used = self.used()
+        # 模式和比例会重新读取用量文件（需要数据目录写锁），在持有 self.lock 之前计算
+        mode = self.mode()
+        ratio = self.usage_ratio()
+        with self.lock:
+            usage = self._load()
+            recent = sorted(usage['days'])[-days:]
+            since = (datetime.now() - timedelta(hours=24)).strftime("%Y-%m-%dT%H")
+            return {
+                'mode': mode,
+                'daily_budget': self.daily_budget,
+                'hourly_budget': self.hourly_budget,
+                'today_tokens': day_used,
+                'hour_tokens': hour_used,
+                'usage_ratio': round(ratio, 4),
+                'days': {key: usage['days'][key] for key in recent},
+                'hours': {key: value for key, value in sorted(usage['hours'].items()) if key >= since},
+            }
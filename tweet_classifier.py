@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+推文本地预分类
+
+在调用大模型之前，通过字符统计判断推文实际需要哪些AI处理环节：
+- 已是中文的推文无需翻译
+- 只有链接、提及、话题或表情的推文没有可翻译/解读的文字
+"""
+
+import re
+
+# 中文字符占文字字符的比例超过该值时视为中文推文
+CHINESE_RATIO_THRESHOLD = 0.5
+# 去除链接和提及后至少需要的文字字符数
+MIN_TEXT_CHARS = 2
+
+URL_PATTERN = re.compile(r'https?://\S+|\bt\.co/\S+', re.IGNORECASE)
+RETWEET_PREFIX_PATTERN = re.compile(r'^RT @\w+:\s*')
+MENTION_PATTERN = re.compile(r'@\w+')
+HASHTAG_PATTERN = re.compile(r'[#$]\w+')
+
+# 跳过环节时的确定性填充内容
+NO_TEXT_ANALYSIS = "该推文不含可解读的文字内容（仅包含链接、提及或表情）。"
+LINK_ONLY_TITLE = "分享了一条链接"
+NO_TEXT_TITLE = "发布了一条无文字内容的推文"
+
+
+def _is_han(ch: str) -> bool:
+    """判断字符是否为汉字"""
+    return '一' <= ch <= '鿿' or '㐀' <= ch <= '䶿' or '豈' <= ch <= '﫿'
+
+
+def strip_untranslatable(text: str) -> str:
+    """
+    去除推文中的转推前缀、链接、提及和话题标签
+    
+    :param text: 推文内容
+    :return: 剩余的文字内容
+    """
+    text = RETWEET_PREFIX_PATTERN.sub('', text or '')
+    text = URL_PATTERN.sub(' ', text)
+    text = MENTION_PATTERN.sub(' ', text)
+    text = HASHTAG_PATTERN.sub(' ', text)
+    return text.strip()
+
+
+def classify_tweet(text: str) -> dict:
+    """
+    判断推文需要哪些AI处理环节
+    
+    :param text: 推文内容
+    :return: 包含 needs_translation / needs_analysis / needs_title 和 reason 的字典
+    """
+    remaining = strip_untranslatable(text)
+    han_count = 0
+    letter_count = 0
+    for ch in remaining:
+        if _is_han(ch):
+            han_count += 1
+            letter_count += 1
+        elif ch.isalpha():
+            letter_count += 1
+    
+    if letter_count < MIN_TEXT_CHARS:
+        return {
+            'needs_translation': False,
+            'needs_analysis': False,
+            'needs_title': False,
+            'has_link': bool(URL_PATTERN.search(text or '')),
+            'reason': 'no_text'
+        }
+    
+    if han_count / letter_count >= CHINESE_RATIO_THRESHOLD:
+        return {
+            'needs_translation': False,
+            'needs_analysis': True,
+            'needs_title': True,
+            'has_link': bool(URL_PATTERN.search(text or '')),
+            'reason': 'chinese'
+        }
+    
+    return {
+        'needs_translation': True,
+        'needs_analysis': True,
+        'needs_title': True,
+        'has_link': bool(URL_PATTERN.search(text or '')),
+        'reason': 'full'
+    }
+
+
+def fill_skipped_stages(text: str, plan: dict) -> dict:
+    """
+    为跳过的AI环节生成确定性结果
+    
+    :param text: 推文内容
+    :param plan: classify_tweet 的返回结果
+    :return: 仅包含被跳过环节的结果字典（title / translation / analysis）
+    """
+    result = {}
+    if not plan['needs_translation']:
+        result['translation'] = (text or '').strip()
+    if not plan['needs_analysis']:
+        result['analysis'] = NO_TEXT_ANALYSIS
+    if not plan['needs_title']:
+        result['title'] = LINK_ONLY_TITLE if plan['has_link'] else NO_TEXT_TITLE
+    return result
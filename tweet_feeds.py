@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+推文订阅源与导出
+
+- render_rss / render_atom：将最新的推文生成 RSS 2.0 / Atom 订阅源
+- FeedCache：按 (格式, 作者, 条数) 缓存生成好的订阅源，数据版本变化（有新推文保存）时失效，
+  大量订阅者轮询时只需一次版本检查
+- iter_ndjson：逐条序列化推文为 NDJSON，配合流式响应导出任意规模的归档
+"""
+
+import hashlib
+import threading
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from xml.sax.saxutils import escape
+
+import json_codec
+
+# 订阅源默认条数和上限
+DEFAULT_FEED_SIZE = 50
+MAX_FEED_SIZE = 200
+
+
+def _parse_time(tweet: dict) -> datetime:
+    """推文处理时间（UTC），无法解析时返回当前时间"""
+    try:
+        return datetime.fromisoformat(tweet.get('timestamp', '')).replace(tzinfo=timezone.utc)
+    except (TypeError, ValueError):
+        return datetime.now(timezone.utc)
+
+
+def _entry_content(tweet: dict) -> str:
+    """订阅条目正文：翻译 + 解读 + 原文链接"""
+    parts = [tweet.get('ai_translation', ''), tweet.get('ai_analysis', '')]
+    if tweet.get('tweet_url'):
+        parts.append(f"原文: {tweet['tweet_url']}")
+    return "\n\n".join(part for part in parts if part)
+
+
+def render_rss(tweets: list, title: str, site_url: str, link_for) -> bytes:
+    """
+    生成 RSS 2.0 订阅源
+
+    :param tweets: 推文列表（按时间倒序）
+    :param title: 订阅源标题
+    :param site_url: 站点首页地址
+    :param link_for: 根据推文ID生成详情页地址的函数
+    :return: XML字节串
+    """
+    items = []
+    for tweet in tweets:
+        link = link_for(tweet.get('id', ''))
+        items.append(
+            "<item>"
+            f"<title>{escape(tweet.get('ai_title', '') or tweet.get('original_text', '')[:50])}</title>"
+            f"<link>{escape(link)}</link>"
+            f"<guid isPermaLink=\"false\">{escape(tweet.get('id', ''))}</guid>"
+            f"<author>{escape(tweet.get('author', ''))}</author>"
+            f"<pubDate>{format_datetime(_parse_time(tweet))}</pubDate>"
+            f"<description>{escape(_entry_content(tweet))}</description>"
+            "</item>"
+        )
+    updated = format_datetime(_parse_time(tweets[0])) if tweets else format_datetime(datetime.now(timezone.utc))
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<rss version="2.0"><channel>'
+        f"<title>{escape(title)}</title>"
+        f"<link>{escape(site_url)}</link>"
+        f"<description>{escape(title)}</description>"
+        f"<lastBuildDate>{updated}</lastBuildDate>"
+        + "".join(items) +
+        "</channel></rss>\n"
+    ).encode('utf-8')
+
+
+def render_atom(tweets: list, title: str, site_url: str, feed_url: str, link_for) -> bytes:
+    """
+    生成 Atom 订阅源
+
+    :param tweets: 推文列表（按时间倒序）
+    :param title: 订阅源标题
+    :param site_url: 站点首页地址
+    :param feed_url: 订阅源自身地址
+    :param link_for: 根据推文ID生成详情页地址的函数
+    :return: XML字节串
+    """
+    entries = []
+    for tweet in tweets:
+        link = link_for(tweet.get('id', ''))
+        entries.append(
+            "<entry>"
+            f"<title>{escape(tweet.get('ai_title', '') or tweet.get('original_text', '')[:50])}</title>"
+            f"<link href=\"{escape(link)}\"/>"
+            f"<id>urn:tweet:{escape(tweet.get('id', ''))}</id>"
+            f"<author><name>{escape(tweet.get('author', ''))}</name></author>"
+            f"<updated>{_parse_time(tweet).isoformat()}</updated>"
+            f"<content type=\"text\">{escape(_entry_content(tweet))}</content>"
+            "</entry>"
+        )
+    updated = _parse_time(tweets[0]) if tweets else datetime.now(timezone.utc)
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<feed xmlns="http://www.w3.org/2005/Atom">'
+        f"<title>{escape(title)}</title>"
+        f"<link href=\"{escape(site_url)}\"/>"
+        f"<link rel=\"self\" href=\"{escape(feed_url)}\"/>"
+        f"<id>{escape(feed_url)}</id>"
+        f"<updated>{updated.isoformat()}</updated>"
+        + "".join(entries) +
+        "</feed>\n"
+    ).encode('utf-8')
+
+
+class FeedCache:
+    """按数据版本失效的订阅源缓存"""
+
+    def __init__(self, max_entries: int = 256):
+        """
+        :param max_entries: 最多缓存的订阅源数量（不同作者/格式/条数的组合）
+        """
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.version = None
+        # (格式, 作者, 条数) -> (内容, ETag)
+        self.entries = {}
+
+    def get(self, key: tuple, version, build) -> tuple:
+        """
+        获取缓存的订阅源，数据版本变化或未缓存时重新生成
+
+        :param key: 缓存键 (格式, 作者, 条数)
+        :param version: 当前数据版本
+        :param build: 生成订阅源内容的函数
+        :return: (内容, ETag)
+        """
+        with self.lock:
+            if version != self.version:
+                self.version = version
+                self.entries = {}
+            cached = self.entries.get(key)
+        if cached:
+            return cached
+
+        body = build()
+        etag = hashlib.sha1(body).hexdigest()
+        with self.lock:
+            if version == self.version:
+                if len(self.entries) >= self.max_entries:
+                    self.entries.pop(next(iter(self.entries)))
+                self.entries[key] = (body, etag)
+        return body, etag
+
+
+def iter_ndjson(tweets):
+    """
+    逐条序列化推文为 NDJSON
+
+    :param tweets: 推文可迭代对象
+    :return: 每条推文一行的字节串生成器
+    """
+    for tweet in tweets:
+        yield json_codec.dumps_bytes(tweet) + b"\n"
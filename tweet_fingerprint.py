@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+推文近似重复检测
+
+对 original_text 计算 MinHash 签名并按 LSH 分桶，快速找出与新推文高度相似的历史推文，
+用于复用已有的AI标题、翻译和解读。覆盖的典型场景：
+- 转推被截断（以"…"结尾）的文本与原推文
+- 多个公司账号发布的同一条公告
+- 线程中内容重复的续推
+"""
+
+import re
+import zlib
+from collections import OrderedDict
+
+from tweet_classifier import RETWEET_PREFIX_PATTERN, URL_PATTERN
+
+# 字符分片长度
+SHINGLE_SIZE = 5
+# 标准化后文本的最小长度，过短的推文不参与去重
+MIN_TEXT_LENGTH = 20
+# MinHash 签名长度 = 分桶数 × 每桶行数
+LSH_BANDS = 16
+LSH_ROWS = 2
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_HASH_PARAMS = [
+    ((i * 0x9E3779B1 + 0x7F4A7C15) % _MERSENNE_PRIME | 1, (i * 0x85EBCA6B + 0xC2B2AE35) % _MERSENNE_PRIME)
+    for i in range(1, LSH_BANDS * LSH_ROWS + 1)
+]
+
+
+def normalize_text(text: str) -> tuple:
+    """
+    标准化推文文本：去除转推前缀、链接，合并空白并转小写
+    
+    :param text: 推文内容
+    :return: (标准化文本, 是否为截断文本)
+    """
+    text = RETWEET_PREFIX_PATTERN.sub('', text or '')
+    text = URL_PATTERN.sub(' ', text)
+    text = ' '.join(text.split()).lower()
+    truncated = text.endswith('…')
+    if truncated:
+        # 截断处的最后一个词通常不完整，一并去掉
+        text = text.rstrip('…').rsplit(' ', 1)[0] if ' ' in text else text.rstrip('…')
+    return text, truncated
+
+
+def shingles(text: str) -> set:
+    """
+    生成字符分片集合
+    
+    :param text: 标准化后的文本
+    :return: 分片哈希集合
+    """
+    if len(text) <= SHINGLE_SIZE:
+        return {zlib.crc32(text.encode('utf-8'))}
+    return {zlib.crc32(text[i:i + SHINGLE_SIZE].encode('utf-8')) for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def minhash_signature(shingle_set: set) -> tuple:
+    """
+    计算分片集合的 MinHash 签名
+    
+    :param shingle_set: 分片哈希集合
+    :return: 签名元组
+    """
+    return tuple(min((a * x + b) % _MERSENNE_PRIME for x in shingle_set) for a, b in _HASH_PARAMS)
+
+
+def similarity(query: set, other: set, containment: bool = False) -> float:
+    """
+    计算两个分片集合的相似度
+    
+    :param query: 待查推文的分片集合
+    :param other: 历史推文的分片集合
+    :param containment: 是否使用包含度（待查推文被历史推文覆盖的比例），仅用于待查推文是截断文本时；
+                        否则使用 Jaccard 相似度
+    :return: 0~1 之间的相似度
+    """
+    if not query or not other:
+        return 0.0
+    overlap = len(query & other)
+    if containment:
+        return overlap / len(query)
+    return overlap / len(query | other)
+
+
+class NearDuplicateIndex:
+    """基于 MinHash LSH 的近似重复推文索引，只保留最近的若干条记录"""
+    
+    def __init__(self, threshold: float = 0.9, max_records: int = 2000):
+        """
+        初始化索引
+        
+        :param threshold: 判定为近似重复的相似度阈值
+        :param max_records: 保留的历史记录条数
+        """
+        self.threshold = threshold
+        self.max_records = max_records
+        self.records = OrderedDict()
+        self.buckets = {}
+    
+    def _band_keys(self, signature: tuple) -> list:
+        return [(band, signature[band * LSH_ROWS:(band + 1) * LSH_ROWS]) for band in range(LSH_BANDS)]
+    
+    def add(self, record: dict):
+        """
+        将已处理的推文加入索引
+        
+        :param record: 推文数据（需包含 id、original_text 及AI字段）
+        """
+        record_id = record.get('id')
+        text, truncated = normalize_text(record.get('original_text', ''))
+        if not record_id or len(text) < MIN_TEXT_LENGTH or record_id in self.records:
+            return
+        
+        shingle_set = shingles(text)
+        signature = minhash_signature(shingle_set)
+        self.records[record_id] = (record, shingle_set, truncated, signature)
+        for key in self._band_keys(signature):
+            self.buckets.setdefault(key, set()).add(record_id)
+        
+        # 超出容量时淘汰最早加入的记录
+        while len(self.records) > self.max_records:
+            old_id, (_, _, _, old_signature) = self.records.popitem(last=False)
+            for key in self._band_keys(old_signature):
+                bucket = self.buckets.get(key)
+                if bucket:
+                    bucket.discard(old_id)
+                    if not bucket:
+                        del self.buckets[key]
+    
+    def find(self, text: str) -> tuple:
+        """
+        查找与给定文本最相似的历史推文，其AI结果可直接复用：
+        待查文本是截断文本时按包含度匹配（完整的原推文可以作为截断转推的结果来源）；
+        待查文本完整时不使用截断的历史推文，它们的翻译和解读只覆盖了部分内容
+        
+        :param text: 推文内容
+        :return: (推文数据, 相似度)，未找到时为 (None, 0.0)
+        """
+        normalized, truncated = normalize_text(text)
+        if len(normalized) < MIN_TEXT_LENGTH:
+            return None, 0.0
+        
+        shingle_set = shingles(normalized)
+        candidates = set()
+        for key in self._band_keys(minhash_signature(shingle_set)):
+            candidates.update(self.buckets.get(key, ()))
+        
+        best_record, best_score = None, 0.0
+        for record_id in candidates:
+            record, other_set, other_truncated, _ = self.records[record_id]
+            if other_truncated and not truncated:
+                continue
+            score = similarity(shingle_set, other_set, truncated)
+            if score > best_score:
+                best_record, best_score = record, score
+        
+        if best_score >= self.threshold:
+            return best_record, best_score
+        return None, 0.0
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+AI处理优先级队列
+
+抓取到的推文先进入优先级队列，再按优先级依次交给大模型处理：
+- 有效年龄 = 推文发布至今的时间 / 账号权重，有效年龄越小越先处理。
+  权重为2的账号发布2小时的推文，与权重为1的账号发布1小时的推文优先级相同
+- 发布时间超过 stale_after_hours 的积压推文进入低优先级层，所有新鲜推文处理完后才处理
+- 记录每条推文从入队到开始AI处理的等待时间，提供 p50/p90/p99 分位数
+"""
+
+import heapq
+import itertools
+import math
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+# 推文 createdAt 字段的格式（twitterapi.io 返回值）
+CREATED_AT_FORMAT = "%a %b %d %H:%M:%S %z %Y"
+# 等待时间分位数
+WAIT_PERCENTILES = (50, 90, 99)
+
+
+def parse_created_at(value: str):
+    """
+    解析推文发布时间
+
+    :param value: createdAt 字段
+    :return: 带时区的时间，无法解析时返回None
+    """
+    try:
+        return datetime.strptime(value or '', CREATED_AT_FORMAT)
+    except ValueError:
+        return None
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    """
+    最近秩法计算分位数
+
+    :param sorted_values: 已排序的数值列表
+    :param pct: 分位（0~100）
+    :return: 分位数
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+class AIWorkQueue:
+    """按账号权重和发布时间排序的AI处理队列"""
+
+    def __init__(self, account_weights: dict = None, stale_after_hours: float = 0, wait_samples: int = 1000):
+        """
+        :param account_weights: 账号权重（不区分大小写），未配置的账号权重为1
+        :param stale_after_hours: 超过该时长的推文降为低优先级，0表示不区分
+        :param wait_samples: 保留最近多少条等待时间用于计算分位数
+        """
+        self.account_weights = {name.lower(): float(weight) for name, weight in (account_weights or {}).items()}
+        self.stale_after_hours = stale_after_hours or 0
+        self.lock = threading.Lock()
+        self._heap = []
+        self._counter = itertools.count()
+        # id(推文对象) -> 入队时间（time.monotonic），开始处理时用于计算等待时间
+        self._enqueued_at = {}
+        self.wait_samples = deque(maxlen=wait_samples)
+        self.stale_count = 0
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def priority(self, tweet: dict, now: datetime = None) -> tuple:
+        """
+        计算推文优先级，数值越小越先处理
+
+        :param tweet: 推文数据（twitterapi.io 格式，需包含 author）
+        :param now: 当前时间，默认为当前UTC时间
+        :return: (层级, 有效年龄秒数)
+        """
+        now = now or datetime.now(timezone.utc)
+        created = parse_created_at(tweet.get('createdAt'))
+        age = max(0.0, (now - created).total_seconds()) if created else 0.0
+        weight = self.account_weights.get(str(tweet.get('author', '')).lower(), 1.0)
+        stale = bool(self.stale_after_hours) and age > self.stale_after_hours * 3600
+        return (1 if stale else 0, age / weight if weight > 0 else float('inf'))
+
+    def push(self, tweets: list):
+        """
+        推文入队
+
+        :param tweets: 推文列表
+        """
+        now = datetime.now(timezone.utc)
+        enqueued_at = time.monotonic()
+        with self.lock:
+            for tweet in tweets:
+                tier, effective_age = self.priority(tweet, now)
+                self.stale_count += tier
+                heapq.heappush(self._heap, (tier, effective_age, next(self._counter), tweet))
+                self._enqueued_at[id(tweet)] = enqueued_at
+
+    def drain(self) -> list:
+        """
+        按优先级取出队列中的全部推文
+
+        :return: 推文列表（优先级从高到低）
+        """
+        with self.lock:
+            tweets = [heapq.heappop(self._heap)[3] for _ in range(len(self._heap))]
+            self.stale_count = 0
+            return tweets
+
+    def mark_started(self, tweets: list):
+        """
+        推文开始AI处理，记录等待时间
+
+        :param tweets: 开始处理的推文
+        :return: 各推文的等待秒数（未记录入队时间的为None）
+        """
+        now = time.monotonic()
+        waits = []
+        with self.lock:
+            for tweet in tweets:
+                enqueued_at = self._enqueued_at.pop(id(tweet), None)
+                wait = None if enqueued_at is None else now - enqueued_at
+                if wait is not None:
+                    self.wait_samples.append(wait)
+                waits.append(wait)
+        return waits
+
+    def discard_pending(self):
+        """丢弃上一轮被中断时残留的推文和入队记录"""
+        with self.lock:
+            self._heap = []
+            self._enqueued_at.clear()
+            self.stale_count = 0
+
+    def wait_percentiles(self) -> dict:
+        """
+        最近推文的排队等待时间分位数（秒）
+
+        :return: {"count": 样本数, "p50": ..., "p90": ..., "p99": ...}
+        """
+        with self.lock:
+            samples = sorted(self.wait_samples)
+        result = {'count': len(samples)}
+        for pct in WAIT_PERCENTILES:
+            result[f'p{pct}'] = round(percentile(samples, pct), 2)
+        return result
@@ -0,0 +1,473 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+推文数据只读仓库
+
+Web页面只需要读取 data/ 下按天存储的推文，不需要大模型客户端和推文抓取逻辑。
+仓库按文件的修改时间缓存解析结果，文件未变化时直接返回内存中的数据。
+
+每个日期文件对应一份轻量索引（ID、作者、时间戳、处理日期），所有索引和全局排序
+会保存为 data/.tweets_snapshot.bin（marshal 格式）。进程重启时只需加载快照，
+按ID查找、作者列表等操作无需解析日期文件；只有修改时间或大小发生变化的文件才会重新建立索引，
+推文正文在真正需要时才按文件解析。
+
+冷启动需要解析大量日期文件时，可配置使用进程池并行解码（默认不并行），各文件内先按时间排好序，
+再通过 k 路归并得到全局排序，无需对全部推文重新排序。进程池使用 forkserver / spawn 方式启动子进程，
+在Web服务线程、监控线程运行时创建也不会因 fork 复制其他线程持有的锁而死锁。
+"""
+
+import heapq
+import marshal
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import json_codec
+
+# 快照文件名（以.开头，不会被当作日期文件）
+SNAPSHOT_FILENAME = ".tweets_snapshot.bin"
+# 快照格式版本，结构变化时递增
+SNAPSHOT_VERSION = 2
+# 两次写入快照的最小间隔（秒），避免监控频繁保存时反复重写
+SNAPSHOT_MIN_INTERVAL = 60
+# 需要解析的文件数达到该值时才启用进程池
+PARALLEL_MIN_FILES = 8
+# 进程池的子进程启动方式（不使用 fork：多线程进程中 fork 的子进程可能卡在其他线程持有的锁上）
+PARALLEL_START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+
+def load_day_file(file_path: str) -> list:
+    """
+    读取单个日期文件，文件不存在或解析失败时返回空列表；
+    解析失败时输出提示，但只读路径不改名文件（监控写入时由 tweet_storage.load_day_records 改名保留）
+
+    :param file_path: 日期文件路径
+    :return: 推文列表
+    """
+    try:
+        return json_codec.load_file(file_path)
+    except OSError:
+        return []
+    except json_codec.DecodeError as e:
+        print(f"⚠️ 数据文件损坏，页面将缺少该日期的推文: {file_path} ({e})")
+        return []
+
+
+def parse_day_file(file_path: str) -> tuple:
+    """
+    解析单个日期文件并建立索引（可在子进程中执行）
+
+    :param file_path: 日期文件路径
+    :return: (推文列表, 索引条目列表, 按时间倒序排列的条目位置)
+    """
+    tweets = load_day_file(file_path)
+    entries = [
+        (t.get('id'), t.get('author', ''), t.get('timestamp', ''), t.get('processed_date', ''))
+        for t in tweets
+    ]
+    sorted_positions = sorted(range(len(entries)), key=lambda pos: entries[pos][2], reverse=True)
+    return tweets, entries, sorted_positions
+
+
+class TweetRepository:
+    """按天存储的推文数据读取器"""
+
+    def __init__(self, data_dir: str = "data", use_snapshot: bool = True, load_workers: int = 1):
+        """
+        初始化仓库（不会创建目录或读取文件）
+
+        :param data_dir: 数据存储目录
+        :param use_snapshot: 是否读写索引快照
+        :param load_workers: 并行解析日期文件的进程数，1表示不并行，0表示使用CPU核数
+        """
+        self.data_dir = data_dir
+        self.use_snapshot = use_snapshot
+        self.load_workers = load_workers or os.cpu_count() or 1
+        # 进程池的启动上下文在构造时（Web服务和监控线程启动前）确定，不使用默认的 fork
+        self._mp_context = multiprocessing.get_context(PARALLEL_START_METHOD) if self.load_workers > 1 else None
+        self._lock = threading.Lock()
+        # 文件名 -> ((mtime_ns, size), 推文列表)，推文正文按需解析
+        self._file_cache = {}
+        # 文件名 -> ((mtime_ns, size), [(id, author, timestamp, processed_date), ...], 按时间倒序的位置)
+        self._file_index = {}
+        # 全局排序：[(文件名, 文件内位置), ...]，按时间倒序
+        self._order = []
+        self._ids = []
+        self._positions_by_id = {}
+        self._authors = []
+        self._cache_key = None
+        self._all_tweets = None
+        self._snapshot_checked = False
+        self._snapshot_written_at = None
+
+    def day_file_path(self, date_str: str) -> str:
+        """
+        获取指定日期的数据文件路径
+
+        :param date_str: 日期字符串 (YYYY-MM-DD)
+        :return: 文件路径
+        """
+        return os.path.join(self.data_dir, f"tweets_{date_str}.json")
+
+    def snapshot_path(self) -> str:
+        """
+        获取快照文件路径
+
+        :return: 快照文件路径
+        """
+        return os.path.join(self.data_dir, SNAPSHOT_FILENAME)
+
+    def list_day_files(self) -> list:
+        """
+        列出数据目录中的推文文件
+
+        :return: 文件名列表
+        """
+        if not os.path.exists(self.data_dir):
+            return []
+        return [
+            filename for filename in os.listdir(self.data_dir)
+            if filename.startswith("tweets_") and filename.endswith(".json")
+        ]
+
+    def _stat_files(self) -> dict:
+        """获取各日期文件的 (mtime_ns, size)"""
+        stats = {}
+        for filename in self.list_day_files():
+            try:
+                st = os.stat(os.path.join(self.data_dir, filename))
+            except OSError:
+                continue
+            stats[filename] = (st.st_mtime_ns, st.st_size)
+        return stats
+
+    def _read_file(self, filename: str, stat_key: tuple) -> list:
+        """读取单个文件，文件未变化时使用缓存"""
+        cached = self._file_cache.get(filename)
+        if cached and cached[0] == stat_key:
+            return cached[1]
+
+        tweets = load_day_file(os.path.join(self.data_dir, filename))
+        self._file_cache[filename] = (stat_key, tweets)
+        return tweets
+
+    def _refresh(self):
+        """检查文件修改时间，有变化时重建对应文件的索引和全局排序"""
+        stats = self._stat_files()
+        cache_key = tuple(sorted(stats.items()))
+        if cache_key == self._cache_key:
+            return
+
+        # 首次加载时优先使用快照
+        snapshot = None
+        if self.use_snapshot and not self._snapshot_checked:
+            self._snapshot_checked = True
+            snapshot = self._load_snapshot(cache_key)
+
+        # 删除已不存在的文件
+        for cache in (self._file_cache, self._file_index):
+            for filename in list(cache):
+                if filename not in stats:
+                    del cache[filename]
+
+        changed = [
+            filename for filename, stat_key in stats.items()
+            if filename not in self._file_index or self._file_index[filename][0] != stat_key
+        ]
+        self._parse_files(changed, stats)
+
+        if snapshot:
+            # 所有文件均未变化，直接使用快照中的排序和索引
+            order, ids, authors = snapshot['order'], snapshot['ids'], snapshot['authors']
+        else:
+            # 各文件内已按时间排序，k 路归并得到全局排序（最新的在前）
+            streams = [
+                [(entries[pos][2], filename, pos) for pos in sorted_positions]
+                for filename, (_, entries, sorted_positions) in self._file_index.items()
+            ]
+            order = [(filename, pos) for _, filename, pos in heapq.merge(*streams, key=lambda x: x[0], reverse=True)]
+            ids = [self._file_index[filename][1][pos][0] for filename, pos in order]
+            authors = sorted({
+                entry[1] for _, entries, _ in self._file_index.values() for entry in entries if entry[1]
+            })
+
+        self._order = order
+        self._ids = ids
+        # ID重复时保留最新的一条
+        self._positions_by_id = dict(zip(reversed(ids), reversed(order)))
+        self._positions_by_id.pop(None, None)
+        self._authors = authors
+        self._cache_key = cache_key
+        self._all_tweets = None
+
+        if self.use_snapshot and changed:
+            now = time.monotonic()
+            if self._snapshot_written_at is None or now - self._snapshot_written_at >= SNAPSHOT_MIN_INTERVAL:
+                self._snapshot_written_at = now
+                self._save_snapshot(cache_key)
+
+    def _parse_files(self, filenames: list, stats: dict):
+        """
+        解析日期文件并更新正文缓存和索引，文件较多时使用进程池
+
+        :param filenames: 需要解析的文件名列表
+        :param stats: 各文件的 (mtime_ns, size)
+        """
+        paths = [os.path.join(self.data_dir, filename) for filename in filenames]
+        workers = min(self.load_workers, len(paths))
+        if workers > 1 and len(paths) >= PARALLEL_MIN_FILES:
+            with ProcessPoolExecutor(max_workers=workers, mp_context=self._mp_context) as executor:
+                results = list(executor.map(parse_day_file, paths, chunksize=max(1, len(paths) // (workers * 4))))
+        else:
+            results = [parse_day_file(path) for path in paths]
+
+        for filename, (tweets, entries, sorted_positions) in zip(filenames, results):
+            self._file_cache[filename] = (stats[filename], tweets)
+            self._file_index[filename] = (stats[filename], entries, sorted_positions)
+
+    def _load_snapshot(self, cache_key: tuple):
+        """
+        加载快照中与当前文件状态一致的日期文件索引
+
+        :param cache_key: 当前各文件的 (文件名, (mtime_ns, size)) 列表
+        :return: 所有文件均未变化时返回快照内容，否则返回None
+        """
+        try:
+            with open(self.snapshot_path(), 'rb') as f:
+                snapshot = marshal.loads(f.read())
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+        if not isinstance(snapshot, dict) or snapshot.get('version') != SNAPSHOT_VERSION \
+                or snapshot.get('python') != tuple(sys.version_info[:2]):
+            return None
+
+        current = dict(cache_key)
+        for filename, (stat_key, entries, sorted_positions) in snapshot.get('files', {}).items():
+            if current.get(filename) == stat_key:
+                self._file_index[filename] = (stat_key, entries, sorted_positions)
+
+        print(f"已加载推文索引快照: {len(self._file_index)}/{len(current)} 个日期文件未变化")
+        if snapshot.get('cache_key') == cache_key:
+            return snapshot
+        return None
+
+    def _save_snapshot(self, cache_key: tuple):
+        """
+        写入快照（临时文件 + 原子替换）
+
+        :param cache_key: 当前各文件的 (文件名, (mtime_ns, size)) 列表
+        """
+        snapshot = {
+            'version': SNAPSHOT_VERSION,
+            'python': tuple(sys.version_info[:2]),
+            'cache_key': cache_key,
+            'files': dict(self._file_index),
+            'order': self._order,
+            'ids': self._ids,
+            'authors': self._authors,
+        }
+        # Web进程和监控进程可能同时写入，临时文件名带上进程号
+        tmp_path = f"{self.snapshot_path()}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                marshal.dump(snapshot, f)
+            os.replace(tmp_path, self.snapshot_path())
+        except OSError as e:
+            print(f"写入推文索引快照失败: {e}")
+
+    def _get_record(self, filename: str, pos: int) -> dict:
+        """按位置读取推文正文"""
+        stat_key = self._file_index[filename][0]
+        tweets = self._read_file(filename, stat_key)
+        return tweets[pos] if pos < len(tweets) else None
+
+    def load_tweets_by_date(self, date_str: str = None) -> list:
+        """
+        根据日期加载推文数据
+
+        :param date_str: 日期字符串 (YYYY-MM-DD)，默认为今天
+        :return: 推文数据列表
+        """
+        if date_str is None:
+            date_str = datetime.now().strftime("%Y-%m-%d")
+
+        return load_day_file(self.day_file_path(date_str))
+
+    def get_all_tweets(self) -> list:
+        """
+        获取所有存储的推文数据
+
+        :return: 所有推文数据列表（按时间倒序）
+        """
+        with self._lock:
+            self._refresh()
+            if self._all_tweets is None:
+                records = (self._get_record(filename, pos) for filename, pos in self._order)
+                self._all_tweets = [record for record in records if record is not None]
+            return list(self._all_tweets)
+
+    def get_tweet(self, tweet_id: str) -> dict:
+        """
+        根据ID查找推文，只解析该推文所在的日期文件
+
+        :param tweet_id: 推文ID
+        :return: 推文数据，未找到时返回None
+        """
+        with self._lock:
+            self._refresh()
+            position = self._positions_by_id.get(tweet_id)
+            return self._get_record(*position) if position else None
+
+    def stored_ids(self, tweet_ids) -> set:
+        """
+        筛选出已存储的推文ID（只查索引，不解析推文正文）
+
+        :param tweet_ids: 推文ID列表
+        :return: 其中已存储的ID集合
+        """
+        with self._lock:
+            self._refresh()
+            return {tweet_id for tweet_id in tweet_ids if tweet_id in self._positions_by_id}
+
+    def high_water_marks(self) -> dict:
+        """
+        各作者已存储推文的最大ID（推文ID随发布时间递增），只查索引
+
+        :return: 作者小写 -> 最大数字ID，非数字ID不计入
+        """
+        with self._lock:
+            self._refresh()
+            marks = {}
+            for _, entries, _ in self._file_index.values():
+                for tweet_id, author, _, _ in entries:
+                    if author and isinstance(tweet_id, str) and tweet_id.isdigit():
+                        key = author.lower()
+                        value = int(tweet_id)
+                        if value > marks.get(key, -1):
+                            marks[key] = value
+            return marks
+
+    def get_authors(self) -> list:
+        """
+        获取所有作者列表
+
+        :return: 作者列表
+        """
+        with self._lock:
+            self._refresh()
+            return list(self._authors)
+
+    def version(self) -> tuple:
+        """
+        获取数据版本（各日期文件的修改时间和大小），数据变化时版本随之变化
+
+        :return: 版本标识
+        """
+        with self._lock:
+            self._refresh()
+            return self._cache_key
+
+    def get_latest(self, author: str = "", limit: int = 50) -> list:
+        """
+        获取最新的若干条推文，只解析包含这些推文的日期文件
+
+        :param author: 作者名，不区分大小写，为空时不筛选
+        :param limit: 最多返回的条数
+        :return: 推文数据列表（按时间倒序）
+        """
+        author = author.lower()
+        with self._lock:
+            self._refresh()
+            tweets = []
+            for filename, pos in self._order:
+                if len(tweets) >= limit:
+                    break
+                if author and self._file_index[filename][1][pos][1].lower() != author:
+                    continue
+                record = self._get_record(filename, pos)
+                if record is not None:
+                    tweets.append(record)
+            return tweets
+
+    def get_newer_than(self, tweet_id: str, author: str = "", date: str = "", limit: int = 100):
+        """
+        获取比指定推文更新的推文，只遍历排在它前面的索引条目
+
+        :param tweet_id: 推文ID
+        :param author: 作者名，不区分大小写，为空时不筛选
+        :param date: 处理日期前缀，为空时不筛选
+        :param limit: 最多遍历的新推文条数
+        :return: 推文数据列表（按时间倒序）；指定推文不存在或新推文超过 limit 条时返回None
+        """
+        author = author.lower()
+        with self._lock:
+            self._refresh()
+            position = self._positions_by_id.get(tweet_id)
+            if position is None:
+                return None
+
+            tweets = []
+            for rank, (filename, pos) in enumerate(self._order):
+                if (filename, pos) == position:
+                    return tweets
+                if rank >= limit:
+                    return None
+                _, entry_author, _, processed_date = self._file_index[filename][1][pos]
+                if author and entry_author.lower() != author:
+                    continue
+                if date and not processed_date.startswith(date):
+                    continue
+                record = self._get_record(filename, pos)
+                if record is not None:
+                    tweets.append(record)
+            return None
+
+    def iter_tweets(self, author: str = "", date: str = ""):
+        """
+        逐条读取推文，用于大批量导出
+
+        按日期文件倒序、文件内按时间倒序返回；未缓存的日期文件读取后不放入缓存，
+        内存占用只与单个日期文件的大小有关。作者和日期筛选先在索引上进行，不包含匹配推文的文件不会被解析。
+
+        :param author: 作者名，不区分大小写，为空时不筛选
+        :param date: 处理日期前缀（如 2025-08），为空时不筛选
+        :return: 推文数据生成器
+        """
+        author = author.lower()
+        with self._lock:
+            self._refresh()
+            files = [
+                (filename, stat_key, entries, sorted_positions)
+                for filename, (stat_key, entries, sorted_positions) in sorted(self._file_index.items(), reverse=True)
+            ]
+
+        for filename, stat_key, entries, sorted_positions in files:
+            positions = [
+                pos for pos in sorted_positions
+                if (not author or entries[pos][1].lower() == author)
+                and (not date or entries[pos][3].startswith(date))
+            ]
+            if not positions:
+                continue
+            cached = self._file_cache.get(filename)
+            if cached and cached[0] == stat_key:
+                tweets = cached[1]
+            else:
+                tweets = load_day_file(os.path.join(self.data_dir, filename))
+            for pos in positions:
+                if pos < len(tweets):
+                    yield tweets[pos]
+
+    def count(self) -> int:
+        """
+        获取推文总数
+
+        :return: 推文数量
+        """
+        with self._lock:
+            self._refresh()
+            return len(self._order)
@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+推文统计汇总表
+
+监控每保存一条新推文就增量更新 data/.stats.json 中的汇总数据：
+- 按日期：推文数、AI处理失败数、延后重试次数、处理延迟（推文发布到处理完成的秒数）
+- 按作者：推文数、失败数、延后重试次数、最近一次处理时间
+- 按作者和日期：推文数、失败数、延后重试次数
+
+AI处理失败的推文不再保存：每次失败后延后重试计入「延后重试次数」，
+连续失败达到上限被放弃时计入推文数和失败数（与早期版本保存的失败记录口径相同）。
+
+Web页面读取汇总文件即可得到统计数据，耗时与归档大小无关；
+汇总文件不存在或格式版本不一致时，从日期文件完整重建一次；
+被放弃的推文和延后重试次数没有写入日期文件，重建后只保留日期文件中的历史失败记录。
+
+用法示例（手动重建）：
+    python tweet_stats.py --rebuild
+"""
+
+import argparse
+import os
+import threading
+from datetime import datetime, timezone
+
+import json_codec
+from tweet_repository import TweetRepository, load_day_file
+from tweet_storage import data_dir_lock, write_json_atomic
+
+# 汇总文件名（以.开头，不会被当作日期文件）
+STATS_FILENAME = ".stats.json"
+# 汇总格式版本，结构变化时递增
+STATS_VERSION = 2
+# 早期版本AI处理失败时写入的占位文本（现在失败的推文不再保存，见 TweetStats.record_failure）
+AI_FAILURE_TEXT = "AI处理失败"
+# 失败记录中AI字段的前缀：早期版本异常时保存为「处理失败: 原因」（标题）和「AI处理失败: 原因」（解读）
+AI_FAILURE_PREFIXES = (AI_FAILURE_TEXT, "处理失败")
+# 推文 created_at 字段的格式（twitterapi.io 返回值）
+CREATED_AT_FORMAT = "%a %b %d %H:%M:%S %z %Y"
+
+
+def processing_latency(record: dict):
+    """
+    计算推文从发布到处理完成的秒数
+
+    :param record: 推文数据
+    :return: 延迟秒数，无法解析时返回None
+    """
+    try:
+        created = datetime.strptime(record.get('created_at', ''), CREATED_AT_FORMAT)
+        processed = datetime.fromisoformat(record.get('timestamp', '')).replace(tzinfo=timezone.utc)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (processed - created).total_seconds())
+
+
+def is_failed(record: dict) -> bool:
+    """判断推文的AI处理是否失败（兼容早期版本保存的各种失败记录）"""
+    return any(
+        isinstance(record.get(key), str) and record[key].startswith(AI_FAILURE_PREFIXES)
+        for key in ('ai_title', 'ai_translation', 'ai_analysis')
+    )
+
+
+def empty_stats() -> dict:
+    """空的汇总数据"""
+    return {
+        'version': STATS_VERSION,
+        'total': 0,
+        'failed': 0,
+        'deferred': 0,
+        'latency_sum': 0.0,
+        'latency_count': 0,
+        'by_day': {},
+        'by_author': {},
+        'by_author_day': {},
+        'updated_at': None,
+    }
+
+
+def _entries(stats: dict, author: str, day: str) -> tuple:
+    """获取（不存在时创建）日期、作者、作者-日期三张表中的条目"""
+    day_stats = stats['by_day'].setdefault(day, {
+        'count': 0, 'failed': 0, 'deferred': 0, 'latency_sum': 0.0, 'latency_count': 0, 'latency_max': 0.0
+    })
+    author_stats = stats['by_author'].setdefault(author, {'count': 0, 'failed': 0, 'deferred': 0, 'last_seen': ''})
+    author_day = stats['by_author_day'].setdefault(author, {}).setdefault(day, {'count': 0, 'failed': 0, 'deferred': 0})
+    return day_stats, author_stats, author_day
+
+
+def add_deferral(stats: dict, author: str, day: str):
+    """
+    将一次AI处理失败后的延后重试计入汇总数据
+
+    :param stats: 汇总数据
+    :param author: 作者
+    :param day: 日期（YYYY-MM-DD）
+    """
+    stats['deferred'] += 1
+    for entry in _entries(stats, author or 'Unknown', day):
+        entry['deferred'] += 1
+
+
+def add_record(stats: dict, record: dict):
+    """
+    将一条推文计入汇总数据
+
+    :param stats: 汇总数据
+    :param record: 推文数据
+    """
+    author = record.get('author', '') or 'Unknown'
+    day = record.get('processed_date', '') or (record.get('timestamp', '') or '')[:10]
+    failed = is_failed(record)
+    latency = processing_latency(record)
+
+    stats['total'] += 1
+    stats['failed'] += failed
+
+    day_stats, author_stats, author_day = _entries(stats, author, day)
+    day_stats['count'] += 1
+    day_stats['failed'] += failed
+
+    author_stats['count'] += 1
+    author_stats['failed'] += failed
+    author_stats['last_seen'] = max(author_stats['last_seen'], record.get('timestamp', '') or '')
+
+    author_day['count'] += 1
+    author_day['failed'] += failed
+
+    if latency is not None:
+        stats['latency_sum'] += latency
+        stats['latency_count'] += 1
+        day_stats['latency_sum'] += latency
+        day_stats['latency_count'] += 1
+        day_stats['latency_max'] = max(day_stats['latency_max'], latency)
+
+
+class TweetStats:
+    """增量维护的推文统计汇总"""
+
+    def __init__(self, data_dir: str = "data"):
+        """
+        初始化汇总（不会读写文件）
+
+        :param data_dir: 数据存储目录
+        """
+        self.data_dir = data_dir
+        self.lock = threading.Lock()
+        self._stats = None
+        self._stat_key = None
+
+    def stats_path(self) -> str:
+        """
+        获取汇总文件路径
+
+        :return: 汇总文件路径
+        """
+        return os.path.join(self.data_dir, STATS_FILENAME)
+
+    def _load(self, rebuild: bool = True) -> dict:
+        """
+        读取汇总文件，文件变化时重新加载
+
+        :param rebuild: 文件缺失或版本不一致时是否重建（调用方需同时持有数据目录写锁）
+        :return: 汇总数据；需要重建而 rebuild 为 False 时返回None
+        """
+        try:
+            st = os.stat(self.stats_path())
+            stat_key = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            stat_key = None
+
+        if self._stats is not None and stat_key == self._stat_key:
+            return self._stats
+
+        stats = None
+        if stat_key is not None:
+            try:
+                stats = json_codec.load_file(self.stats_path())
+            except (OSError, json_codec.DecodeError):
+                stats = None
+        if not isinstance(stats, dict) or stats.get('version') != STATS_VERSION:
+            return self._rebuild() if rebuild else None
+
+        self._stats = stats
+        self._stat_key = stat_key
+        return stats
+
+    def _save(self, stats: dict):
+        """写入汇总文件并记录其状态，避免下次读取时重复加载"""
+        stats['updated_at'] = datetime.utcnow().isoformat()
+        os.makedirs(self.data_dir, exist_ok=True)
+        write_json_atomic(self.stats_path(), stats)
+        st = os.stat(self.stats_path())
+        self._stats = stats
+        self._stat_key = (st.st_mtime_ns, st.st_size)
+
+    def _rebuild(self) -> dict:
+        """从所有日期文件重建汇总（逐个文件读取，不保留正文）"""
+        stats = empty_stats()
+        repository = TweetRepository(self.data_dir, use_snapshot=False)
+        for filename in sorted(repository.list_day_files()):
+            for record in load_day_file(os.path.join(self.data_dir, filename)):
+                add_record(stats, record)
+        if os.path.isdir(self.data_dir):
+            self._save(stats)
+        else:
+            self._stats = stats
+        print(f"已重建推文统计汇总: {stats['total']} 条推文")
+        return stats
+
+    def rebuild(self) -> dict:
+        """
+        从日期文件完整重建汇总
+
+        :return: 汇总数据
+        """
+        with data_dir_lock(self.data_dir), self.lock:
+            return self._rebuild()
+
+    def ensure_loaded(self) -> dict:
+        """
+        加载汇总，文件缺失或版本不一致时在数据目录写锁内重建
+
+        :return: 汇总数据
+        """
+        with data_dir_lock(self.data_dir), self.lock:
+            return self._load()
+
+    def record(self, record: dict):
+        """
+        新推文保存后增量更新汇总
+
+        :param record: 推文数据
+        """
+        with data_dir_lock(self.data_dir), self.lock:
+            stats = self._load()
+            add_record(stats, record)
+            self._save(stats)
+
+    def record_failure(self, tweet: dict, dropped: bool):
+        """
+        记录一次AI处理失败
+
+        :param tweet: 推文数据（twitterapi.io 格式，已填充 author）
+        :param dropped: 是否已达到重试上限被放弃；放弃的推文计入推文数和失败数，否则计入延后重试次数
+        """
+        now = datetime.now()
+        author = tweet.get('author', '')
+        with data_dir_lock(self.data_dir), self.lock:
+            stats = self._load()
+            if dropped:
+                add_record(stats, {
+                    'author': author,
+                    'ai_title': AI_FAILURE_TEXT,
+                    'timestamp': datetime.utcnow().isoformat(),
+                    'processed_date': now.strftime("%Y-%m-%d"),
+                })
+            else:
+                add_deferral(stats, author, now.strftime("%Y-%m-%d"))
+            self._save(stats)
+
+    @staticmethod
+    def _author_summary(stats: dict, name: str, value: dict, date: str) -> dict:
+        """单个作者的统计结果，指定日期时只统计匹配的日期"""
+        days = {
+            day: day_value for day, day_value in sorted(stats['by_author_day'].get(name, {}).items())
+            if day.startswith(date)
+        }
+        return {
+            'count': sum(day_value['count'] for day_value in days.values()) if date else value['count'],
+            'failed': sum(day_value['failed'] for day_value in days.values()) if date else value['failed'],
+            'deferred': sum(day_value['deferred'] for day_value in days.values()) if date else value['deferred'],
+            'last_seen': value['last_seen'],
+            'per_day': {day: day_value['count'] for day, day_value in days.items()},
+        }
+
+    def summary(self, author: str = "", date: str = "") -> dict:
+        """
+        获取统计结果，可按作者和日期（前缀匹配，如 2025-08）筛选
+
+        :param author: 作者名，不区分大小写
+        :param date: 日期前缀
+        :return: 统计结果
+        """
+        with self.lock:
+            stats = self._load(rebuild=False)
+        if stats is None:
+            # 需要重建时与监控的增量更新使用同一把跨进程锁，避免覆盖其他进程的计数
+            self.ensure_loaded()
+        with self.lock:
+            stats = self._load(rebuild=False) or self._stats
+
+            authors = stats['by_author']
+            if author:
+                authors = {name: value for name, value in authors.items() if name.lower() == author.lower()}
+            days = stats['by_day']
+            if date:
+                days = {day: value for day, value in days.items() if day.startswith(date)}
+
+            if author:
+                # 按作者筛选时使用作者-日期表（处理延迟只按日期汇总）
+                per_day = {}
+                failed = deferred = 0
+                for name in authors:
+                    for day, value in stats['by_author_day'].get(name, {}).items():
+                        if day.startswith(date):
+                            per_day[day] = per_day.get(day, 0) + value['count']
+                            failed += value['failed']
+                            deferred += value['deferred']
+                total = sum(per_day.values())
+                latency_sum = latency_count = 0
+            elif date:
+                per_day = {day: value['count'] for day, value in days.items()}
+                total = sum(per_day.values())
+                failed = sum(value['failed'] for value in days.values())
+                deferred = sum(value['deferred'] for value in days.values())
+                latency_sum = sum(value['latency_sum'] for value in days.values())
+                latency_count = sum(value['latency_count'] for value in days.values())
+            else:
+                per_day = {day: value['count'] for day, value in days.items()}
+                total = stats['total']
+                failed = stats['failed']
+                deferred = stats['deferred']
+                latency_sum = stats['latency_sum']
+                latency_count = stats['latency_count']
+
+            return {
+                'total': total,
+                'failed': failed,
+                'failure_rate': round(failed / total, 4) if total else None,
+                'deferred': deferred,
+                'avg_latency_seconds': round(latency_sum / latency_count, 1) if latency_count else None,
+                'per_day': dict(sorted(per_day.items())),
+                'latency_by_day': {
+                    day: {
+                        'avg': round(value['latency_sum'] / value['latency_count'], 1) if value['latency_count'] else None,
+                        'max': round(value['latency_max'], 1),
+                    }
+                    for day, value in sorted(days.items())
+                } if not author else {},
+                'authors': {
+                    name: self._author_summary(stats, name, value, date)
+                    for name, value in sorted(authors.items())
+                },
+                'updated_at': stats['updated_at'],
+            }
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="推文统计汇总")
+    parser.add_argument('--data-dir', default="data", help="数据目录")
+    parser.add_argument('--rebuild', action='store_true', help="从日期文件重建汇总")
+    args = parser.parse_args()
+
+    stats = TweetStats(args.data_dir)
+    if args.rebuild:
+        stats.rebuild()
+    print(json_codec.dumps(stats.summary(), pretty=True))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+推文数据的崩溃安全写入
+
+- write_bytes_atomic / write_json_atomic：临时文件 + fsync + 原子替换，
+  进程在写入过程中退出也不会留下只写了一半的文件
+- TweetJournal：预写日志（WAL）。新推文先追加到 data/.journal.wal 并 fsync（此时即已持久化），
+  累积 DEFAULT_CHECKPOINT_EVERY 条或最早一条已等待 DEFAULT_CHECKPOINT_INTERVAL 秒后才合并写入日期文件
+  （监控每轮结束时也会合并），避免每条推文都重写整个日期文件；
+  恢复窗口：崩溃时至多这么多条尚未合并的记录留在日志中，启动时重放写入日期文件，不会丢失。
+  Web页面读取日期文件，新推文最迟在合并后可见
+- data_dir_lock：数据目录的跨进程写锁。多个监控进程共用数据目录时，
+  日期文件、统计汇总等「读取-修改-写回」操作在锁内串行执行
+"""
+
+import os
+import threading
+import time
+
+import json_codec
+
+try:
+    import fcntl
+except ImportError:  # Windows 没有 flock，只在进程内互斥
+    fcntl = None
+
+# 预写日志文件名（以.开头，不会被当作日期文件）
+JOURNAL_FILENAME = ".journal.wal"
+# 所有预写日志文件名的前缀和后缀（分片监控进程使用 .journal-<进程ID>.wal）
+JOURNAL_PREFIX = ".journal"
+JOURNAL_SUFFIX = ".wal"
+# 预写日志默认累积多少条记录后合并写入日期文件
+DEFAULT_CHECKPOINT_EVERY = 20
+# 最早一条未合并的记录等待多少秒后，下次追加时合并写入日期文件
+DEFAULT_CHECKPOINT_INTERVAL = 60
+# 跨进程写锁文件名
+WRITE_LOCK_FILENAME = ".write.lock"
+
+# 锁文件绝对路径 -> DataDirLock，同一进程内共用一个锁对象以支持重入
+_data_dir_locks = {}
+_data_dir_locks_guard = threading.Lock()
+
+
+def _fsync_dir(dir_path: str):
+    """同步目录项，确保 rename 结果落盘（Windows 不支持时忽略）"""
+    try:
+        fd = os.open(dir_path or ".", os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def write_bytes_atomic(file_path: str, data: bytes):
+    """
+    原子写入文件：先写临时文件并 fsync，再替换目标文件
+
+    :param file_path: 目标文件路径
+    :param data: 文件内容
+    """
+    tmp_path = f"{file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, file_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    _fsync_dir(os.path.dirname(file_path))
+
+
+def write_json_atomic(file_path: str, obj, pretty: bool = False):
+    """
+    原子写入JSON文件
+
+    :param file_path: 目标文件路径
+    :param obj: 要写入的对象
+    :param pretty: 是否使用两个空格缩进
+    """
+    write_bytes_atomic(file_path, json_codec.dumps_bytes(obj, pretty))
+
+
+def load_day_records(file_path: str) -> list:
+    """
+    读取日期文件用于追加写入；文件损坏时改名保留，避免被新数据覆盖
+
+    :param file_path: 日期文件路径
+    :return: 推文列表
+    """
+    if not os.path.exists(file_path):
+        return []
+    try:
+        data = json_codec.load_file(file_path)
+        return data if isinstance(data, list) else []
+    except json_codec.DecodeError:
+        corrupt_path = f"{file_path}.corrupt-{int(time.time())}"
+        os.replace(file_path, corrupt_path)
+        print(f"⚠️ 数据文件损坏，已另存为 {corrupt_path}")
+        return []
+
+
+def _read_journal_entries(journal_path: str) -> list:
+    """
+    读取预写日志中的记录
+
+    :param journal_path: 日志文件路径
+    :return: [(日期文件名, 推文数据), ...]
+    """
+    with open(journal_path, 'rb') as f:
+        lines = f.read().split(b"\n")
+    entries = []
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            entry = json_codec.loads(line)
+        except json_codec.DecodeError:
+            # 最后一行可能在追加时被截断，该记录尚未确认写入，直接丢弃
+            continue
+        entries.append((entry['file'], entry['record']))
+    return entries
+
+
+class DataDirLock:
+    """数据目录的跨进程写锁（基于 flock，同一线程可重入）"""
+
+    def __init__(self, lock_path: str):
+        """
+        :param lock_path: 锁文件路径
+        """
+        self.lock_path = lock_path
+        self.lock = threading.RLock()
+        self.depth = 0
+        self.fd = None
+
+    def __enter__(self):
+        self.lock.acquire()
+        try:
+            if self.depth == 0 and fcntl is not None:
+                os.makedirs(os.path.dirname(self.lock_path), exist_ok=True)
+                self.fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT)
+                fcntl.flock(self.fd, fcntl.LOCK_EX)
+        except Exception:
+            self.lock.release()
+            raise
+        self.depth += 1
+        return self
+
+    def __exit__(self, *exc_info):
+        self.depth -= 1
+        if self.depth == 0 and self.fd is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+            os.close(self.fd)
+            self.fd = None
+        self.lock.release()
+
+
+def data_dir_lock(data_dir: str) -> DataDirLock:
+    """
+    获取数据目录的跨进程写锁；需要同时持有组件自身的锁时，先获取此锁，避免死锁
+
+    :param data_dir: 数据存储目录
+    :return: DataDirLock（用作上下文管理器）
+    """
+    lock_path = os.path.abspath(os.path.join(data_dir, WRITE_LOCK_FILENAME))
+    with _data_dir_locks_guard:
+        if lock_path not in _data_dir_locks:
+            _data_dir_locks[lock_path] = DataDirLock(lock_path)
+        return _data_dir_locks[lock_path]
+
+
+class TweetJournal:
+    """推文写入的预写日志"""
+
+    def __init__(self, data_dir: str = "data", checkpoint_every: int = DEFAULT_CHECKPOINT_EVERY,
+                 filename: str = JOURNAL_FILENAME, checkpoint_interval: float = DEFAULT_CHECKPOINT_INTERVAL):
+        """
+        初始化日志（不会读写文件）
+
+        :param data_dir: 数据存储目录
+        :param checkpoint_every: 累积多少条记录后合并写入日期文件，1表示每条立即写入
+        :param filename: 日志文件名，多个监控进程共用数据目录时各自使用独立的日志
+        :param checkpoint_interval: 最早一条未合并的记录等待多少秒后合并写入日期文件，0表示不按时间合并
+        """
+        self.data_dir = data_dir
+        self.filename = filename
+        self.checkpoint_every = max(1, int(checkpoint_every or 1))
+        self.checkpoint_interval = checkpoint_interval
+        # 最早一条未合并记录的追加时间（monotonic）
+        self._oldest_pending_at = None
+        self.lock = threading.RLock()
+        # 尚未合并到日期文件的记录：[(文件名, 推文数据), ...]
+        self.pending = []
+        self.replayed = False
+
+    def journal_path(self) -> str:
+        """
+        获取日志文件路径
+
+        :return: 日志文件路径
+        """
+        return os.path.join(self.data_dir, self.filename)
+
+    def pending_ids(self, filename: str) -> set:
+        """
+        获取某个日期文件尚未合并的推文ID
+
+        :param filename: 日期文件名
+        :return: 推文ID集合
+        """
+        with self.lock:
+            return {record.get('id') for name, record in self.pending if name == filename}
+
+    def other_pending_ids(self) -> set:
+        """
+        获取数据目录下其他预写日志（其他监控进程，或尚未重放的失效进程）中尚未合并的推文ID，
+        在跨进程锁内读取，用于分片接手账号后避免重复处理同一条推文
+
+        :return: 推文ID集合
+        """
+        ids = set()
+        with data_dir_lock(self.data_dir):
+            try:
+                names = os.listdir(self.data_dir)
+            except OSError:
+                return ids
+            for name in names:
+                if name == self.filename or not (name.startswith(JOURNAL_PREFIX) and name.endswith(JOURNAL_SUFFIX)):
+                    continue
+                try:
+                    entries = _read_journal_entries(os.path.join(self.data_dir, name))
+                except OSError:
+                    continue
+                ids.update(record.get('id') for _, record in entries)
+        return ids
+
+    def append(self, filename: str, record: dict):
+        """
+        追加一条记录：写入日志并 fsync 后即视为持久化，达到条数或等待时间阈值时合并到日期文件
+
+        :param filename: 日期文件名（如 tweets_2025-08-14.json）
+        :param record: 推文数据
+        """
+        with data_dir_lock(self.data_dir), self.lock:
+            self.replay()
+            os.makedirs(self.data_dir, exist_ok=True)
+            line = json_codec.dumps_bytes({'file': filename, 'record': record}) + b"\n"
+            with open(self.journal_path(), 'ab') as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+            self.pending.append((filename, record))
+            if self._oldest_pending_at is None:
+                self._oldest_pending_at = time.monotonic()
+            waited = time.monotonic() - self._oldest_pending_at
+            if len(self.pending) >= self.checkpoint_every or (self.checkpoint_interval and waited >= self.checkpoint_interval):
+                self.checkpoint()
+
+    def checkpoint(self) -> int:
+        """
+        将日志中的记录按ID去重后合并写入日期文件，然后清空日志
+
+        :return: 实际写入的新记录数
+        """
+        with data_dir_lock(self.data_dir), self.lock:
+            if not self.pending:
+                return 0
+
+            by_file = {}
+            for filename, record in self.pending:
+                by_file.setdefault(filename, []).append(record)
+
+            written = 0
+            for filename, records in by_file.items():
+                file_path = os.path.join(self.data_dir, filename)
+                existing = load_day_records(file_path)
+                existing_ids = {item.get('id') for item in existing if item.get('id')}
+                new_records = []
+                for record in records:
+                    if record.get('id') not in existing_ids:
+                        existing_ids.add(record.get('id'))
+                        new_records.append(record)
+                if new_records:
+                    write_json_atomic(file_path, existing + new_records)
+                    written += len(new_records)
+
+            # 所有日期文件都已落盘，清空日志；若在此之前崩溃，重放时按ID去重不会重复写入
+            write_bytes_atomic(self.journal_path(), b"")
+            self.pending = []
+            self._oldest_pending_at = None
+            return written
+
+    def replay(self) -> int:
+        """
+        重放日志中尚未合并的记录（每个实例只执行一次）
+
+        :return: 恢复的新记录数
+        """
+        with data_dir_lock(self.data_dir), self.lock:
+            if self.replayed:
+                return 0
+            self.replayed = True
+
+            journal_path = self.journal_path()
+            if not os.path.exists(journal_path) or os.path.getsize(journal_path) == 0:
+                return 0
+
+            self.pending.extend(_read_journal_entries(journal_path))
+
+            count = len(self.pending)
+            recovered = self.checkpoint()
+            print(f"预写日志重放完成: {count} 条日志记录，恢复 {recovered} 条推文")
+            return recovered
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+推文处理追踪与性能分析
+
+追踪（可在设置页开关，配置项 TRACE_ENABLED）：每条推文处理结束（保存、重复或延后）时，
+向数据目录下的滚动日志 .trace.ndjson 追加一行记录：
+- fetch_page / fetch_page_ms：推文所在的抓取页及该页的请求耗时
+- queue_wait_ms：在AI队列中的等待时间
+- llm_ms：各提示词（translation / analysis / title / batch）的请求耗时，批量请求的耗时计入其中每条推文
+- persist_ms：save_tweet_data 的耗时（去重检查、预写日志、日期文件写入）
+每轮结束时另外追加一行 type 为 cycle 的汇总（本轮总耗时、抓取/大模型/写入耗时和页数）。
+日志超过 MAX_TRACE_BYTES 时重命名为 .trace.ndjson.1（只保留一个旧文件）。
+
+性能分析：在设置页指定接下来 N 轮扫描使用 cProfile 分析（只分析监控线程，大模型请求在线程池中执行，
+表现为监控线程的等待时间），每轮结束后写入 data/profiles/cycle-<时间>.prof 和同名 .txt（按累计耗时排序的前若干个函数），
+.prof 文件可用 python -m pstats 或 snakeviz 等工具离线分析。
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+import json_codec
+
+# 追踪日志文件名（以.开头，不会被当作日期文件）
+TRACE_FILENAME = ".trace.ndjson"
+# 追踪日志的滚动大小（字节）
+MAX_TRACE_BYTES = 5 * 1024 * 1024
+# 性能分析结果目录（位于数据目录下）
+PROFILES_DIRNAME = "profiles"
+# 性能分析摘要中列出的函数数
+PROFILE_TOP_FUNCTIONS = 40
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 1)
+
+
+def read_traces(data_dir: str = "data", limit: int = 200) -> list:
+    """
+    读取最近的追踪记录
+
+    :param data_dir: 数据目录
+    :param limit: 最多返回的条数
+    :return: 记录列表（从旧到新）
+    """
+    path = os.path.join(data_dir, TRACE_FILENAME)
+    if not os.path.exists(path):
+        return []
+    with open(path, 'rb') as f:
+        lines = deque(f, maxlen=limit)
+    records = []
+    for line in lines:
+        try:
+            records.append(json_codec.loads(line))
+        except json_codec.DecodeError:
+            continue
+    return records
+
+
+class TweetTracer:
+    """按推文记录各处理环节耗时，写入滚动追踪日志"""
+
+    def __init__(self, data_dir: str = "data", enabled: bool = False, max_bytes: int = MAX_TRACE_BYTES):
+        """
+        :param data_dir: 数据目录
+        :param enabled: 是否开启追踪；关闭时各记录方法直接返回
+        :param max_bytes: 追踪日志的滚动大小
+        """
+        self.data_dir = data_dir
+        self.enabled = bool(enabled)
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.cycle = 0
+        # 推文ID -> 处理中的追踪记录
+        self._spans = {}
+        self._cycle_record = None
+
+    def trace_path(self) -> str:
+        """
+        获取追踪日志路径
+
+        :return: 追踪日志路径
+        """
+        return os.path.join(self.data_dir, TRACE_FILENAME)
+
+    def _span(self, tweet_id) -> dict:
+        """获取推文的追踪记录，不存在时创建（调用方需持有锁）"""
+        tweet_id = str(tweet_id)
+        span = self._spans.get(tweet_id)
+        if span is None:
+            span = self._spans[tweet_id] = {'type': 'tweet', 'id': tweet_id, 'cycle': self.cycle, 'llm_ms': {}}
+        return span
+
+    def begin_cycle(self):
+        """开始新一轮扫描"""
+        if not self.enabled:
+            return
+        with self.lock:
+            self.cycle += 1
+            self._cycle_record = {
+                'type': 'cycle', 'cycle': self.cycle, 'started_at': datetime.now().isoformat(),
+                '_start': time.perf_counter(), 'pages': 0, 'tweets': 0,
+                'fetch_ms': 0.0, 'llm_ms': 0.0, 'persist_ms': 0.0,
+            }
+
+    def record_page(self, tweets: list, page: int, seconds: float):
+        """
+        记录一页抓取结果
+
+        :param tweets: 该页的推文（已填充 author）
+        :param page: 页码（从1开始）
+        :param seconds: 该页请求耗时
+        """
+        if not self.enabled:
+            return
+        with self.lock:
+            for tweet in tweets:
+                span = self._span(tweet.get('id') or tweet.get('id_str'))
+                span['author'] = tweet.get('author')
+                span['fetch_page'] = page
+                span['fetch_page_ms'] = _ms(seconds)
+            if self._cycle_record:
+                self._cycle_record['pages'] += 1
+                self._cycle_record['fetch_ms'] += seconds * 1000
+
+    def record_queue_wait(self, tweets: list, waits: list):
+        """
+        记录推文在AI队列中的等待时间
+
+        :param tweets: 开始处理的推文
+        :param waits: 对应的等待秒数（未记录入队时间的为None）
+        """
+        if not self.enabled:
+            return
+        with self.lock:
+            for tweet, wait in zip(tweets, waits):
+                if wait is not None:
+                    self._span(tweet.get('id') or tweet.get('id_str'))['queue_wait_ms'] = _ms(wait)
+
+    def record_llm(self, tweet_ids: list, prompt_type: str, seconds: float):
+        """
+        记录一次大模型请求耗时（失败的请求同样计入）
+
+        :param tweet_ids: 本次请求涉及的推文ID
+        :param prompt_type: 提示词类型
+        :param seconds: 请求耗时
+        """
+        if not self.enabled:
+            return
+        with self.lock:
+            for tweet_id in tweet_ids or []:
+                llm = self._span(tweet_id)['llm_ms']
+                llm[prompt_type] = round(llm.get(prompt_type, 0) + seconds * 1000, 1)
+            if self._cycle_record:
+                self._cycle_record['llm_ms'] += seconds * 1000
+
+    def finish(self, tweet_id, outcome: str, author: str = "", persist_seconds: float = None):
+        """
+        推文处理结束，写入追踪记录
+
+        :param tweet_id: 推文ID
+        :param outcome: saved / duplicate / deferred / dropped
+        :param author: 作者
+        :param persist_seconds: 保存耗时
+        """
+        if not self.enabled:
+            return
+        with self.lock:
+            span = self._span(tweet_id)
+            del self._spans[span['id']]
+            span['outcome'] = outcome
+            span.setdefault('author', author)
+            if persist_seconds is not None:
+                span['persist_ms'] = _ms(persist_seconds)
+                if self._cycle_record:
+                    self._cycle_record['persist_ms'] += persist_seconds * 1000
+            if self._cycle_record and outcome in ('saved', 'duplicate'):
+                self._cycle_record['tweets'] += 1
+            span['traced_at'] = datetime.now().isoformat()
+            self._write(span)
+
+    def end_cycle(self):
+        """本轮结束：写入汇总记录，丢弃未处理完的推文（被停止或已存储而未进入AI处理）"""
+        with self.lock:
+            record, self._cycle_record = self._cycle_record, None
+            self._spans.clear()
+            if not (self.enabled and record):
+                return
+            record['duration_ms'] = _ms(time.perf_counter() - record.pop('_start'))
+            for key in ('fetch_ms', 'llm_ms', 'persist_ms'):
+                record[key] = round(record[key], 1)
+            self._write(record)
+
+    def _write(self, record: dict):
+        """追加一行记录，超过滚动大小时先轮换（调用方需持有锁）"""
+        path = self.trace_path()
+        try:
+            if os.path.exists(path) and os.path.getsize(path) >= self.max_bytes:
+                os.replace(path, path + ".1")
+            with open(path, 'ab') as f:
+                f.write(json_codec.dumps_bytes(record) + b"\n")
+        except OSError as e:
+            print(f"写入追踪日志失败: {e}")
+
+
+class CycleProfiler:
+    """按轮次开启的 cProfile 性能分析"""
+
+    def __init__(self, data_dir: str = "data"):
+        """
+        :param data_dir: 数据目录，结果写入其下的 profiles/
+        """
+        self.data_dir = data_dir
+        self.lock = threading.Lock()
+        self.remaining = 0
+        self.last_dump = None
+        self._profile = None
+
+    def request(self, cycles: int):
+        """
+        接下来 cycles 轮扫描开启性能分析
+
+        :param cycles: 轮数，0表示取消
+        """
+        with self.lock:
+            self.remaining = max(0, int(cycles))
+
+    def begin_cycle(self):
+        """本轮需要分析时开始采集（在监控线程中调用）"""
+        with self.lock:
+            if self.remaining <= 0 or self._profile is not None:
+                return
+            self._profile = cProfile.Profile()
+        self._profile.enable()
+
+    def end_cycle(self) -> str:
+        """
+        停止采集并写入结果
+
+        :return: .prof 文件路径，本轮未分析时返回None
+        """
+        profile = self._profile
+        if profile is None:
+            return None
+        profile.disable()
+        with self.lock:
+            self._profile = None
+            self.remaining = max(0, self.remaining - 1)
+
+        directory = os.path.join(self.data_dir, PROFILES_DIRNAME)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"cycle-{datetime.now():%Y%m%d-%H%M%S-%f}.prof")
+        profile.dump_stats(path)
+        summary = io.StringIO()
+        pstats.Stats(profile, stream=summary).sort_stats('cumulative').print_stats(PROFILE_TOP_FUNCTIONS)
+        with open(path[:-len(".prof")] + ".txt", 'w', encoding='utf-8') as f:
+            f.write(summary.getvalue())
+        self.last_dump = path
+        print(f"📊 本轮性能分析已写入 {path}" + (f"（还剩 {self.remaining} 轮）" if self.remaining else ""))
+        return path
+
+    def status(self) -> dict:
+        """
+        性能分析状态
+
+        :return: {"remaining": 剩余轮数, "last_dump": 最近一次结果路径}
+        """
+        with self.lock:
+            return {'remaining': self.remaining, 'last_dump': self.last_dump}
@@ -1,15 +1,81 @@
 import requests
+import threading
 import time
 import json
 import os
-from datetime import datetime, timedelta
-from openai import OpenAI
+import json_codec
+from datetime import datetime, timedelta, timezone
+from llm_router import LLMRouter, LLMUnavailableError
+from token_budget import TITLE_ONLY_ANALYSIS, BudgetExceededError, TokenBudget
+from tweet_classifier import classify_tweet, fill_skipped_stages
+from tweet_fingerprint import NearDuplicateIndex
+from tweet_priority import AIWorkQueue, parse_created_at
+from tweet_repository import TweetRepository
+from tweet_stats import TweetStats
+from tweet_storage import DEFAULT_CHECKPOINT_EVERY, JOURNAL_FILENAME, TweetJournal, data_dir_lock
+from tweet_trace import CycleProfiler, TweetTracer
+
+# advanced_search 单条查询的最大长度
+MAX_QUERY_LENGTH = 500
+# AI处理失败的推文最多重试的轮数，超过后放弃
+MAX_AI_ATTEMPTS = 5
+
+# AI处理环节
+AI_STAGES = ('translation', 'analysis', 'title')
+
+# 批量AI处理时每条推文预估的输出token数（标题+翻译+解读）
+BATCH_OUTPUT_TOKENS_PER_TWEET = 300
+
+# 监控器处理选项的默认值（键与 config.json 相同），新增选项在此添加，无需修改构造参数
+DEFAULT_OPTIONS = {
+    # 每次AI请求最多合并的推文数，1表示逐条处理
+    "AI_BATCH_SIZE": 1,
+    # 单次批量AI请求的token预算
+    "AI_BATCH_TOKEN_BUDGET": 6000,
+    # 近似重复判定阈值（0~1），达到阈值时复用历史AI结果，0表示关闭
+    "NEAR_DUPLICATE_THRESHOLD": 0.9,
+    # 近似重复索引保留的最近推文条数
+    "NEAR_DUPLICATE_HISTORY": 2000,
+    # 预写日志累积多少条后合并写入日期文件（每轮结束时也会合并）
+    "JOURNAL_CHECKPOINT_EVERY": DEFAULT_CHECKPOINT_EVERY,
+    # AI处理优先级的账号权重，未配置的账号为1
+    "ACCOUNT_WEIGHTS": {},
+    # 发布超过该时长的推文降为低优先级，0表示不区分
+    "STALE_AFTER_HOURS": 0,
+    # 多个大模型端点配置（url、api_key、model 等），为空时只使用 LLM_URL
+    "LLM_ENDPOINTS": [],
+    # 请求超过端点 p95 延迟时是否向下一个端点发出对冲请求
+    "LLM_HEDGE": True,
+    # 对冲前的最短等待（秒）
+    "LLM_HEDGE_MIN_DELAY": 2.0,
+    # 每日 / 每小时大模型 token 预算，0表示不限制
+    "DAILY_TOKEN_BUDGET": 0,
+    "HOURLY_TOKEN_BUDGET": 0,
+    # 每千 token 单价 {"prompt": ..., "completion": ...}，用于估算费用
+    "TOKEN_PRICES": {},
+    # 每个账号每轮最多抓取的页数 / 推文数，超出部分留到后续轮次，0表示不限制
+    "MAX_PAGES_PER_ACCOUNT": 10,
+    "MAX_TWEETS_PER_ACCOUNT": 200,
+    # 是否记录每条推文各处理环节的耗时（写入 data/.trace.ndjson）
+    "TRACE_ENABLED": False,
+}
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    粗略估算文本的token数：中日韩字符约1个token，其他字符约4个字符1个token
+    
+    :param text: 文本内容
+    :return: 估算的token数
+    """
+    cjk_count = sum(1 for ch in text if '\u2e80' <= ch <= '\u9fff' or '\uac00' <= ch <= '\ud7af' or '\uff00' <= ch <= '\uffef')
+    return cjk_count + (len(text) - cjk_count) // 4 + 1
 
 
 class TwitterAIMonitor:
     """Twitter推文监控和AI处理器"""
     
-    def __init__(self, twitter_api_key: str, llm_url: str, llm_api_key: str, data_dir: str = "data"):
+    def __init__(self, twitter_api_key: str, llm_url: str, llm_api_key: str, data_dir: str = "data", options: dict = None, journal_filename: str = JOURNAL_FILENAME):
         """
         初始化监控器
         
@@ -17,54 +83,235 @@ class TwitterAIMonitor:
         :param llm_url: 大模型接口URL
         :param llm_api_key: 大模型API Key
         :param data_dir: 数据存储目录
+        :param options: 处理选项，键与 config.json 相同（可直接传入整个配置），未配置的项使用 DEFAULT_OPTIONS
+        :param journal_filename: 预写日志文件名，多个监控进程共用数据目录时各自使用独立的日志
         """
+        options = {**DEFAULT_OPTIONS, **(options or {})}
         self.twitter_api_key = twitter_api_key
-        self.llm_client = OpenAI(
-            api_key=llm_api_key,
-            base_url=llm_url,
-        )
+        self.llm_url = llm_url
+        self.llm_api_key = llm_api_key
+        # 大模型路由在首次调用时才创建，只读场景无需导入 openai
+        self.llm_endpoints = options["LLM_ENDPOINTS"]
+        self.llm_hedge = options["LLM_HEDGE"]
+        self.llm_hedge_min_delay = options["LLM_HEDGE_MIN_DELAY"]
+        self.llm_router = None
+        # token 用量按账号/提示词类型/日期记录，接近预算时逐级降级
+        self.budget = TokenBudget(data_dir, options["DAILY_TOKEN_BUDGET"], options["HOURLY_TOKEN_BUDGET"], options["TOKEN_PRICES"])
+        # 当前线程正在处理的账号和推文，用于 token 用量归属和耗时追踪
+        self.usage_context = threading.local()
+        # 按推文记录抓取/排队/大模型/写入耗时；按轮次开启 cProfile 性能分析
+        self.tracer = TweetTracer(data_dir, options["TRACE_ENABLED"])
+        self.profiler = CycleProfiler(data_dir)
+        self.ai_batch_size = max(1, int(options["AI_BATCH_SIZE"] or 1))
+        self.ai_batch_token_budget = options["AI_BATCH_TOKEN_BUDGET"]
         self.data_dir = data_dir
-        # 确保数据目录存在
-        os.makedirs(data_dir, exist_ok=True)
+        self.repository = TweetRepository(data_dir)
+        # 新推文先写入预写日志，再合并到日期文件；首次写入时重放上次未完成的日志
+        self.journal = TweetJournal(data_dir, options["JOURNAL_CHECKPOINT_EVERY"], journal_filename)
+        # 按作者/日期的统计汇总，随新推文增量更新
+        self.stats = TweetStats(data_dir)
+        # 监控设置可在运行中更新：每个账号记录各自上次抓取到的时间（UTC），新增账号才需要回溯
+        self.settings_lock = threading.Lock()
+        self.target_accounts = []
+        self.account_checked = {}
+        self.check_interval = 300
+        self.backfill_hours = 1
+        # 每个账号每轮的抓取上限；超出上限未抓取的较早时间段：
+        # 账号小写 -> [(起始时间, 截止时间, 停止翻页的已存储最大ID或None), ...]（较新的在前）
+        self.max_pages_per_account = max(0, int(options["MAX_PAGES_PER_ACCOUNT"] or 0))
+        self.max_tweets_per_account = max(0, int(options["MAX_TWEETS_PER_ACCOUNT"] or 0))
+        self.fetch_backlog = {}
+        # 从其他监控进程接手、抓取进度确定的账号：首轮不按已存储的最大ID提前停止翻页
+        self.exact_since = set()
+        # 停止信号：所有等待都可被立即打断
+        self.stop_event = threading.Event()
+        # 唤醒信号：跳过剩余倒计时，立即开始下一轮扫描
+        self.wake_event = threading.Event()
+        # 抓取到的推文按账号权重和发布时间排队等待AI处理
+        self.ai_queue = AIWorkQueue(options["ACCOUNT_WEIGHTS"], options["STALE_AFTER_HOURS"])
+        # AI处理失败的推文：推文ID -> (推文, 已尝试轮数)，下一轮重新排队
+        self.deferred_tweets = {}
+        # 本地预分类跳过的AI环节计数
+        self.skipped_stages = {'translation': 0, 'analysis': 0, 'title': 0}
+        # 近似重复索引在首次使用时根据历史数据构建
+        self.near_duplicate_threshold = options["NEAR_DUPLICATE_THRESHOLD"]
+        self.near_duplicate_history = options["NEAR_DUPLICATE_HISTORY"]
+        self.near_duplicate_index = None
+        self.near_duplicate_reuses = 0
+        # 实际发出的大模型请求数（预算拦截的不计入），用于决定是否需要限速等待
+        self.llm_requests = 0
+    
+    @classmethod
+    def from_config(cls, config: dict, **kwargs):
+        """
+        根据 config.json 的配置创建监控器，未配置的项使用默认值
+        
+        :param config: 配置字典
+        :param kwargs: 其他构造参数（如 data_dir、journal_filename）
+        :return: TwitterAIMonitor
+        """
+        return cls(config["TWITTER_API_KEY"], config["LLM_URL"], config["LLM_API_KEY"], options=config, **kwargs)
+    
+    def get_llm_router(self) -> LLMRouter:
+        """
+        获取大模型路由，首次调用时创建
+        
+        :return: LLMRouter
+        """
+        if self.llm_router is None:
+            self.llm_router = LLMRouter.from_config(
+                self.llm_url, self.llm_api_key, self.llm_endpoints,
+                hedge=self.llm_hedge, hedge_min_delay=self.llm_hedge_min_delay
+            )
+            self.llm_router.usage_listener = self._record_token_usage
+            self.llm_router.hedge_guard = self._allow_hedge
+        return self.llm_router
+    
+    def _allow_hedge(self, prompt: str, context: dict) -> bool:
+        """
+        对冲请求会再消耗一次 token：仅在预算模式为 normal、且预算足够同时容纳在途请求和对冲请求时放行
+        
+        :param prompt: 提示词
+        :param context: 调用上下文
+        :return: 是否允许对冲
+        """
+        if self.budget.mode() != 'normal':
+            return False
+        try:
+            # 在途的原请求尚未计入用量，与对冲请求一起按「输入 + 等长输出」估算
+            self.budget.check(estimate_tokens(prompt) * 4)
+        except BudgetExceededError:
+            return False
+        return True
+    
+    def _record_token_usage(self, endpoint, prompt: str, content: str, usage: dict, context: dict):
+        """大模型请求完成后记录 token 用量，接口未返回用量时按文本长度估算"""
+        if usage is None:
+            usage = {'prompt_tokens': estimate_tokens(prompt), 'completion_tokens': estimate_tokens(content)}
+        context = context or {}
+        self.budget.record(usage['prompt_tokens'], usage['completion_tokens'], context.get('accounts'),
+                           context.get('prompt_type', 'other'), endpoint.name)
     
-    def get_ai_response(self, prompt: str) -> str:
+    def get_ai_response(self, prompt: str, prompt_type: str = "other") -> str:
         """
-        调用AI模型获取响应
+        调用AI模型获取响应（在多个端点间路由、失败切换）
         
         :param prompt: 输入提示词
+        :param prompt_type: 提示词类型（translation / analysis / title / batch），用于用量统计
         :return: AI响应内容
+        :raises BudgetExceededError: 本次请求会超出 token 预算
+        :raises LLMUnavailableError: 所有端点均失败
         """
+        started = time.perf_counter()
         try:
-            completion = self.llm_client.chat.completions.create(
-                model="qwen-plus",
-                messages=[
-                    {"role": "system", "content": "You are a helpful assistant."},
-                    {"role": "user", "content": prompt},
-                ]
-            )
-            return completion.choices[0].message.content
-        except Exception as e:
+            # 预计用量：输入 + 与输入等长的输出
+            self.budget.check(estimate_tokens(prompt) * 2)
+            self.llm_requests += 1
+            context = {'accounts': getattr(self.usage_context, 'accounts', None), 'prompt_type': prompt_type}
+            return self.get_llm_router().complete(prompt, context)
+        except LLMUnavailableError as e:
             print(f"AI调用出错: {e}")
-            return "AI处理失败"
+            raise
+        finally:
+            self.tracer.record_llm(getattr(self.usage_context, 'tweet_ids', None), prompt_type,
+                                   time.perf_counter() - started)
+    
+    def process_tweet_within_budget(self, tweet: dict) -> dict:
+        """
+        按当前 token 预算模式处理推文：预算充足时完整处理，接近上限时只生成标题，
+        更紧张时只处理高权重账号，用尽时全部延后
+        
+        :param tweet: 推文数据（twitterapi.io 格式）
+        :return: AI处理结果（title / translation / analysis）
+        :raises BudgetExceededError: 预算不足，推文需要延后处理
+        :raises LLMUnavailableError: 所有端点均失败
+        """
+        author = tweet.get('author', '')
+        text = tweet.get('text', '')
+        self.usage_context.accounts = [author]
+        self.usage_context.tweet_ids = [tweet.get('id') or tweet.get('id_str')]
+        
+        mode = self.budget.mode()
+        if mode == 'paused':
+            raise BudgetExceededError("Token预算已用尽")
+        if mode == 'priority_only' and self.ai_queue.account_weights.get(author.lower(), 1.0) <= 1:
+            raise BudgetExceededError(f"Token预算紧张，@{author} 的推文延后处理")
+        if mode == 'normal':
+            return self.process_tweet_with_ai(text)
+        
+        result = self.process_tweet_with_ai(text, ('title',))
+        result['translation'] = text
+        result['analysis'] = TITLE_ONLY_ANALYSIS
+        return result
+    
+    def defer_tweet(self, tweet: dict, error: Exception):
+        """
+        AI处理失败的推文留到下一轮重试，不保存失败结果，失败次数和放弃的推文计入统计汇总；
+        因 token 预算延后的推文不计入重试次数
+        
+        :param tweet: 推文数据（twitterapi.io 格式）
+        :param error: 失败原因
+        """
+        tweet_id = str(tweet.get('id') or tweet.get('id_str'))
+        if isinstance(error, BudgetExceededError):
+            attempts = self.deferred_tweets.get(tweet_id, (tweet, 0))[1]
+            self.deferred_tweets[tweet_id] = (tweet, attempts)
+            self.tracer.finish(tweet_id, 'deferred', tweet.get('author', ''))
+            print(f"⏸️ 推文 {tweet_id} 延后到下一轮处理: {error}")
+            return
+        attempts = self.deferred_tweets.get(tweet_id, (tweet, 0))[1] + 1
+        self.stats.record_failure(tweet, dropped=attempts >= MAX_AI_ATTEMPTS)
+        if attempts >= MAX_AI_ATTEMPTS:
+            self.deferred_tweets.pop(tweet_id, None)
+            self.tracer.finish(tweet_id, 'dropped', tweet.get('author', ''))
+            print(f"❌ 推文 {tweet_id} 已连续 {attempts} 轮AI处理失败，放弃: {error}")
+            return
+        self.tracer.finish(tweet_id, 'deferred', tweet.get('author', ''))
+        self.deferred_tweets[tweet_id] = (tweet, attempts)
+        print(f"⏳ 推文 {tweet_id} AI处理失败（第 {attempts} 次），下一轮重试: {error}")
     
-    def process_tweet_with_ai(self, tweet_text: str) -> dict:
+    def requeue_deferred_tweets(self) -> list:
+        """
+        将上一轮AI处理失败的推文重新加入AI队列
+        
+        :return: 重新排队的推文列表
+        """
+        tweets = [tweet for tweet, _ in self.deferred_tweets.values()]
+        self.ai_queue.push(tweets)
+        return tweets
+    
+    def process_tweet_with_ai(self, tweet_text: str, stages: tuple = AI_STAGES) -> dict:
         """
         使用AI处理推文：翻译、解读、生成标题
         
         :param tweet_text: 推文内容
-        :return: 包含AI处理结果的字典
+        :param stages: 需要处理的环节，默认全部（translation / analysis / title）
+        :return: 包含AI处理结果的字典，只包含 stages 对应的字段
         """
+        # 与近期推文高度相似时直接复用历史AI结果
+        reused = self.find_reusable_result(tweet_text)
+        if reused:
+            return {stage: reused[stage] for stage in stages}
+        
+        # 本地预分类：已是中文或没有可翻译文字的推文跳过相应环节
+        plan = classify_tweet(tweet_text)
+        result = {stage: value for stage, value in fill_skipped_stages(tweet_text, plan).items() if stage in stages}
+        for stage in result:
+            self.skipped_stages[stage] += 1
+        
         # 翻译推文
-        translate_prompt = f"""请将以下英文推文翻译成中文，保持原意和语气：
+        if plan['needs_translation'] and 'translation' in stages:
+            translate_prompt = f"""请将以下英文推文翻译成中文，保持原意和语气：
 
 推文内容：{tweet_text}
 
 请只返回翻译结果，不要包含其他说明。"""
-        
-        translation = self.get_ai_response(translate_prompt)
+            
+            result['translation'] = self.get_ai_response(translate_prompt, 'translation')
         
         # 解读推文
-        analysis_prompt = f"""请对以下推文进行深度解读分析，包括其含义、背景、可能的影响等,全文内容在160字左右：
+        if plan['needs_analysis'] and 'analysis' in stages:
+            analysis_prompt = f"""请对以下推文进行深度解读分析，包括其含义、背景、可能的影响等,全文内容在160字左右：
 
 推文内容：{tweet_text}
 
@@ -75,11 +322,12 @@ class TwitterAIMonitor:
 4. 其他值得关注的要点
 
 请用中文回答，内容要有深度和见解。"""
-        
-        analysis = self.get_ai_response(analysis_prompt)
+            
+            result['analysis'] = self.get_ai_response(analysis_prompt, 'analysis')
         
         # 生成标题
-        title_prompt = f"""请为以下推文生成一个简洁有力的中文标题，要求：
+        if plan['needs_title'] and 'title' in stages:
+            title_prompt = f"""请为以下推文生成一个简洁有力的中文标题，要求：
 1. 控制在15-25个字以内
 2. 能够准确概括推文的核心内容
 3. 具有吸引力和新闻性
@@ -87,15 +335,164 @@ class TwitterAIMonitor:
 推文内容：{tweet_text}
 
 请只返回标题，不要包含其他内容。"""
+            
+            result['title'] = self.get_ai_response(title_prompt, 'title')
+        
+        return {stage: result[stage].strip() for stage in stages}
+    
+    def find_reusable_result(self, tweet_text: str) -> dict:
+        """
+        在近期推文中查找近似重复项，返回可复用的AI处理结果
         
-        title = self.get_ai_response(title_prompt)
+        :param tweet_text: 推文内容
+        :return: AI处理结果字典，未找到时返回None
+        """
+        index = self._get_near_duplicate_index()
+        if index is None:
+            return None
         
+        match, score = index.find(tweet_text)
+        if not match:
+            return None
+        
+        self.near_duplicate_reuses += 1
+        print(f"♻️ 复用近似推文 {match.get('id')} 的AI结果 (相似度 {score:.2f})")
         return {
-            'title': title.strip(),
-            'translation': translation.strip(),
-            'analysis': analysis.strip()
+            'title': match.get('ai_title', ''),
+            'translation': match.get('ai_translation', ''),
+            'analysis': match.get('ai_analysis', '')
         }
     
+    def _get_near_duplicate_index(self):
+        """
+        获取近似重复索引，首次调用时根据历史数据构建
+        
+        :return: NearDuplicateIndex，功能关闭时返回None
+        """
+        if not 0 < self.near_duplicate_threshold <= 1:
+            return None
+        
+        if self.near_duplicate_index is None:
+            self.near_duplicate_index = NearDuplicateIndex(self.near_duplicate_threshold, self.near_duplicate_history)
+            # get_all_tweets 按时间倒序返回，从旧到新加入以保留最新的记录
+            for record in reversed(self.get_all_tweets()[:self.near_duplicate_history]):
+                self._index_processed_tweet(record)
+        return self.near_duplicate_index
+    
+    def _index_processed_tweet(self, tweet_data: dict):
+        """
+        将AI处理成功的推文加入近似重复索引
+        
+        :param tweet_data: 推文数据
+        """
+        if self.near_duplicate_index is None:
+            return
+        ai_fields = [tweet_data.get('ai_title', ''), tweet_data.get('ai_translation', ''), tweet_data.get('ai_analysis', '')]
+        if not all(ai_fields) or "AI处理失败" in ai_fields or ai_fields[0].startswith("处理失败") or ai_fields[2] == TITLE_ONLY_ANALYSIS:
+            return
+        self.near_duplicate_index.add(tweet_data)
+    
+    def plan_ai_batches(self, tweets: list) -> list:
+        """
+        按批量大小和token预算将待处理推文分组，每组对应一次AI请求
+        
+        :param tweets: 推文列表
+        :return: 推文分组列表
+        """
+        if self.ai_batch_size <= 1:
+            return [[tweet] for tweet in tweets]
+        
+        batches = []
+        current = []
+        current_tokens = 0
+        for tweet in tweets:
+            # 输入文本在提示词中出现一次，翻译结果约与原文等长
+            cost = estimate_tokens(tweet.get('text', '')) * 2 + BATCH_OUTPUT_TOKENS_PER_TWEET
+            if current and (len(current) >= self.ai_batch_size or current_tokens + cost > self.ai_batch_token_budget):
+                batches.append(current)
+                current = []
+                current_tokens = 0
+            current.append(tweet)
+            current_tokens += cost
+        if current:
+            batches.append(current)
+        return batches
+    
+    def process_tweets_batch_with_ai(self, items: list) -> dict:
+        """
+        在一次AI请求中批量处理多条推文；不在结果中的推文（未进入批量请求、缺失或格式错误）
+        由调用方按 token 预算模式逐条处理（process_tweet_within_budget），失败时延后，不在此重试
+        
+        :param items: 推文列表，每项包含 id、text 和 author
+        :return: 推文ID到AI处理结果的映射，只包含批量请求成功解析的推文
+        """
+        results = {}
+        
+        # 只有需要完整处理且没有近似重复的推文进入批量请求，其余由逐条处理跳过或复用
+        full_items = [
+            item for item in items
+            if classify_tweet(item['text'])['reason'] == 'full' and not self._has_near_duplicate(item['text'])
+        ]
+        
+        if len(full_items) > 1:
+            payload = json.dumps([{'id': str(item['id']), 'text': item['text']} for item in full_items], ensure_ascii=False)
+            batch_prompt = f"""下面是一个JSON数组，每个元素是一条推文（id 和 text）。请逐条处理：
+1. translation：将推文翻译成中文，保持原意和语气
+2. analysis：用中文对推文进行深度解读分析（主要信息和观点、可能的背景和原因、对相关领域的影响、其他值得关注的要点），全文内容在160字左右
+3. title：为推文生成一个简洁有力的中文标题，控制在15-25个字以内，准确概括核心内容并具有新闻性
+
+推文列表：{payload}
+
+请只返回一个JSON数组，每个元素格式为 {{"id": "...", "title": "...", "translation": "...", "analysis": "..."}}，id 必须与输入一致，不要包含其他内容。"""
+            
+            try:
+                self.usage_context.accounts = sorted({item.get('author', '') for item in full_items})
+                self.usage_context.tweet_ids = [item['id'] for item in full_items]
+                response = self.get_ai_response(batch_prompt, 'batch')
+                results = self._parse_batch_response(response, {str(item['id']) for item in full_items})
+                print(f"批量AI处理: {len(results)}/{len(full_items)} 条推文解析成功")
+            except LLMUnavailableError:
+                results = {}
+        
+        return results
+    
+    def _has_near_duplicate(self, tweet_text: str) -> bool:
+        """判断推文在近似重复索引中是否有可复用的结果（不计入复用次数）"""
+        index = self._get_near_duplicate_index()
+        return index is not None and index.find(tweet_text)[0] is not None
+    
+    @staticmethod
+    def _parse_batch_response(response: str, expected_ids: set) -> dict:
+        """
+        解析批量AI响应中的JSON数组，仅保留字段完整且ID匹配的结果
+        
+        :param response: AI响应内容
+        :param expected_ids: 本批次的推文ID集合
+        :return: 推文ID到AI处理结果的映射
+        """
+        start = response.find('[')
+        end = response.rfind(']')
+        if start == -1 or end <= start:
+            return {}
+        try:
+            entries = json.loads(response[start:end + 1])
+        except json.JSONDecodeError:
+            return {}
+        
+        results = {}
+        for entry in entries if isinstance(entries, list) else []:
+            if not isinstance(entry, dict):
+                continue
+            tweet_id = str(entry.get('id', ''))
+            fields = [entry.get('title'), entry.get('translation'), entry.get('analysis')]
+            if tweet_id in expected_ids and all(isinstance(f, str) and f.strip() for f in fields):
+                results[tweet_id] = {
+                    'title': fields[0].strip(),
+                    'translation': fields[1].strip(),
+                    'analysis': fields[2].strip()
+                }
+        return results
+    
     def get_tweets_from_account(self, account: str, since_time: datetime, until_time: datetime, exclude_replies: bool = False) -> list:
         """
         获取指定账号在指定时间范围内的推文
@@ -106,47 +503,273 @@ class TwitterAIMonitor:
         :param exclude_replies: 是否排除回复推文
         :return: 推文列表
         """
+        query = self.build_search_query([account], since_time, until_time, exclude_replies)
+        return self._search_tweets(query, [account])
+    
+    def get_tweets_from_accounts(self, accounts: list, since_time: datetime, until_time: datetime, exclude_replies: bool = False, max_query_length: int = MAX_QUERY_LENGTH) -> list:
+        """
+        使用合并的 (from:A OR from:B ...) 查询批量获取多个账号的推文
+        
+        :param accounts: Twitter账号列表，按查询长度上限自动分组
+        :param since_time: 开始时间
+        :param until_time: 结束时间
+        :param exclude_replies: 是否排除回复推文
+        :param max_query_length: 单条查询的最大长度
+        :return: 推文列表，作者取自接口返回
+        """
+        all_tweets = []
+        for group in self.group_accounts_for_query(accounts, since_time, until_time, exclude_replies, max_query_length):
+            query = self.build_search_query(group, since_time, until_time, exclude_replies)
+            all_tweets.extend(self._search_tweets(query, group))
+        return all_tweets
+    
+    @staticmethod
+    def build_search_query(accounts: list, since_time: datetime, until_time: datetime, exclude_replies: bool = False) -> str:
+        """
+        构造 advanced_search 查询语句，多个账号时使用 OR 合并
+        
+        :param accounts: Twitter账号列表
+        :param since_time: 开始时间
+        :param until_time: 结束时间
+        :param exclude_replies: 是否排除回复推文
+        :return: 查询语句
+        """
         since_str = since_time.strftime("%Y-%m-%dT%H:%M:%SZ")
         until_str = until_time.strftime("%Y-%m-%dT%H:%M:%SZ")
         
+        if len(accounts) == 1:
+            from_clause = f"from:{accounts[0]}"
+        else:
+            from_clause = "(" + " OR ".join(f"from:{account}" for account in accounts) + ")"
+        
         # 根据配置决定是否排除回复
         if exclude_replies:
-            query = f"from:{account} -is:reply since:{since_str} until:{until_str} include:nativeretweets"
-        else:
-            query = f"from:{account} since:{since_str} until:{until_str} include:nativeretweets"
-            
+            return f"{from_clause} -is:reply since:{since_str} until:{until_str} include:nativeretweets"
+        return f"{from_clause} since:{since_str} until:{until_str} include:nativeretweets"
+    
+    @classmethod
+    def group_accounts_for_query(cls, accounts: list, since_time: datetime, until_time: datetime, exclude_replies: bool = False, max_query_length: int = MAX_QUERY_LENGTH) -> list:
+        """
+        按查询长度上限将账号分组，每组对应一次合并查询
+        
+        :param accounts: Twitter账号列表
+        :param since_time: 开始时间
+        :param until_time: 结束时间
+        :param exclude_replies: 是否排除回复推文
+        :param max_query_length: 单条查询的最大长度
+        :return: 账号分组列表
+        """
+        groups = []
+        current = []
+        for account in accounts:
+            candidate = current + [account]
+            if current and len(cls.build_search_query(candidate, since_time, until_time, exclude_replies)) > max_query_length:
+                groups.append(current)
+                current = [account]
+            else:
+                current = candidate
+        if current:
+            groups.append(current)
+        return groups
+    
+    def _search_tweets(self, query: str, accounts: list) -> list:
+        """
+        执行 advanced_search 查询并翻页获取全部结果
+        
+        :param query: 查询语句
+        :param accounts: 查询涉及的账号，用于规范作者名大小写
+        :return: 推文列表，author 字段为作者用户名
+        """
+        return self._search_pages(query, accounts)[0]
+    
+    def _search_pages(self, query: str, accounts: list, high_water: dict = None, max_pages: int = 0, max_tweets: int = 0) -> tuple:
+        """
+        执行 advanced_search 查询并翻页（结果从新到旧），满足以下任一条件时停止翻页：
+        没有下一页；某一页的推文ID都不大于各自作者已存储的最大ID；达到页数或推文数上限
+        
+        :param query: 查询语句
+        :param accounts: 查询涉及的账号，用于规范作者名大小写
+        :param high_water: 各作者已存储推文的最大ID（作者小写 -> int），None表示不提前停止
+        :param max_pages: 最多抓取的页数，0表示不限制
+        :param max_tweets: 最多抓取的推文数（按整页计），0表示不限制
+        :return: (推文列表, 是否因达到上限而未抓取完), author 字段为作者用户名
+        """
         url = "https://api.twitterapi.io/twitter/tweet/advanced_search"
         params = {"query": query, "queryType": "Latest"}
         headers = {"X-API-Key": self.twitter_api_key}
         
+        # 接口返回的用户名大小写可能与配置不同，统一映射回配置中的账号名
+        account_lookup = {account.lower(): account for account in accounts}
+        
         all_tweets = []
         next_cursor = None
+        pages = 0
         
         while True:
             if next_cursor:
                 params["cursor"] = next_cursor
             
+            started = time.perf_counter()
             response = requests.get(url, headers=headers, params=params, timeout=30)
             
             if response.status_code == 200:
+                pages += 1
                 data = response.json()
                 tweets = data.get("tweets", [])
                 
                 if tweets:
                     for t in tweets:
-                        t['author'] = account  # 添加作者信息
+                        t['author'] = self._resolve_author(t, account_lookup, accounts)  # 添加作者信息
                     all_tweets.extend(tweets)
+                self.tracer.record_page(tweets, pages, time.perf_counter() - started)
                 
-                if data.get("has_next_page", False) and data.get("next_cursor", "") != "":
-                    next_cursor = data.get("next_cursor")
-                    continue
-                else:
+                if not (data.get("has_next_page", False) and data.get("next_cursor", "") != ""):
+                    break
+                if high_water is not None and tweets and all(self._is_stored_id(t, high_water) for t in tweets):
+                    print(f"⏹️ 第 {pages} 页的推文均已存储，停止翻页")
                     break
+                if (max_pages and pages >= max_pages) or (max_tweets and len(all_tweets) >= max_tweets):
+                    return all_tweets, True
+                next_cursor = data.get("next_cursor")
             else:
                 print(f"获取推文出错: {response.status_code} - {response.text}")
                 break
         
-        return all_tweets
+        return all_tweets, False
+    
+    @staticmethod
+    def _is_stored_id(tweet: dict, high_water: dict) -> bool:
+        """
+        推文ID是否不大于作者已存储的最大ID
+
+        :param tweet: 接口返回的推文（已填充 author）
+        :param high_water: 作者小写 -> 已存储的最大ID
+        :return: 非数字ID或作者没有已存储推文时返回False
+        """
+        tweet_id = str(tweet.get('id') or tweet.get('id_str') or '')
+        mark = high_water.get(str(tweet.get('author', '')).lower())
+        return mark is not None and tweet_id.isdigit() and int(tweet_id) <= mark
+    
+    def fetch_account_group(self, group: list, since_time: datetime, until_time: datetime, high_water: dict, exclude_replies: bool = False) -> list:
+        """
+        抓取一组账号本轮的新推文：翻页到已存储的推文时停止；每个账号每轮最多抓取
+        max_pages_per_account 页 / max_tweets_per_account 条，超出上限时较早的时间段留到后续轮次；
+        新推文未达上限时，每个账号再补抓一段之前留下的时间段
+        
+        :param group: 账号列表（合并查询时为多个账号）
+        :param since_time: 起始时间（UTC）
+        :param until_time: 截止时间（UTC）
+        :param high_water: 各作者已存储推文的最大ID，见 TweetRepository.high_water_marks
+        :param exclude_replies: 是否排除回复推文
+        :return: 尚未存储的推文列表
+        """
+        with self.settings_lock:
+            exact = any(account.lower() in self.exact_since for account in group)
+        if exact:
+            high_water = None
+        query = self.build_search_query(group, since_time, until_time, exclude_replies)
+        tweets, capped = self._search_pages(
+            query, group, high_water, self.max_pages_per_account * len(group), self.max_tweets_per_account * len(group)
+        )
+        
+        with self.settings_lock:
+            for account in group:
+                self.exact_since.discard(account.lower())
+        if capped:
+            self._defer_fetch_window(group, since_time, tweets, high_water)
+        else:
+            for account in group:
+                tweets.extend(self._fetch_backlog_window(account, exclude_replies))
+        
+        stored = self.repository.stored_ids([str(t.get('id') or t.get('id_str')) for t in tweets])
+        # 分片监控接手账号时，上一个进程已处理的推文可能还在它的预写日志中，尚未合并到日期文件
+        stored |= self.journal.other_pending_ids()
+        if stored:
+            tweets = [t for t in tweets if str(t.get('id') or t.get('id_str')) not in stored]
+        return tweets
+    
+    @staticmethod
+    def _oldest_created_at(tweets: list):
+        """本次抓取到的最早发布时间（UTC，不带时区），都无法解析时返回None"""
+        created = [parse_created_at(t.get('createdAt')) for t in tweets]
+        created = [value for value in created if value]
+        if not created:
+            return None
+        return min(created).astimezone(timezone.utc).replace(tzinfo=None)
+    
+    def _defer_fetch_window(self, group: list, since_time: datetime, tweets: list, high_water: dict = None):
+        """
+        记录因达到上限未抓取的较早时间段，后续轮次再抓取
+        
+        :param group: 账号列表
+        :param since_time: 本次抓取的起始时间（UTC）
+        :param tweets: 本次已抓取的推文
+        :param high_water: 本次抓取使用的已存储最大ID，补抓时翻页到同样的位置停止；None表示不提前停止
+        """
+        oldest = self._oldest_created_at(tweets)
+        if oldest is None or oldest <= since_time:
+            return
+        # 截止时间多留1秒，与已抓取的最早推文同一秒发布的推文不会遗漏（重复的按ID过滤）
+        until_time = oldest + timedelta(seconds=1)
+        with self.settings_lock:
+            for account in group:
+                key = account.lower()
+                if key in self.account_checked:
+                    mark = high_water.get(key) if high_water is not None else None
+                    self.fetch_backlog.setdefault(key, []).insert(0, (since_time, until_time, mark))
+        print(f"⏸️ @{', @'.join(group)} 本轮已达抓取上限，{since_time:%m-%d %H:%M:%S} ~ {oldest:%m-%d %H:%M:%S}（UTC）的推文留到后续轮次")
+    
+    def _fetch_backlog_window(self, account: str, exclude_replies: bool = False) -> list:
+        """
+        抓取账号最近一段之前留下的时间段，仍达到上限时缩短该时间段留到下一轮
+        
+        :param account: Twitter账号
+        :param exclude_replies: 是否排除回复推文
+        :return: 推文列表
+        """
+        key = account.lower()
+        with self.settings_lock:
+            windows = self.fetch_backlog.get(key)
+            if not windows:
+                return []
+            window = windows[0]
+        
+        since_time, until_time, mark = window
+        query = self.build_search_query([account], since_time, until_time, exclude_replies)
+        tweets, capped = self._search_pages(query, [account], None if mark is None else {key: mark},
+                                            self.max_pages_per_account, self.max_tweets_per_account)
+        oldest = self._oldest_created_at(tweets) if capped else None
+        
+        with self.settings_lock:
+            windows = self.fetch_backlog.get(key)
+            if windows and windows[0] == window:
+                if oldest is not None and oldest > since_time:
+                    windows[0] = (since_time, oldest + timedelta(seconds=1), mark)
+                else:
+                    windows.pop(0)
+                if not windows:
+                    del self.fetch_backlog[key]
+            remaining = len(self.fetch_backlog.get(key, []))
+        print(f"↩️ 补抓 @{account} {since_time:%m-%d %H:%M:%S} ~ {until_time:%m-%d %H:%M:%S}（UTC）的推文 {len(tweets)} 条"
+              + (f"，还有 {remaining} 段待补抓" if remaining else ""))
+        return tweets
+    
+    @staticmethod
+    def _resolve_author(tweet: dict, account_lookup: dict, accounts: list) -> str:
+        """
+        从接口返回的推文中解析作者用户名
+        
+        :param tweet: 接口返回的推文
+        :param account_lookup: 小写用户名到配置账号名的映射
+        :param accounts: 查询涉及的账号
+        :return: 作者用户名
+        """
+        author = tweet.get('author')
+        user_name = author.get('userName') if isinstance(author, dict) else author
+        if user_name:
+            return account_lookup.get(str(user_name).lower(), user_name)
+        # 接口未返回作者时，仅在单账号查询中可以确定作者
+        return accounts[0] if len(accounts) == 1 else 'Unknown'
     
     def save_tweet_data(self, tweet_data: dict):
         """
@@ -154,32 +777,45 @@ class TwitterAIMonitor:
         
         :param tweet_data: 推文数据
         """
+        started = time.perf_counter()
         today = datetime.now().strftime("%Y-%m-%d")
-        file_path = os.path.join(self.data_dir, f"tweets_{today}.json")
+        file_path = self.repository.day_file_path(today)
+        filename = os.path.basename(file_path)
         
-        # 读取现有数据
-        existing_data = []
-        if os.path.exists(file_path):
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    existing_data = json.load(f)
-            except json.JSONDecodeError:
-                existing_data = []
-        
-        # 检查是否重复 - 根据推文ID去重
-        tweet_id = tweet_data.get('id')
-        existing_ids = {item.get('id') for item in existing_data if item.get('id')}
-        
-        if tweet_id not in existing_ids:
-            # 添加新数据（仅当ID不重复时）
-            existing_data.append(tweet_data)
-            print(f"保存新推文: {tweet_id} - {tweet_data.get('author', 'Unknown')}")
+        # 多个监控进程共用数据目录时，去重检查和写入在跨进程锁内完成
+        with data_dir_lock(self.data_dir):
+            # 重放上次异常退出时未合并的日志，保证去重基于完整数据
+            self.journal.replay()
             
-            # 写入文件
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(existing_data, f, ensure_ascii=False, indent=2)
-        else:
-            print(f"跳过重复推文: {tweet_id} - {tweet_data.get('author', 'Unknown')}")
+            # 读取现有数据
+            existing_data = []
+            if os.path.exists(file_path):
+                try:
+                    existing_data = json_codec.load_file(file_path)
+                except json_codec.DecodeError:
+                    existing_data = []
+            
+            # 检查是否重复 - 根据推文ID去重（包括各进程日志中尚未合并的记录）
+            tweet_id = tweet_data.get('id')
+            existing_ids = {item.get('id') for item in existing_data if item.get('id')}
+            existing_ids |= self.journal.pending_ids(filename)
+            # 其他监控进程已写入日志、尚未合并的推文（接手账号后重新抓取到的同一条推文）
+            existing_ids |= self.journal.other_pending_ids()
+            
+            if tweet_id not in existing_ids:
+                # 汇总缺失时先从日期文件重建（此时新推文尚未写入，不会重复计数）
+                self.stats.ensure_loaded()
+                # 添加新数据（仅当ID不重复时）：写入预写日志后再原子替换日期文件
+                self.journal.append(filename, tweet_data)
+                # 日志写入成功（推文已持久化）后再计入统计，写入失败的推文不会被计数
+                self.stats.record(tweet_data)
+                self._index_processed_tweet(tweet_data)
+                outcome = 'saved'
+                print(f"保存新推文: {tweet_id} - {tweet_data.get('author', 'Unknown')}")
+            else:
+                outcome = 'duplicate'
+                print(f"跳过重复推文: {tweet_id} - {tweet_data.get('author', 'Unknown')}")
+        self.tracer.finish(tweet_id, outcome, tweet_data.get('author', ''), time.perf_counter() - started)
     
     def load_tweets_by_date(self, date_str: str = None) -> list:
         """
@@ -188,18 +824,7 @@ class TwitterAIMonitor:
         :param date_str: 日期字符串 (YYYY-MM-DD)，默认为今天
         :return: 推文数据列表
         """
-        if date_str is None:
-            date_str = datetime.now().strftime("%Y-%m-%d")
-        
-        file_path = os.path.join(self.data_dir, f"tweets_{date_str}.json")
-        
-        if os.path.exists(file_path):
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except json.JSONDecodeError:
-                return []
-        return []
+        return self.repository.load_tweets_by_date(date_str)
     
     def get_all_tweets(self) -> list:
         """
@@ -207,25 +832,188 @@ class TwitterAIMonitor:
         
         :return: 所有推文数据列表
         """
-        all_tweets = []
+        return self.repository.get_all_tweets()
+    
+    def update_settings(self, target_accounts: list = None, check_interval: int = None, backfill_hours: float = None, checked_since: dict = None, trace_enabled: bool = None) -> dict:
+        """
+        更新监控设置，运行中调用无需重启：
+        新增的账号从 backfill_hours 小时前开始抓取，已有账号保留各自的抓取进度，
+        移除的账号从下一轮起不再抓取；检查间隔在当前倒计时中即生效
         
-        # 遍历数据目录中的所有JSON文件
-        if os.path.exists(self.data_dir):
-            for filename in os.listdir(self.data_dir):
-                if filename.startswith("tweets_") and filename.endswith(".json"):
-                    file_path = os.path.join(self.data_dir, filename)
-                    try:
-                        with open(file_path, 'r', encoding='utf-8') as f:
-                            tweets = json.load(f)
-                            all_tweets.extend(tweets)
-                    except json.JSONDecodeError:
-                        continue
+        :param target_accounts: 要监控的账号列表，None表示不变
+        :param check_interval: 检查间隔（秒），None表示不变
+        :param backfill_hours: 新增账号的回溯时间（小时），None表示不变
+        :param checked_since: 新增账号已知的抓取进度（账号小写 -> UTC时间），如从其他监控进程接手的账号
+        :param trace_enabled: 是否记录推文处理耗时，None表示不变
+        :return: {"added": 新增账号, "removed": 移除账号}
+        """
+        added, removed = [], []
+        with self.settings_lock:
+            # 首次调用（监控启动）时不输出变更日志
+            running = bool(self.target_accounts)
+            if backfill_hours is not None:
+                self.backfill_hours = backfill_hours
+            if target_accounts is not None:
+                accounts = {account.lower(): account for account in target_accounts}
+                since_time = datetime.utcnow() - timedelta(hours=self.backfill_hours)
+                for key, account in accounts.items():
+                    if key not in self.account_checked:
+                        if (checked_since or {}).get(key):
+                            self.account_checked[key] = checked_since[key]
+                            self.exact_since.add(key)
+                        else:
+                            self.account_checked[key] = since_time
+                        added.append(account)
+                for account in self.target_accounts:
+                    if account.lower() not in accounts:
+                        self.account_checked.pop(account.lower(), None)
+                        self.fetch_backlog.pop(account.lower(), None)
+                        self.exact_since.discard(account.lower())
+                        removed.append(account)
+                self.target_accounts = list(accounts.values())
+                if running and (added or removed):
+                    print(f"🔄 监控账号已更新：新增 {', '.join('@' + a for a in added) or '无'}（回溯 {self.backfill_hours} 小时），"
+                          f"移除 {', '.join('@' + a for a in removed) or '无'}")
+            if check_interval and int(check_interval) != self.check_interval:
+                self.check_interval = int(check_interval)
+                if running:
+                    print(f"🔄 检查间隔已更新为 {self.check_interval} 秒")
+            if trace_enabled is not None and bool(trace_enabled) != self.tracer.enabled:
+                self.tracer.enabled = bool(trace_enabled)
+                print(f"🔄 推文处理追踪已{'开启' if self.tracer.enabled else '关闭'}（{self.tracer.trace_path()}）")
+        return {'added': added, 'removed': removed}
+    
+    def plan_fetch_groups(self, until_time: datetime, exclude_replies: bool = False, combine_queries: bool = False) -> list:
+        """
+        按各账号上次抓取时间规划本轮抓取：抓取进度相同的账号才合并为一条查询
         
-        # 按时间排序（最新的在前）
-        all_tweets.sort(key=lambda x: x.get('timestamp', ''), reverse=True)
-        return all_tweets
+        :param until_time: 本轮抓取截止时间（UTC）
+        :param exclude_replies: 是否排除回复推文
+        :param combine_queries: 是否将多个账号合并为 OR 查询
+        :return: [(起始时间, 账号列表), ...]
+        """
+        with self.settings_lock:
+            by_since = {}
+            for account in self.target_accounts:
+                by_since.setdefault(self.account_checked[account.lower()], []).append(account)
+        
+        fetch_groups = []
+        for since_time, accounts in sorted(by_since.items()):
+            if combine_queries:
+                groups = self.group_accounts_for_query(accounts, since_time, until_time, exclude_replies)
+            else:
+                groups = [[account] for account in accounts]
+            fetch_groups.extend((since_time, group) for group in groups)
+        return fetch_groups
     
-    def monitor_and_process(self, target_accounts: list, check_interval: int = 300, hours: int = 1, exclude_replies: bool = False):
+    def account_progress(self) -> dict:
+        """
+        各账号的抓取进度；有因抓取上限留下的时间段时，进度为其中最早的起始时间
+        
+        :return: 账号小写 -> 该时间之前的推文均已抓取（UTC）
+        """
+        with self.settings_lock:
+            progress = dict(self.account_checked)
+            for key, windows in self.fetch_backlog.items():
+                if key in progress:
+                    progress[key] = min([progress[key]] + [window[0] for window in windows])
+            return progress
+    
+    def mark_accounts_checked(self, accounts: list, until_time: datetime):
+        """
+        记录账号已抓取到 until_time；期间被移除的账号不再加回
+        
+        :param accounts: 账号列表
+        :param until_time: 抓取截止时间（UTC）
+        """
+        with self.settings_lock:
+            for account in accounts:
+                if account.lower() in self.account_checked:
+                    self.account_checked[account.lower()] = until_time
+    
+    def profile_next_cycles(self, cycles: int):
+        """
+        接下来 cycles 轮扫描开启 cProfile 性能分析，结果写入数据目录下的 profiles/
+        
+        :param cycles: 轮数，0表示取消
+        """
+        self.profiler.request(cycles)
+        print(f"📊 接下来 {cycles} 轮扫描将进行性能分析" if cycles else "📊 已取消性能分析")
+    
+    def diagnostics(self) -> dict:
+        """
+        追踪和性能分析的状态
+        
+        :return: {"trace_enabled": 是否开启追踪, "profile_remaining": 剩余分析轮数, "last_profile": 最近一次分析结果路径}
+        """
+        profile = self.profiler.status()
+        return {'trace_enabled': self.tracer.enabled, 'profile_remaining': profile['remaining'],
+                'last_profile': profile['last_dump']}
+    
+    def _run_cycle(self, check_and_process):
+        """
+        执行一轮扫描：本轮累积在预写日志中的推文合并写入日期文件，并按需记录追踪汇总和性能分析
+        
+        :param check_and_process: 抓取并处理推文的函数
+        """
+        self.tracer.begin_cycle()
+        self.profiler.begin_cycle()
+        try:
+            # 日志归监控所有：首轮开始前重放上次异常退出时未合并的记录（每个实例只执行一次）
+            self.journal.replay()
+            check_and_process()
+            self.journal.checkpoint()
+            self.budget.flush()
+        finally:
+            self.profiler.end_cycle()
+            self.tracer.end_cycle()
+    
+    def stop(self):
+        """请求停止监控，正在等待的循环会立即退出"""
+        self.stop_event.set()
+        self.wake_event.set()
+    
+    def scan_now(self):
+        """跳过当前倒计时，立即开始下一轮扫描"""
+        self.wake_event.set()
+    
+    def _pause(self, seconds: float) -> bool:
+        """
+        限流等待，可被停止信号打断
+        
+        :param seconds: 等待秒数
+        :return: 是否收到停止信号
+        """
+        return self.stop_event.wait(seconds)
+    
+    def _wait_next_cycle(self, on_tick=None):
+        """
+        等待下一轮扫描，收到停止或立即扫描信号时提前返回；
+        每次醒来重新读取检查间隔，运行中修改的间隔立即生效
+        
+        :param on_tick: 每10秒调用一次的回调，参数为剩余秒数
+        """
+        started = time.monotonic()
+        while not self.stop_event.is_set():
+            remaining = started + self.check_interval - time.monotonic()
+            if remaining <= 0:
+                break
+            if on_tick:
+                on_tick(int(remaining))
+            if self.wake_event.wait(min(10, remaining)):
+                break
+    
+    def drain_ai_queue(self) -> list:
+        """
+        按优先级取出本轮待AI处理的推文
+        
+        :return: 推文列表（优先级从高到低）
+        """
+        if self.ai_queue.stale_count:
+            print(f"⏳ {self.ai_queue.stale_count} 条积压推文发布时间过早，降为低优先级")
+        return self.ai_queue.drain()
+    
+    def monitor_and_process(self, target_accounts: list, check_interval: int = 300, hours: int = 1, exclude_replies: bool = False, combine_queries: bool = False):
         """
         监控Twitter账号并使用AI处理新推文
         
@@ -233,88 +1021,131 @@ class TwitterAIMonitor:
         :param check_interval: 检查间隔（秒）
         :param hours: 初始回溯时间（小时）
         :param exclude_replies: 是否排除回复推文
+        :param combine_queries: 是否将多个账号合并为 OR 查询批量抓取
         """
-        last_checked_time = datetime.utcnow() - timedelta(hours=hours)
+        self.update_settings(target_accounts, check_interval, hours)
         
         def check_and_process_tweets():
-            nonlocal last_checked_time
             until_time = datetime.utcnow()
-            since_time = last_checked_time
             
-            all_tweets = []
+            # 清除上一轮被中断时未开始处理的推文记录，再加入上一轮AI处理失败待重试的推文
+            self.ai_queue.discard_pending()
+            all_tweets = self.requeue_deferred_tweets()
+            
+            fetch_groups = self.plan_fetch_groups(until_time, exclude_replies, combine_queries)
+            fetched_accounts = []
+            # 翻页到已存储的推文即停止
+            high_water = self.repository.high_water_marks()
             
-            for account in target_accounts:
-                tweets = self.get_tweets_from_account(account, since_time, until_time, exclude_replies)
+            for index, (since_time, group) in enumerate(fetch_groups):
+                tweets = self.fetch_account_group(group, since_time, until_time, high_water, exclude_replies)
                 all_tweets.extend(tweets)
+                self.ai_queue.push(tweets)
+                fetched_accounts.extend(group)
                 
                 # 添加5秒延迟，避免API限制
-                if account != target_accounts[-1]:  # 如果不是最后一个账号，添加延迟
+                if index < len(fetch_groups) - 1:  # 如果不是最后一组，添加延迟
                     print("等待5秒，避免API请求限制...")
-                    time.sleep(5)
+                    if self._pause(5):
+                        return
             
             if all_tweets:
                 print(f"发现 {len(all_tweets)} 条新推文，开始AI处理...\n")
                 
-                for idx, tweet in enumerate(all_tweets, start=1):
-                    print(f"{'='*60}")
-                    print(f"处理推文 {idx}/{len(all_tweets)}")
-                    print(f"{'='*60}")
+                idx = 0
+                for batch in self.plan_ai_batches(self.drain_ai_queue()):
+                    requests_before = self.llm_requests
+                    self.tracer.record_queue_wait(batch, self.ai_queue.mark_started(batch))
+                    # 批量模式：一次请求处理整组推文，缺失的结果下面逐条处理一次，仍失败则延后
+                    batch_results = {}
+                    if len(batch) > 1 and self.budget.mode() == 'normal':
+                        print(f"批量AI处理 {len(batch)} 条推文...")
+                        try:
+                            batch_results = self.process_tweets_batch_with_ai(
+                                [{'id': t.get('id') or t.get('id_str'), 'text': t.get('text', ''), 'author': t['author']} for t in batch]
+                            )
+                        except Exception as e:
+                            print(f"❌ 批量AI处理失败，改为逐条处理: {str(e)}")
                     
-                    # 基本信息
-                    tweet_id = tweet.get('id') or tweet.get('id_str')
-                    tweet_url = f"https://twitter.com/{tweet['author']}/status/{tweet_id}"
-                    original_text = tweet.get('text', '')
-                    
-                    print(f"作者：{tweet['author']}")
-                    print(f"发布时间：{tweet.get('createdAt')}")
-                    print(f"原文：{original_text}")
-                    print(f"链接：{tweet_url}")
-                    print()
-                    
-                    # AI处理
-                    print("AI处理中...")
-                    ai_result = self.process_tweet_with_ai(original_text)
-                    
-                    print(f"AI标题：{ai_result['title']}")
-                    print(f"AI翻译：{ai_result['translation']}")
-                    print(f"AI解读：{ai_result['analysis']}")
-                    print(f"{'='*60}\n")
-                    
-                    # 保存数据到JSON
-                    tweet_data = {
-                        'id': tweet_id,
-                        'author': tweet['author'],
-                        'created_at': tweet.get('createdAt'),
-                        'original_text': original_text,
-                        'tweet_url': tweet_url,
-                        'ai_title': ai_result['title'],
-                        'ai_translation': ai_result['translation'],
-                        'ai_analysis': ai_result['analysis'],
-                        'timestamp': datetime.utcnow().isoformat(),
-                        'processed_date': datetime.now().strftime("%Y-%m-%d")
-                    }
-                    self.save_tweet_data(tweet_data)
+                    for tweet in batch:
+                        idx += 1
+                        print(f"{'='*60}")
+                        print(f"处理推文 {idx}/{len(all_tweets)}")
+                        print(f"{'='*60}")
+                        
+                        # 基本信息
+                        tweet_id = tweet.get('id') or tweet.get('id_str')
+                        tweet_url = f"https://twitter.com/{tweet['author']}/status/{tweet_id}"
+                        original_text = tweet.get('text', '')
+                        
+                        print(f"作者：{tweet['author']}")
+                        print(f"发布时间：{tweet.get('createdAt')}")
+                        print(f"原文：{original_text}")
+                        print(f"链接：{tweet_url}")
+                        print()
+                        
+                        # AI处理；失败的推文（大模型不可用、预算不足或结果解析出错）不保存，留到下一轮重试
+                        print("AI处理中...")
+                        try:
+                            ai_result = batch_results.get(str(tweet_id)) or self.process_tweet_within_budget(tweet)
+                        except Exception as e:
+                            print(f"❌ AI处理推文失败: {str(e)}")
+                            self.defer_tweet(tweet, e)
+                            continue
+                        self.deferred_tweets.pop(str(tweet_id), None)
+                        
+                        print(f"AI标题：{ai_result['title']}")
+                        print(f"AI翻译：{ai_result['translation']}")
+                        print(f"AI解读：{ai_result['analysis']}")
+                        print(f"{'='*60}\n")
+                        
+                        # 保存数据到JSON
+                        tweet_data = {
+                            'id': tweet_id,
+                            'author': tweet['author'],
+                            'created_at': tweet.get('createdAt'),
+                            'original_text': original_text,
+                            'tweet_url': tweet_url,
+                            'ai_title': ai_result['title'],
+                            'ai_translation': ai_result['translation'],
+                            'ai_analysis': ai_result['analysis'],
+                            'timestamp': datetime.utcnow().isoformat(),
+                            'processed_date': datetime.now().strftime("%Y-%m-%d")
+                        }
+                        self.save_tweet_data(tweet_data)
                     
-                    # 添加延迟避免API频率限制
-                    time.sleep(2)
+                    # 实际发出AI请求后才延迟，避免API频率限制；预算拦截、复用结果时不等待
+                    # 停止时未处理的推文留到下次启动重新抓取
+                    if self.llm_requests > requests_before:
+                        if self._pause(2):
+                            return
+                    elif self.stop_event.is_set():
+                        return
+                
+                wait = self.ai_queue.wait_percentiles()
+                print(f"AI队列等待时间: p50 {wait['p50']}s / p90 {wait['p90']}s / p99 {wait['p99']}s（{wait['count']} 条）")
+                day_tokens, hour_tokens = self.budget.used()
+                print(f"Token用量: 今日 {day_tokens} / 本小时 {hour_tokens}，预算模式 {self.budget.mode()}")
             else:
                 print(f"{datetime.utcnow()} - 没有发现新推文。")
             
-            last_checked_time = until_time
+            self.mark_accounts_checked(fetched_accounts, until_time)
         
         print(f"开始监控账号: {', '.join(target_accounts)}")
         print(f"检查间隔: {check_interval} 秒")
         print(f"AI处理功能已启用\n")
         
         try:
-            while True:
-                check_and_process_tweets()
-                print(f"等待 {check_interval} 秒后进行下次检查...")
-                time.sleep(check_interval)
+            while not self.stop_event.is_set():
+                self.wake_event.clear()
+                self._run_cycle(check_and_process_tweets)
+                print(f"等待 {self.check_interval} 秒后进行下次检查...")
+                self._wait_next_cycle()
+            print("监控已停止。")
         except KeyboardInterrupt:
             print("监控已停止。")
     
-    def monitor_and_process_with_status(self, target_accounts: list, check_interval: int = 300, hours: int = 1, status_dict: dict = None, exclude_replies: bool = False):
+    def monitor_and_process_with_status(self, target_accounts: list, check_interval: int = 300, hours: int = 1, status_dict: dict = None, exclude_replies: bool = False, combine_queries: bool = False):
         """
         带状态更新的监控功能
         
@@ -323,8 +1154,9 @@ class TwitterAIMonitor:
         :param hours: 初始回溯时间（小时）
         :param status_dict: 状态字典，用于更新前端显示
         :param exclude_replies: 是否排除回复推文
+        :param combine_queries: 是否将多个账号合并为 OR 查询批量抓取
         """
-        last_checked_time = datetime.utcnow() - timedelta(hours=hours)
+        self.update_settings(target_accounts, check_interval, hours)
         
         def update_status(status, account="", result=""):
             if status_dict:
@@ -334,31 +1166,42 @@ class TwitterAIMonitor:
                 if result:
                     status_dict["last_result"] = result
                 # 计算下次检查时间
-                next_time = datetime.now() + timedelta(seconds=check_interval)
+                next_time = datetime.now() + timedelta(seconds=self.check_interval)
                 status_dict["next_check_time"] = next_time.isoformat()
+                status_dict["diagnostics"] = self.diagnostics()
         
         def check_and_process_tweets():
-            nonlocal last_checked_time
             until_time = datetime.utcnow()
-            since_time = last_checked_time
             
-            all_tweets = []
+            # 清除上一轮被中断时未开始处理的推文记录，再加入上一轮AI处理失败待重试的推文
+            self.ai_queue.discard_pending()
+            all_tweets = self.requeue_deferred_tweets()
+            # 抓取成功的账号在本轮结束时更新抓取进度，失败的账号下一轮从原来的时间继续
+            fetched_accounts = []
             
             try:
                 # 更新状态：开始抓取
-                update_status("🔍 扫描中", f"{', '.join(target_accounts)}")
+                update_status("🔍 扫描中", f"{', '.join(self.target_accounts)}")
+                
+                fetch_groups = self.plan_fetch_groups(until_time, exclude_replies, combine_queries)
+                # 翻页到已存储的推文即停止
+                high_water = self.repository.high_water_marks()
                 
-                for account in target_accounts:
+                for index, (since_time, group) in enumerate(fetch_groups):
+                    account = ", @".join(group)
                     try:
                         update_status(f"📡 正在抓取 @{account} 的推文...")
-                        tweets = self.get_tweets_from_account(account, since_time, until_time, exclude_replies)
+                        tweets = self.fetch_account_group(group, since_time, until_time, high_water, exclude_replies)
                         all_tweets.extend(tweets)
+                        self.ai_queue.push(tweets)
+                        fetched_accounts.extend(group)
                         print(f"✅ 成功获取 @{account} 的 {len(tweets)} 条推文")
                         
                         # 添加5秒延迟，避免API限制
-                        if account != target_accounts[-1]:  # 如果不是最后一个账号，添加延迟
+                        if index < len(fetch_groups) - 1:  # 如果不是最后一组，添加延迟
                             print("等待5秒，避免API请求限制...")
-                            time.sleep(5)
+                            if self._pause(5):
+                                return
                             
                     except Exception as e:
                         print(f"❌ 获取 @{account} 推文失败: {str(e)}")
@@ -372,69 +1215,95 @@ class TwitterAIMonitor:
             if all_tweets:
                 update_status(f"🤖 发现 {len(all_tweets)} 条新推文，AI分析中...", result=f"找到 {len(all_tweets)} 条新推文")
                 
-                for idx, tweet in enumerate(all_tweets, start=1):
-                    # 基本信息
-                    tweet_id = tweet.get('id') or tweet.get('id_str')
-                    tweet_url = f"https://twitter.com/{tweet['author']}/status/{tweet_id}"
-                    original_text = tweet.get('text', '')
+                idx = 0
+                for batch in self.plan_ai_batches(self.drain_ai_queue()):
+                    requests_before = self.llm_requests
+                    self.tracer.record_queue_wait(batch, self.ai_queue.mark_started(batch))
+                    # 批量模式：一次请求处理整组推文，缺失的结果下面逐条处理一次，仍失败则延后
+                    batch_results = {}
+                    if len(batch) > 1 and self.budget.mode() == 'normal':
+                        update_status(f"🧠 批量AI处理中... ({idx + 1}-{idx + len(batch)}/{len(all_tweets)})")
+                        try:
+                            batch_results = self.process_tweets_batch_with_ai(
+                                [{'id': t.get('id') or t.get('id_str'), 'text': t.get('text', ''), 'author': t['author']} for t in batch]
+                            )
+                        except Exception as e:
+                            print(f"❌ 批量AI处理失败，改为逐条处理: {str(e)}")
                     
-                    # 更新状态：AI处理中
-                    update_status(f"🧠 AI处理中... ({idx}/{len(all_tweets)})", f"@{tweet['author']}")
-                    
-                    # AI处理
-                    try:
-                        ai_result = self.process_tweet_with_ai(original_text)
-                    except Exception as e:
-                        print(f"❌ AI处理推文失败: {str(e)}")
-                        ai_result = {
-                            'title': f"处理失败: {str(e)[:50]}",
-                            'translation': original_text,
-                            'analysis': f"AI处理失败: {str(e)}"
+                    for tweet in batch:
+                        idx += 1
+                        # 基本信息
+                        tweet_id = tweet.get('id') or tweet.get('id_str')
+                        tweet_url = f"https://twitter.com/{tweet['author']}/status/{tweet_id}"
+                        original_text = tweet.get('text', '')
+                        
+                        # 更新状态：AI处理中
+                        update_status(f"🧠 AI处理中... ({idx}/{len(all_tweets)})", f"@{tweet['author']}")
+                        
+                        # AI处理；失败的推文（大模型不可用、预算不足或结果解析出错）不保存，留到下一轮重试
+                        try:
+                            ai_result = batch_results.get(str(tweet_id)) or self.process_tweet_within_budget(tweet)
+                        except Exception as e:
+                            print(f"❌ AI处理推文失败: {str(e)}")
+                            self.defer_tweet(tweet, e)
+                            continue
+                        self.deferred_tweets.pop(str(tweet_id), None)
+                        
+                        # 保存数据到JSON
+                        tweet_data = {
+                            'id': tweet_id,
+                            'author': tweet['author'],
+                            'created_at': tweet.get('createdAt'),
+                            'original_text': original_text,
+                            'tweet_url': tweet_url,
+                            'ai_title': ai_result['title'],
+                            'ai_translation': ai_result['translation'],
+                            'ai_analysis': ai_result['analysis'],
+                            'timestamp': datetime.utcnow().isoformat(),
+                            'processed_date': datetime.now().strftime("%Y-%m-%d")
                         }
+                        self.save_tweet_data(tweet_data)
+                        
+                        # 更新处理计数
+                        if status_dict:
+                            status_dict["processed_tweets"] = status_dict.get("processed_tweets", 0) + 1
+                            status_dict["skipped_ai_stages"] = dict(self.skipped_stages)
+                            status_dict["near_duplicate_reuses"] = self.near_duplicate_reuses
+                            status_dict["ai_queue_wait_seconds"] = self.ai_queue.wait_percentiles()
+                            status_dict["llm_endpoints"] = self.get_llm_router().health()
+                            status_dict["token_budget_mode"] = self.budget.mode()
+                            status_dict["token_usage_today"] = self.budget.used()[0]
                     
-                    # 保存数据到JSON
-                    tweet_data = {
-                        'id': tweet_id,
-                        'author': tweet['author'],
-                        'created_at': tweet.get('createdAt'),
-                        'original_text': original_text,
-                        'tweet_url': tweet_url,
-                        'ai_title': ai_result['title'],
-                        'ai_translation': ai_result['translation'],
-                        'ai_analysis': ai_result['analysis'],
-                        'timestamp': datetime.utcnow().isoformat(),
-                        'processed_date': datetime.now().strftime("%Y-%m-%d")
-                    }
-                    self.save_tweet_data(tweet_data)
-                    
-                    # 更新处理计数
-                    if status_dict:
-                        status_dict["processed_tweets"] = status_dict.get("processed_tweets", 0) + 1
-                    
-                    # 添加延迟避免API频率限制
-                    time.sleep(2)
+                    # 实际发出AI请求后才延迟，避免API频率限制；预算拦截、复用结果时不等待
+                    # 停止时未处理的推文留到下次启动重新抓取
+                    if self.llm_requests > requests_before:
+                        if self._pause(2):
+                            return
+                    elif self.stop_event.is_set():
+                        return
                 
-                update_status("✅ 处理完成", result=f"成功处理 {len(all_tweets)} 条推文")
+                deferred = len(self.deferred_tweets)
+                update_status("✅ 处理完成", result=f"成功处理 {len(all_tweets) - deferred} 条推文" + (f"，{deferred} 条待重试" if deferred else ""))
             else:
                 update_status("⭐ 智能待机中", result="未发现新推文，继续监控中...")
             
-            last_checked_time = until_time
+            self.mark_accounts_checked(fetched_accounts, until_time)
         
         update_status("🚀 Neural Network 已启动", f"监控 {len(target_accounts)} 个账号")
         print(f"🚀 监控启动成功，目标账号: {target_accounts}")
         
         try:
-            while status_dict and status_dict.get("running", False):
+            while status_dict and status_dict.get("running", False) and not self.stop_event.is_set():
                 print(f"🔄 开始新一轮检查循环...")
-                check_and_process_tweets()
+                # 本轮开始前的立即扫描请求已被满足；扫描期间的新请求会在本轮结束后立即触发下一轮
+                self.wake_event.clear()
+                self._run_cycle(check_and_process_tweets)
                 
-                # 倒计时等待
-                for remaining in range(check_interval, 0, -10):
-                    if not status_dict.get("running", False):
-                        print("🛑 收到停止信号，退出监控")
-                        break
-                    update_status(f"⏱️ 下次扫描倒计时 {remaining}s", result=status_dict.get("last_result", ""))
-                    time.sleep(10)
+                # 倒计时等待，停止或立即扫描时提前结束
+                self._wait_next_cycle(
+                    lambda remaining: update_status(f"⏱️ 下次扫描倒计时 {remaining}s", result=status_dict.get("last_result", ""))
+                )
+            print("🛑 收到停止信号，退出监控")
                     
         except KeyboardInterrupt:
             print("🛑 监控被中断")
@@ -459,18 +1328,33 @@ if __name__ == "__main__":
         "TARGET_ACCOUNTS": ["OpenAI"],
         "CHECK_INTERVAL": 300,
         "INITIAL_HOURS": 64,
-        "EXCLUDE_REPLIES": False # 新增配置项
+        "EXCLUDE_REPLIES": False, # 新增配置项
+        "COMBINE_QUERIES": False,
+        "AI_BATCH_SIZE": 1,
+        "AI_BATCH_TOKEN_BUDGET": 6000,
+        "NEAR_DUPLICATE_THRESHOLD": 0.9,
+        "JOURNAL_CHECKPOINT_EVERY": DEFAULT_CHECKPOINT_EVERY,
+        "ACCOUNT_WEIGHTS": {},
+        "STALE_AFTER_HOURS": 0,
+        "LLM_ENDPOINTS": [],
+        "LLM_HEDGE": True,
+        "LLM_HEDGE_MIN_DELAY": 2.0,
+        "DAILY_TOKEN_BUDGET": 0,
+        "HOURLY_TOKEN_BUDGET": 0,
+        "TOKEN_PRICES": {},
+        "MAX_PAGES_PER_ACCOUNT": 10,
+        "MAX_TWEETS_PER_ACCOUNT": 200,
+        "TRACE_ENABLED": False
     }
     
     # 读取配置文件
     if os.path.exists(config_file):
         try:
-            with open(config_file, 'r', encoding='utf-8') as f:
-                config = json.load(f)
-                # 合并默认配置
-                for key, value in default_config.items():
-                    if key not in config:
-                        config[key] = value
+            config = json_codec.load_file(config_file)
+            # 合并默认配置
+            for key, value in default_config.items():
+                if key not in config:
+                    config[key] = value
         except Exception as e:
             print(f"读取配置文件失败，使用默认配置: {e}")
             config = default_config
@@ -486,12 +1370,14 @@ if __name__ == "__main__":
     CHECK_INTERVAL = config["CHECK_INTERVAL"]
     INITIAL_HOURS = config["INITIAL_HOURS"]
     EXCLUDE_REPLIES = config["EXCLUDE_REPLIES"] # 从配置加载
+    COMBINE_QUERIES = config["COMBINE_QUERIES"]
     
     print(f"开始监控账号: {', '.join(TARGET_ACCOUNTS)}")
     print(f"检查间隔: {CHECK_INTERVAL}秒")
     print(f"初始回溯: {INITIAL_HOURS}小时")
     print(f"是否排除回复: {EXCLUDE_REPLIES}") # 打印配置
+    print(f"是否合并账号查询: {COMBINE_QUERIES}")
     
     # 创建监控器并开始监控
-    monitor = TwitterAIMonitor(TWITTER_API_KEY, LLM_URL, LLM_API_KEY)
-    monitor.monitor_and_process(TARGET_ACCOUNTS, CHECK_INTERVAL, INITIAL_HOURS, EXCLUDE_REPLIES) 
\ No newline at end of file
+    monitor = TwitterAIMonitor.from_config(config)
+    monitor.monitor_and_process(TARGET_ACCOUNTS, CHECK_INTERVAL, INITIAL_HOURS, EXCLUDE_REPLIES, COMBINE_QUERIES) 
\ No newline at end of file